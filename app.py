@@ -2,10 +2,8 @@ from flask import Flask, render_template, jsonify, request, redirect, url_for
 import json
 import os
 from datetime import datetime, timedelta
-import pandas as pd
-import numpy as np
 from main import (
-    binance, get_major_coins, get_volatile_coins, get_price_data,
+    binance, exchange_cache, indicator_cache, get_major_coins, get_volatile_coins, get_price_data,
     simple_ma_strategy, rsi_strategy,
     StrategyOptimizer, BacktestEngine, TradingTracker
 )
@@ -33,7 +31,7 @@ def strategy_page():
 @app.route('/api/balance')
 def get_balance():
     try:
-        balance = binance.fetch_balance()
+        balance = exchange_cache.call('fetch_balance')
         usdt = balance['total']['USDT']
         return jsonify({'success': True, 'usdt': usdt})
     except Exception as e:
@@ -51,6 +49,8 @@ def order():
             order = binance.create_market_buy_order(symbol, amount)
         else:
             order = binance.create_market_sell_order(symbol, amount)
+        # 주문 후 잔고 캐시 무효화
+        exchange_cache.invalidate('fetch_balance')
         return jsonify({'success': True, 'order': order})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -59,7 +59,7 @@ def order():
 def get_performance():
     """성과 데이터 API"""
     try:
-        balance = binance.fetch_balance()
+        balance = exchange_cache.call('fetch_balance')
         usdt = balance['total']['USDT']
         performance = trading_tracker.calculate_performance()
         if performance:
@@ -114,7 +114,9 @@ def get_recent_trades():
 def get_volatile_coins_api():
     """고변동성 코인 목록 API"""
     try:
-        coins = get_volatile_coins()
+        # universe=all 이면 전체 선물 목록 스캔
+        universe_size = None if request.args.get('universe') == 'all' else request.args.get('universe', 50, type=int)
+        coins = get_volatile_coins(universe_size=universe_size)
         return jsonify({'success': True, 'data': coins})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
@@ -174,7 +176,8 @@ def optimize():
     max_combinations = data.get('max_combinations', 50)
     try:
         result = optimizer.optimize_strategy(symbol, timeframe, strategy, days, max_combinations)
-        return jsonify({'success': True, 'result': result})
+        # 거래/자산 기록(구조화 배열)과 Timestamp를 JSON 형식으로 변환
+        return jsonify({'success': True, 'result': optimizer._convert_timestamps_to_strings(result)})
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
@@ -288,6 +291,15 @@ def backtest():
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)})
 
+# 캐시 통계 (거래소 호출/지표 계산)
+@app.route('/api/cache/stats')
+def cache_stats():
+    return jsonify({
+        'success': True,
+        'exchange': exchange_cache.stats,
+        'indicator': {**indicator_cache.stats, 'entries': len(indicator_cache), 'bytes': indicator_cache.nbytes}
+    })
+
 # 포트폴리오 관리 (예시)
 @app.route('/api/portfolio', methods=['GET', 'POST'])
 def portfolio():
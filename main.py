@@ -1,64 +1,208 @@
-import ccxt
-import pandas as pd
+from __future__ import annotations
+
 import numpy as np
 import time
 import json
 import os
 from datetime import datetime, timedelta
+import bisect
+import hashlib
+import heapq
+import math
+from collections import OrderedDict, deque
+import contextlib
+import copy
+import importlib
 import itertools
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Dict, List, Tuple, Optional, Any, Iterable
 import threading
+import weakref
 import sys
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+try:
+    import fcntl  # 프로세스 간 캔들 파일 잠금 (POSIX 전용)
+except ImportError:
+    fcntl = None
 
-with open('.env', 'r') as f:
-    api_key = f.readline().strip().split('=')[1]
-    secret_key = f.readline().strip().split('=')[1]
+class LazyModule:
+    """첫 속성 접근 시 모듈을 불러오는 지연 import 프록시 (import 시간 단축용)"""
+    
+    def __init__(self, name):
+        self._name = name
+    
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._name)
+        value = getattr(module, attr)
+        # 인스턴스 속성으로 캐시 - 이후 접근은 __getattr__을 거치지 않음 (핫 루프용)
+        setattr(self, attr, value)
+        return value
 
-binance = ccxt.binance({
-    'apiKey': api_key,
-    'secret': secret_key,
-    'sandbox': False,
-    'options': {
-        'defaultType': 'future',
-    }
-})
+# 무거운 모듈은 실제 사용 시점에 로드
+pd = LazyModule('pandas')
+
+# import 시간 예산 (초) - python main.py --startup-check 로 측정
+STARTUP_BUDGET_SECONDS = {'main': 0.5, 'app': 1.0}
+
+# 거래소 엔드포인트별 요청 가중치 (바이낸스 선물 기준)
+EXCHANGE_WEIGHTS = {
+    'fetch_tickers': 40,
+    'fetch_ticker': 1,
+    'fetch_ohlcv': 1,
+    'fetch_balance': 5,
+}
+
+# 거래소 엔드포인트별 캐시 TTL (신선 유지 시간, 추가 stale 허용 시간) - 초 단위
+EXCHANGE_CACHE_TTLS = {
+    'fetch_tickers': (15, 120),
+    'fetch_ticker': (5, 60),
+    'fetch_ohlcv': (60, 300),
+    'fetch_balance': (5, 60),
+}
+
+class ExchangeCache:
+    """거래소 호출 캐시 (TTL + stale-while-revalidate + 동시 요청 병합)"""
+    
+    def __init__(self, ttls=None, max_workers=4):
+        self.ttls = ttls or EXCHANGE_CACHE_TTLS
+        self._entries = {}   # key -> (값, 저장 시각)
+        self._inflight = {}  # key -> 진행 중인 Future
+        self._generations = {}  # method -> 무효화 횟수 (None 키는 전체 무효화)
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='exchange-cache')
+        self.stats = {'hits': 0, 'stale_hits': 0, 'misses': 0, 'coalesced': 0, 'errors': 0}
+    
+    def _generation(self, method):
+        """method의 현재 무효화 세대 (전체 무효화 포함) - 잠금 안에서 호출"""
+        return self._generations.get(None, 0), self._generations.get(method, 0)
+    
+    def _fetch(self, key, method, args, kwargs, future, generation):
+        """실제 거래소 호출 후 캐시 갱신 (진행 중 표시 해제)
+        
+        호출 도중 invalidate되면 (세대가 바뀌면) 결과를 요청자에게만 돌려주고 캐시에는 저장하지 않음
+        """
+        try:
+            binance_rate_limiter.acquire(EXCHANGE_WEIGHTS.get(method, 1))
+            value = getattr(binance, method)(*args, **kwargs)
+            with self._lock:
+                if self._generation(method) == generation:
+                    self._entries[key] = (value, time.monotonic())
+            future.set_result(value)
+        except Exception as e:
+            with self._lock:
+                self.stats['errors'] += 1
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                if self._inflight.get(key) is future:
+                    self._inflight.pop(key)
+    
+    def call(self, method, *args, **kwargs):
+        """캐시를 거쳐 거래소 메소드 호출"""
+        key = (method, args, tuple(sorted(kwargs.items())))
+        fresh_ttl, stale_ttl = self.ttls.get(method, (0, 0))
+        now = time.monotonic()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            age = now - entry[1] if entry else None
+            
+            # 1) 신선한 캐시
+            if entry and age < fresh_ttl:
+                self.stats['hits'] += 1
+                return entry[0]
+            
+            # 2) stale 캐시: 즉시 반환하고 백그라운드에서 갱신
+            if entry and age < fresh_ttl + stale_ttl:
+                self.stats['stale_hits'] += 1
+                if key not in self._inflight:
+                    future = self._inflight[key] = Future()
+                    self._executor.submit(self._fetch, key, method, args, kwargs, future, self._generation(method))
+                return entry[0]
+            
+            # 3) 캐시 없음: 진행 중인 요청이 있으면 결과 공유
+            future = self._inflight.get(key)
+            if future is not None:
+                self.stats['coalesced'] += 1
+                owner = False
+            else:
+                self.stats['misses'] += 1
+                future = self._inflight[key] = Future()
+                generation = self._generation(method)
+                owner = True
+        
+        if owner:
+            self._fetch(key, method, args, kwargs, future, generation)
+        return future.result()
+    
+    def invalidate(self, method=None):
+        """캐시 무효화 (method 지정 시 해당 엔드포인트만) - 진행 중인 요청의 결과도 캐시에 남지 않게 세대 증가"""
+        with self._lock:
+            self._generations[method] = self._generations.get(method, 0) + 1
+            if method is None:
+                self._entries.clear()
+                self._inflight.clear()
+            else:
+                self._entries = {key: entry for key, entry in self._entries.items() if key[0] != method}
+                self._inflight = {key: future for key, future in self._inflight.items() if key[0] != method}
+
+# 전역 거래소 캐시 (대시보드 폴링/코인 스캔용)
+exchange_cache = ExchangeCache()
+
+# 폴백: 기본 주요 코인 리스트
+FALLBACK_MAJOR_COINS = [
+    'BTC/USDT:USDT', 'ETH/USDT:USDT', 'BNB/USDT:USDT', 'SOL/USDT:USDT',
+    'XRP/USDT:USDT', 'ADA/USDT:USDT', 'AVAX/USDT:USDT', 'DOGE/USDT:USDT',
+    'DOT/USDT:USDT', 'MATIC/USDT:USDT', 'LINK/USDT:USDT', 'UNI/USDT:USDT',
+    'LTC/USDT:USDT', 'BCH/USDT:USDT', 'ATOM/USDT:USDT', 'ETC/USDT:USDT',
+    'XLM/USDT:USDT', 'FIL/USDT:USDT', 'TRX/USDT:USDT', 'NEAR/USDT:USDT',
+    'APT/USDT:USDT', 'OP/USDT:USDT', 'ARB/USDT:USDT', 'MKR/USDT:USDT',
+    'AAVE/USDT:USDT', 'SAND/USDT:USDT', 'MANA/USDT:USDT', 'ALGO/USDT:USDT',
+    'VET/USDT:USDT', 'ICP/USDT:USDT', 'THETA/USDT:USDT', 'FTM/USDT:USDT',
+    'AXS/USDT:USDT', 'GALA/USDT:USDT', 'ROSE/USDT:USDT', 'CHZ/USDT:USDT',
+    'HOT/USDT:USDT', 'ZIL/USDT:USDT', 'ENJ/USDT:USDT', 'BAT/USDT:USDT',
+    'DASH/USDT:USDT', 'ZEC/USDT:USDT', 'XMR/USDT:USDT', 'EOS/USDT:USDT',
+    'WAVES/USDT:USDT', 'NEO/USDT:USDT', 'QTUM/USDT:USDT', 'IOTA/USDT:USDT',
+    'XTZ/USDT:USDT', 'OMG/USDT:USDT', 'ZRX/USDT:USDT', 'KNC/USDT:USDT'
+]
+
+def _get_usdt_futures_tickers():
+    """USDT 선물 티커를 한 번의 fetch_tickers로 가져와 거래량 순으로 정렬"""
+    tickers = exchange_cache.call('fetch_tickers')
+    
+    # USDT 선물만 필터링하고 거래량 기준으로 정렬
+    usdt_futures = []
+    seen_symbols = set()  # 중복 방지를 위한 set
+    
+    for symbol, ticker in tickers.items():
+        if ':USDT' in symbol and 'USDT' in symbol:
+            # 이미 처리된 심볼인지 확인
+            if symbol in seen_symbols:
+                continue
+            
+            # 거래량 계산 (여러 방법 시도)
+            volume = 0
+            if 'quoteVolume' in ticker and ticker['quoteVolume']:
+                volume = ticker['quoteVolume']
+            elif 'baseVolume' in ticker and ticker['baseVolume'] and 'last' in ticker:
+                volume = ticker['baseVolume'] * ticker['last']
+            
+            if volume > 0:
+                usdt_futures.append({
+                    'symbol': symbol,
+                    'volume': volume,
+                    'price': ticker['last'] if 'last' in ticker else 0,
+                    'open': ticker.get('open')
+                })
+                seen_symbols.add(symbol)
+    
+    usdt_futures.sort(key=lambda x: x['volume'], reverse=True)
+    return usdt_futures
 
 def get_major_coins():
     """거래량 기준으로 주요 코인을 동적으로 찾는 메소드"""
     try:
-        # 모든 선물 티커 가져오기
-        tickers = binance.fetch_tickers()
-        
-        # USDT 선물만 필터링하고 거래량 기준으로 정렬
-        usdt_futures = []
-        seen_symbols = set()  # 중복 방지를 위한 set
-        
-        for symbol, ticker in tickers.items():
-            if ':USDT' in symbol and 'USDT' in symbol:
-                # 심볼 정규화 (중복 제거)
-                normalized_symbol = symbol
-                
-                # 이미 처리된 심볼인지 확인
-                if normalized_symbol in seen_symbols:
-                    continue
-                
-                # 거래량 계산 (여러 방법 시도)
-                volume = 0
-                if 'quoteVolume' in ticker and ticker['quoteVolume']:
-                    volume = ticker['quoteVolume']
-                elif 'baseVolume' in ticker and ticker['baseVolume'] and 'last' in ticker:
-                    volume = ticker['baseVolume'] * ticker['last']
-                
-                if volume > 0:
-                    usdt_futures.append({
-                        'symbol': normalized_symbol,
-                        'volume': volume,
-                        'price': ticker['last'] if 'last' in ticker else 0
-                    })
-                    seen_symbols.add(normalized_symbol)
-        
         # 거래량 순으로 정렬하고 상위 50개 선택
-        usdt_futures.sort(key=lambda x: x['volume'], reverse=True)
+        usdt_futures = _get_usdt_futures_tickers()
         major_coins = [item['symbol'] for item in usdt_futures[:50]]
         
         print(f"거래량 기준 상위 50개 코인 발견")
@@ -67,23 +211,9 @@ def get_major_coins():
     except Exception as e:
         print(f"Error fetching major coins: {e}")
         # 폴백: 기본 주요 코인 리스트
-        return [
-            'BTC/USDT:USDT', 'ETH/USDT:USDT', 'BNB/USDT:USDT', 'SOL/USDT:USDT',
-            'XRP/USDT:USDT', 'ADA/USDT:USDT', 'AVAX/USDT:USDT', 'DOGE/USDT:USDT',
-            'DOT/USDT:USDT', 'MATIC/USDT:USDT', 'LINK/USDT:USDT', 'UNI/USDT:USDT',
-            'LTC/USDT:USDT', 'BCH/USDT:USDT', 'ATOM/USDT:USDT', 'ETC/USDT:USDT',
-            'XLM/USDT:USDT', 'FIL/USDT:USDT', 'TRX/USDT:USDT', 'NEAR/USDT:USDT',
-            'APT/USDT:USDT', 'OP/USDT:USDT', 'ARB/USDT:USDT', 'MKR/USDT:USDT',
-            'AAVE/USDT:USDT', 'SAND/USDT:USDT', 'MANA/USDT:USDT', 'ALGO/USDT:USDT',
-            'VET/USDT:USDT', 'ICP/USDT:USDT', 'THETA/USDT:USDT', 'FTM/USDT:USDT',
-            'AXS/USDT:USDT', 'GALA/USDT:USDT', 'ROSE/USDT:USDT', 'CHZ/USDT:USDT',
-            'HOT/USDT:USDT', 'ZIL/USDT:USDT', 'ENJ/USDT:USDT', 'BAT/USDT:USDT',
-            'DASH/USDT:USDT', 'ZEC/USDT:USDT', 'XMR/USDT:USDT', 'EOS/USDT:USDT',
-            'WAVES/USDT:USDT', 'NEO/USDT:USDT', 'QTUM/USDT:USDT', 'IOTA/USDT:USDT',
-            'XTZ/USDT:USDT', 'OMG/USDT:USDT', 'ZRX/USDT:USDT', 'KNC/USDT:USDT'
-        ]
-
-def get_volatile_coins(min_volume=1000000, min_volatility=0.02, top_n=10):
+        return list(FALLBACK_MAJOR_COINS)
+
+def get_volatile_coins(min_volume=1000000, min_volatility=0.02, top_n=10, universe_size=50):
     """
     스캘핑에 적합한 고변동성 코인을 찾는 메소드
     
@@ -91,59 +221,73 @@ def get_volatile_coins(min_volume=1000000, min_volatility=0.02, top_n=10):
         min_volume: 최소 24시간 거래량 (USDT)
         min_volatility: 최소 변동성 (2% = 0.02)
         top_n: 상위 N개 코인 반환
+        universe_size: 거래량 상위 N개 심볼만 분석 (None이면 전체 선물 목록)
     
     Returns:
         변동성 순으로 정렬된 코인 리스트
     """
     try:
-        # 동적으로 주요 코인 찾기
-        major_coins = get_major_coins()
+        # 전체 티커 스냅샷 1회 조회 (실패 시 기본 코인 리스트 사용)
+        try:
+            usdt_futures = _get_usdt_futures_tickers()
+        except Exception as e:
+            print(f"Error fetching major coins: {e}")
+            usdt_futures = [{'symbol': symbol, 'price': None, 'open': None} for symbol in FALLBACK_MAJOR_COINS]
+        if universe_size is not None:
+            usdt_futures = usdt_futures[:universe_size]
         
-        print(f"총 {len(major_coins)}개의 주요 코인 분석 중...")
+        print(f"총 {len(usdt_futures)}개의 주요 코인 분석 중...")
         
-        # 변동성 계산
-        volatile_coins = []
-        for symbol in major_coins:
+        # 최근 24시간 1시간봉 동시 수집
+        def fetch_klines(symbol):
             try:
-                # 티커 정보 가져오기
-                ticker = binance.fetch_ticker(symbol)
-                
-                # 최근 24시간 OHLC 데이터 가져오기
-                ohlcv = binance.fetch_ohlcv(symbol, '1h', limit=24)
-                if len(ohlcv) >= 24:
-                    df = pd.DataFrame(ohlcv, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
-                    
-                    # 변동성 계산 (고가-저가)/저가
-                    high = df['high'].max()
-                    low = df['low'].min()
-                    volatility = (high - low) / low
-                    
-                    # 거래량 계산 (OHLCV 데이터에서)
-                    total_volume = df['volume'].sum() * ticker['last']
-                    
-                    # 최소 변동성 조건 확인
-                    if volatility >= min_volatility and total_volume >= min_volume:
-                        # 추가 지표 계산
-                        price_change_24h = (ticker['last'] - ticker['open']) / ticker['open'] if ticker['open'] else 0
-                        
-                        volatile_coins.append({
-                            'symbol': symbol,
-                            'current_price': ticker['last'],
-                            'volume_24h': total_volume,
-                            'volatility': volatility,
-                            'price_change_24h': price_change_24h,
-                            'high_24h': high,
-                            'low_24h': low
-                        })
-                        
-                        print(f"Found: {symbol} - Volatility: {volatility*100:.1f}%, Volume: {total_volume/1000000:.1f}M")
-                        
+                return exchange_cache.call('fetch_ohlcv', symbol, '1h', limit=24)
             except Exception as e:
                 print(f"Error analyzing {symbol}: {e}")
-                continue
+                return []
+        
+        symbols = [item['symbol'] for item in usdt_futures]
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            klines = list(executor.map(fetch_klines, symbols))
+        
+        # 24개 캔들이 모두 있는 심볼만 (심볼 × 시간) 행렬로 구성
+        valid = [i for i, candles in enumerate(klines) if len(candles) >= 24]
+        if not valid:
+            return []
+        matrix = np.array([klines[i][-24:] for i in valid], dtype=np.float64)  # (심볼, 24, 6)
         
-        # 변동성 순으로 정렬
-        volatile_coins.sort(key=lambda x: x['volatility'], reverse=True)
+        # 변동성 (고가-저가)/저가, 거래량 계산 (전체 심볼 한 번에)
+        high = matrix[:, :, 2].max(axis=1)
+        low = matrix[:, :, 3].min(axis=1)
+        volatility = (high - low) / low
+        
+        # 티커가 없으면 캔들로 현재가/24시간 시가 대체
+        last = np.array([usdt_futures[i]['price'] or np.nan for i in valid], dtype=np.float64)
+        last = np.where(np.isnan(last), matrix[:, -1, 4], last)
+        open_24h = np.array([usdt_futures[i]['open'] or np.nan for i in valid], dtype=np.float64)
+        open_24h = np.where(np.isnan(open_24h), matrix[:, 0, 1], open_24h)
+        
+        total_volume = matrix[:, :, 5].sum(axis=1) * last
+        price_change_24h = np.where(open_24h > 0, (last - open_24h) / np.where(open_24h > 0, open_24h, 1), 0)
+        
+        # 최소 변동성/거래량 조건 확인 후 변동성 순으로 정렬
+        selected = np.flatnonzero((volatility >= min_volatility) & (total_volume >= min_volume))
+        selected = selected[np.argsort(-volatility[selected], kind='stable')]
+        
+        volatile_coins = []
+        for row in selected:
+            symbol = symbols[valid[row]]
+            volatile_coins.append({
+                'symbol': symbol,
+                'current_price': float(last[row]),
+                'volume_24h': float(total_volume[row]),
+                'volatility': float(volatility[row]),
+                'price_change_24h': float(price_change_24h[row]),
+                'high_24h': float(high[row]),
+                'low_24h': float(low[row])
+            })
+            
+            print(f"Found: {symbol} - Volatility: {volatility[row]*100:.1f}%, Volume: {total_volume[row]/1000000:.1f}M")
         
         # 상위 N개만 반환
         return volatile_coins[:top_n]
@@ -171,7 +315,919 @@ def print_volatile_coins(coins):
     
     print("="*80)
 
+# 로컬 캔들 저장소 설정
+CANDLE_STORE_DIR = os.environ.get('CANDLE_STORE_DIR', 'candle_data')
+CANDLE_STORE_READONLY = os.environ.get('CANDLE_STORE_READONLY', '').lower() in ('1', 'true', 'yes')
+CANDLE_COLUMNS = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+# 고정 길이 타임프레임만 저장 (주봉/월봉은 거래소 정렬 기준이 달라 제외)
+STORE_TIMEFRAMES = ('1m', '3m', '5m', '15m', '30m', '1h', '2h', '4h', '6h', '8h', '12h', '1d')
+
+# 상위 타임프레임은 1분봉 기준 데이터에서 로컬 리샘플링으로 생성
+BASE_TIMEFRAME = '1m'
+RESAMPLE_TIMEFRAMES = STORE_TIMEFRAMES[1:]
+MAX_RESAMPLE_BASE_CANDLES = 60 * 24 * 45  # 1분봉 45일치 초과 구간은 해당 타임프레임으로 직접 수집
+
+def resample_ohlcv(timestamps, ohlcv, timeframe_ms):
+    """OHLCV 벡터화 리샘플링 (타임스탬프를 타임프레임 경계로 내림) -> (타임스탬프, OHLCV)"""
+    if len(timestamps) == 0:
+        return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+    
+    buckets = timestamps // timeframe_ms * timeframe_ms
+    starts = np.concatenate([[0], np.flatnonzero(np.diff(buckets)) + 1])
+    ends = np.concatenate([starts[1:], [len(buckets)]]) - 1
+    
+    resampled = np.empty((len(starts), 5), dtype=np.float64)
+    resampled[:, 0] = ohlcv[starts, 0]                        # 시가: 첫 캔들
+    resampled[:, 1] = np.maximum.reduceat(ohlcv[:, 1], starts)  # 고가
+    resampled[:, 2] = np.minimum.reduceat(ohlcv[:, 2], starts)  # 저가
+    resampled[:, 3] = ohlcv[ends, 3]                          # 종가: 마지막 캔들
+    resampled[:, 4] = np.add.reduceat(ohlcv[:, 4], starts)      # 거래량 합계
+    return buckets[starts], resampled
+
+def merge_ranges(ranges, step):
+    """겹치거나 맞닿은 [start, end] 구간 병합"""
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + step:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+def find_candle_gaps(timestamps, timeframe_ms, since, until):
+    """[since, until] 구간에서 빠진 캔들 구간 탐지 (벡터화) -> [[start, end], ...]"""
+    lo, hi = np.searchsorted(timestamps, [since, until + 1])
+    window = timestamps[lo:hi]
+    if len(window) == 0:
+        return [[since, until]] if since <= until else []
+    # 구간 경계를 포함해 연속 캔들 간격 검사
+    edges = np.concatenate([[since - timeframe_ms], window, [until + timeframe_ms]])
+    holes = np.flatnonzero(np.diff(edges) > timeframe_ms)
+    return [[int(edges[i] + timeframe_ms), int(edges[i + 1] - timeframe_ms)] for i in holes]
+
+class CandleStore:
+    """로컬 OHLCV 캔들 저장소 (심볼/타임프레임별 컬럼 파일, append-only)"""
+    
+    def __init__(self, root=CANDLE_STORE_DIR, readonly=False):
+        self.root = root
+        self.readonly = readonly  # True면 저장은 writer 프로세스에 맡기고 읽기만 함
+        self._lock = threading.Lock()
+        self._resampled = {}  # (symbol, timeframe) -> 리샘플링 결과 캐시
+        self._maps = {}  # 경로 -> (행 수, inode, 컬럼별 memmap)
+    
+    def _series_dir(self, symbol, timeframe):
+        """심볼/타임프레임별 저장 경로"""
+        safe_symbol = symbol.replace('/', '_').replace(':', '-')
+        return os.path.join(self.root, safe_symbol, timeframe)
+    
+    def _read_meta(self, path):
+        """메타 정보 읽기 (저장된 행 수)"""
+        meta_path = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_path):
+            return {'rows': 0}
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _write_meta(self, path, meta):
+        """메타 정보 저장 (원자적 교체)"""
+        tmp_path = os.path.join(path, 'meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, os.path.join(path, 'meta.json'))
+    
+    @contextlib.contextmanager
+    def _series_lock(self, path, exclusive):
+        """프로세스 간 잠금 - 쓰기는 한 프로세스만 (LOCK_EX), 읽기는 공유 (LOCK_SH)
+        
+        잠금 파일은 writer만 생성 - reader는 읽기 전용으로 열어 읽기 전용 저장소에서도 동작 (파일이 없으면 잠금 생략)
+        """
+        if fcntl is None or not os.path.isdir(path):
+            yield
+            return
+        lock_path = os.path.join(path, '.lock')
+        try:
+            fd = os.open(lock_path, os.O_RDWR | os.O_CREAT if exclusive else os.O_RDONLY, 0o644)
+        except FileNotFoundError:
+            yield  # 아직 writer가 없음
+            return
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+    
+    def _map_columns(self, path):
+        """컬럼 파일을 읽기 전용 memmap으로 매핑 (meta의 행 수까지만) -> {컬럼: 배열} 또는 None
+        
+        여러 프로세스가 같은 파일을 매핑하면 OS 페이지 캐시를 공유하므로 소비자 수와 무관하게 메모리 사용량이 일정
+        """
+        rows = self._read_meta(path)['rows']
+        if rows == 0:
+            return None
+        inode = os.stat(os.path.join(path, 'timestamp.bin')).st_ino
+        cached = self._maps.get(path)
+        if cached is not None and cached[0] == rows and cached[1] == inode:
+            return cached[2]
+        columns = {
+            column: np.memmap(os.path.join(path, f'{column}.bin'), mode='r', shape=(rows,),
+                              dtype=np.int64 if column == 'timestamp' else np.float64)
+            for column in CANDLE_COLUMNS
+        }
+        self._maps[path] = (rows, inode, columns)
+        return columns
+    
+    def open_columns(self, symbol, timeframe):
+        """저장된 컬럼을 읽기 전용 memmap으로 열기 (공유 잠금으로 쓰기 중인 파일과 섞이지 않게)"""
+        path = self._series_dir(symbol, timeframe)
+        with self._series_lock(path, exclusive=False):
+            return self._map_columns(path)
+    
+    @staticmethod
+    def _stack_ohlcv(columns, start=0):
+        """컬럼 memmap -> (n, 5) OHLCV 배열 (start 이후만 복사)"""
+        if columns is None:
+            return np.empty((0, 5), dtype=np.float64)
+        return np.column_stack([columns[column][start:] for column in CANDLE_COLUMNS[1:]])
+    
+    def load(self, symbol, timeframe, since=None):
+        """저장된 캔들 불러오기 -> (timestamp int64 배열(읽기 전용 뷰), (n, 5) float64 OHLCV 배열)"""
+        columns = self.open_columns(symbol, timeframe)
+        if columns is None:
+            return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+        timestamps = np.asarray(columns['timestamp'])
+        start = int(np.searchsorted(timestamps, since)) if since is not None else 0
+        return timestamps[start:], self._stack_ohlcv(columns, start)
+    
+    def series(self):
+        """저장된 (심볼, 타임프레임) 목록"""
+        result = []
+        if not os.path.isdir(self.root):
+            return result
+        for symbol_dir in sorted(os.listdir(self.root)):
+            symbol_path = os.path.join(self.root, symbol_dir)
+            if not os.path.isdir(symbol_path):
+                continue
+            for timeframe in sorted(os.listdir(symbol_path)):
+                meta = self._read_meta(os.path.join(symbol_path, timeframe))
+                if meta.get('rows') and 'symbol' in meta:
+                    result.append((meta['symbol'], meta['timeframe']))
+        return result
+    
+    def load_candles(self, symbol, timeframe, since=None, dtype=np.float64):
+        """저장된 캔들을 CandleArray로 불러오기 (float64면 memmap 제로카피 읽기 전용 뷰)"""
+        columns = self.open_columns(symbol, timeframe)
+        if columns is None:
+            return CandleArray.from_arrays(np.empty(0, dtype=np.int64), np.empty((0, 5)), dtype=dtype)
+        timestamps = np.asarray(columns['timestamp'])
+        start = int(np.searchsorted(timestamps, since)) if since is not None else 0
+        return CandleArray(timestamps[start:], *(np.asarray(columns[column][start:], dtype=dtype)
+                                                 for column in CANDLE_COLUMNS[1:]))
+    
+    def load_resampled(self, symbol, timeframe, since=None, extra=None):
+        """1분봉 기준 데이터에서 상위 타임프레임 생성 - 새 1분봉이 추가되면 마지막 구간만 재계산"""
+        timeframe_ms = get_timeframe_ms(timeframe)
+        columns = self.open_columns(symbol, BASE_TIMEFRAME)
+        base_ts = np.asarray(columns['timestamp']) if columns is not None else np.empty(0, dtype=np.int64)
+        key = (symbol, timeframe)
+        
+        with self._lock:
+            cached = self._resampled.get(key)
+            if (cached is None or len(base_ts) < cached['base_rows']
+                    or (len(base_ts) and base_ts[0] != cached['base_first'])
+                    or base_ts[cached['last_base_idx']] != cached['last_base_ts']):
+                # 전체 계산 (첫 조회 또는 과거 구간이 바뀐 경우 - 중간 공백 보충으로 행 위치가 밀린 경우 포함)
+                timestamps, ohlcv = resample_ohlcv(base_ts, self._stack_ohlcv(columns), timeframe_ms)
+            elif len(base_ts) > cached['base_rows']:
+                # 증분 계산: 마지막 (미완성일 수 있는) 구간부터 다시 계산
+                tail_start = cached['last_base_idx']
+                tail_ts, tail_ohlcv = resample_ohlcv(base_ts[tail_start:], self._stack_ohlcv(columns, tail_start), timeframe_ms)
+                timestamps = np.concatenate([cached['timestamps'][:-1], tail_ts])
+                ohlcv = np.concatenate([cached['ohlcv'][:-1], tail_ohlcv])
+            else:
+                timestamps, ohlcv = cached['timestamps'], cached['ohlcv']
+            
+            if len(timestamps):
+                last_base_idx = int(np.searchsorted(base_ts, timestamps[-1]))
+                self._resampled[key] = {
+                    'base_first': base_ts[0],
+                    'base_rows': len(base_ts),
+                    'last_base_idx': last_base_idx,
+                    'last_base_ts': int(base_ts[last_base_idx]),
+                    'timestamps': timestamps,
+                    'ohlcv': ohlcv,
+                }
+        
+        # 진행 중인 1분봉 반영 (저장하지 않고 마지막 구간만 다시 계산)
+        if extra is not None and len(extra):
+            tail_start = int(np.searchsorted(base_ts, extra[0, 0] // timeframe_ms * timeframe_ms))
+            tail_ts, tail_ohlcv = resample_ohlcv(
+                np.concatenate([base_ts[tail_start:], extra[:, 0].astype(np.int64)]),
+                np.concatenate([self._stack_ohlcv(columns, tail_start), extra[:, 1:]]), timeframe_ms)
+            keep = int(np.searchsorted(timestamps, tail_ts[0]))
+            timestamps = np.concatenate([timestamps[:keep], tail_ts])
+            ohlcv = np.concatenate([ohlcv[:keep], tail_ohlcv])
+        
+        start = int(np.searchsorted(timestamps, since)) if since is not None else 0
+        return timestamps[start:], ohlcv[start:]
+    
+    def bounds(self, symbol, timeframe):
+        """저장된 첫/마지막 캔들 타임스탬프 (없으면 None)"""
+        columns = self.open_columns(symbol, timeframe)
+        if columns is None:
+            return None
+        return int(columns['timestamp'][0]), int(columns['timestamp'][-1])
+    
+    def write(self, symbol, timeframe, candles, covered=None):
+        """캔들 저장 - 최신 캔들은 파일 끝에 추가, 과거 캔들이 섞이면 병합 후 재작성
+        
+        covered: 거래소에 실제로 요청한 (since, until) 구간 - 데이터가 없어도 수집 완료로 기록
+        """
+        data = np.asarray(candles if candles is not None else [], dtype=np.float64).reshape(-1, 6)
+        if len(data) == 0 and covered is None:
+            return 0
+        timestamps = data[:, 0].astype(np.int64)
+        # 정렬 + 중복 제거 (한 번의 벡터 연산)
+        timestamps, unique_idx = np.unique(timestamps, return_index=True)
+        ohlcv = data[unique_idx, 1:]
+        timeframe_ms = get_timeframe_ms(timeframe)
+        
+        path = self._series_dir(symbol, timeframe)
+        os.makedirs(path, exist_ok=True)
+        # 스레드 잠금 + 프로세스 간 배타 잠금 - 한 번에 한 writer만 추가, 행 수(meta)는 데이터 기록 후 갱신
+        with self._lock, self._series_lock(path, exclusive=True):
+            meta = self._read_meta(path)
+            columns = self._map_columns(path)
+            stored_ts = np.asarray(columns['timestamp']) if columns is not None else np.empty(0, dtype=np.int64)
+            added = 0
+            
+            if len(timestamps) == 0:
+                all_ts = stored_ts
+            elif len(stored_ts) == 0 or timestamps[0] > stored_ts[-1]:
+                # 빠른 경로: 파일 끝에 추가
+                self._append(path, meta['rows'], timestamps, ohlcv)
+                all_ts = np.concatenate([stored_ts, timestamps])
+                added = len(timestamps)
+            else:
+                # 느린 경로: 기존 데이터와 병합 (기존 캔들 우선)
+                merged_ts = np.concatenate([stored_ts, timestamps])
+                merged_ohlcv = np.concatenate([self._stack_ohlcv(columns), ohlcv])
+                merged_ts, unique_idx = np.unique(merged_ts, return_index=True)
+                merged_ohlcv = merged_ohlcv[unique_idx]
+                self._rewrite(path, merged_ts, merged_ohlcv)
+                if timeframe == BASE_TIMEFRAME:
+                    # 중간에 행이 끼어들었으므로 이 심볼의 리샘플링 캐시는 증분 갱신 불가
+                    for cached_key in [cached_key for cached_key in self._resampled if cached_key[0] == symbol]:
+                        del self._resampled[cached_key]
+                all_ts = merged_ts
+                added = len(merged_ts) - len(stored_ts)
+            
+            # 수집 구간 인덱스 갱신 (없으면 저장된 캔들 범위로 초기화)
+            coverage = meta.get('coverage')
+            if coverage is None:
+                coverage = [[int(stored_ts[0]), int(stored_ts[-1])]] if len(stored_ts) else []
+            if covered is not None:
+                covered = (int(covered[0]), int(covered[1]))
+            elif len(timestamps):
+                covered = (int(timestamps[0]), int(timestamps[-1]))
+            if covered is not None and covered[0] <= covered[1]:
+                coverage = merge_ranges(coverage + [list(covered)], timeframe_ms)
+                # 수집 구간 안에서 빠진 캔들 (거래소 측 공백) 벡터 탐지 - 해당 구간의 기존 기록은 갱신
+                new_gaps = find_candle_gaps(all_ts, timeframe_ms, covered[0], covered[1])
+                old_gaps = [gap for gap in meta.get('gaps', []) if gap[1] < covered[0] or gap[0] > covered[1]]
+                if new_gaps:
+                    print(f"  ⚠️ {symbol} {timeframe} 캔들 누락 구간 {len(new_gaps)}개 발견")
+                meta['gaps'] = merge_ranges(old_gaps + new_gaps, timeframe_ms)
+            
+            meta.update({'symbol': symbol, 'timeframe': timeframe, 'rows': len(all_ts), 'coverage': coverage})
+            self._write_meta(path, meta)
+        return added
+    
+    def coverage(self, symbol, timeframe):
+        """수집 완료 구간 목록 [[start, end], ...] (양 끝 포함)"""
+        path = self._series_dir(symbol, timeframe)
+        meta = self._read_meta(path)
+        if 'coverage' in meta:
+            return meta['coverage']
+        bounds = self.bounds(symbol, timeframe)
+        return [list(bounds)] if bounds else []
+    
+    def gaps(self, symbol, timeframe):
+        """수집 구간 안에서 거래소에 캔들이 없던 구간 목록"""
+        return self._read_meta(self._series_dir(symbol, timeframe)).get('gaps', [])
+    
+    def is_covered(self, symbol, timeframe, t0, t1):
+        """[t0, t1] 구간이 모두 수집되었는지 확인"""
+        coverage = self.coverage(symbol, timeframe)
+        starts = [start for start, _ in coverage]
+        idx = bisect.bisect_right(starts, t0) - 1
+        return idx >= 0 and coverage[idx][1] >= t1
+    
+    def missing_ranges(self, symbol, timeframe, t0, t1):
+        """[t0, t1] 중 아직 수집하지 않은 구간 목록 (타임프레임 경계 기준)"""
+        timeframe_ms = get_timeframe_ms(timeframe)
+        missing = []
+        cursor = t0
+        for start, end in self.coverage(symbol, timeframe):
+            if end < cursor:
+                continue
+            if start > t1:
+                break
+            if start > cursor:
+                missing.append([cursor, min(start - timeframe_ms, t1)])
+            cursor = max(cursor, end + timeframe_ms)
+            if cursor > t1:
+                break
+        if cursor <= t1:
+            missing.append([cursor, t1])
+        return missing
+    
+    def _append(self, path, rows, timestamps, ohlcv):
+        """컬럼 파일 끝에 추가 - 먼저 meta에 기록된 행 수까지 잘라 중단된 이전 추가의 잔여 바이트 제거
+        
+        컬럼 파일마다 따로 추가하므로 도중에 중단되면 파일 길이가 서로 달라짐 (meta는 마지막에 갱신되어 이전 행 수 유지)
+        """
+        columns = [('timestamp', timestamps)] + [(column, ohlcv[:, col_idx]) for col_idx, column in enumerate(CANDLE_COLUMNS[1:])]
+        for column, values in columns:
+            column_path = os.path.join(path, f'{column}.bin')
+            values = np.ascontiguousarray(values)
+            if os.path.exists(column_path) and os.path.getsize(column_path) != rows * values.itemsize:
+                os.truncate(column_path, rows * values.itemsize)
+            with open(column_path, 'ab') as f:
+                values.tofile(f)
+    
+    def _rewrite(self, path, timestamps, ohlcv):
+        """컬럼 파일 전체 재작성 (임시 파일 후 원자적 교체)"""
+        columns = [('timestamp', timestamps)] + [(column, ohlcv[:, col_idx]) for col_idx, column in enumerate(CANDLE_COLUMNS[1:])]
+        for column, values in columns:
+            tmp_path = os.path.join(path, f'{column}.bin.tmp')
+            np.ascontiguousarray(values).tofile(tmp_path)
+            os.replace(tmp_path, os.path.join(path, f'{column}.bin'))
+
+# 전역 캔들 저장소
+candle_store = CandleStore(readonly=CANDLE_STORE_READONLY)
+
+class TokenBucket:
+    """토큰 버킷 방식 API 가중치 제한기 (바이낸스 request weight 기준)"""
+    
+    def __init__(self, capacity=2400, period=60.0):
+        self.capacity = capacity              # 기간당 최대 가중치
+        self.refill_rate = capacity / period  # 초당 충전 가중치
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._cond = threading.Condition()
+    
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_rate)
+        self.updated_at = now
+    
+    def try_acquire(self, weight=1):
+        """대기 없이 토큰 차감 시도 (부족하면 False)"""
+        with self._cond:
+            self._refill()
+            if self.tokens < weight:
+                return False
+            self.tokens -= weight
+            return True
+    
+    def acquire(self, weight=1):
+        """가중치만큼 토큰이 찰 때까지 대기 후 차감"""
+        weight = min(weight, self.capacity)
+        with self._cond:
+            self._refill()
+            while self.tokens < weight:
+                self._cond.wait((weight - self.tokens) / self.refill_rate)
+                self._refill()
+            self.tokens -= weight
+
+# 바이낸스 선물 API 가중치 (분당 2400)
+binance_rate_limiter = TokenBucket(capacity=2400, period=60.0)
+
+def get_klines_weight(limit):
+    """바이낸스 선물 klines 요청 가중치 (limit 구간별)"""
+    if limit < 100:
+        return 1
+    elif limit < 500:
+        return 2
+    elif limit <= 1000:
+        return 5
+    return 10
+
+def download_ohlcv_range(symbol, timeframe, since, until, exchange=None, rate_limiter=None, max_workers=8):
+    """[since, until] 구간 캔들을 페이지 단위로 동시 수집 -> (n, 6) float64 배열 (정렬/중복 제거)"""
+    exchange = exchange or binance
+    rate_limiter = rate_limiter or binance_rate_limiter
+    max_candles_per_request = 1000  # 바이낸스 API 최대 제한
+    timeframe_ms = get_timeframe_ms(timeframe)
+    
+    # 모든 페이지의 since 구간을 미리 계산
+    page_span = max_candles_per_request * timeframe_ms
+    pages = [(page_since, min(max_candles_per_request, (until - page_since) // timeframe_ms + 1))
+             for page_since in range(since, until + 1, page_span)]
+    if not pages:
+        return np.empty((0, 6), dtype=np.float64)
+    
+    def fetch_page(page):
+        page_since, page_limit = page
+        for attempt in range(3):
+            rate_limiter.acquire(get_klines_weight(page_limit))
+            try:
+                return exchange.fetch_ohlcv(symbol, timeframe=timeframe, since=page_since, limit=page_limit)
+            except Exception as e:
+                if attempt == 2:
+                    # 빈 페이지로 넘기면 저장소에 수집 완료로 기록되므로 실패를 그대로 전달
+                    print(f"  ⚠️ 페이지 수집 실패 ({page_since}): {e}")
+                    raise
+                time.sleep(0.5 * (attempt + 1))
+    
+    if len(pages) == 1:
+        results = [fetch_page(pages[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pages))) as executor:
+            results = list(executor.map(fetch_page, pages))
+    
+    # 페이지 병합 + 구간 필터 + 중복 제거 (한 번의 벡터 연산)
+    results = [np.asarray(candles, dtype=np.float64).reshape(-1, 6) for candles in results if candles]
+    if not results:
+        return np.empty((0, 6), dtype=np.float64)
+    merged = np.concatenate(results)
+    merged = merged[(merged[:, 0] >= since) & (merged[:, 0] <= until)]
+    _, unique_idx = np.unique(merged[:, 0], return_index=True)
+    return merged[unique_idx]
+
+class ReplayRateLimitExceeded(Exception):
+    """리플레이 거래소 요청 가중치 초과 (바이낸스 HTTP 429 대응)"""
+    pass
+
+class ReplayExchange:
+    """저장된 캔들 파일을 재생하는 오프라인 거래소 (ccxt 사용 메소드 일부 구현)"""
+    
+    def __init__(self, root=CANDLE_STORE_DIR, initial_balance=10000, commission=0.0004,
+                 latency_ms=0, rate_limit=None, start_time=None, speed=1.0):
+        self.store = CandleStore(root)
+        self.commission = commission
+        self.latency = latency_ms / 1000
+        # rate_limit: (기간당 가중치, 기간 초) - None이면 무제한
+        self.rate_limiter = TokenBucket(*rate_limit) if rate_limit else None
+        self.speed = speed  # 리플레이 시계 배속 (0이면 고정)
+        self.balance = {'free': float(initial_balance), 'used': 0.0}
+        self.positions = {}  # symbol -> {'amount': 부호 있는 수량, 'price': 평균 진입가, 'margin': 증거금}
+        self.leverage = {}
+        self.orders = []
+        self._order_seq = 0
+        self._lock = threading.Lock()
+        # 기록 파일은 리플레이 중 바뀌지 않으므로 목록/memmap은 한 번만 조회
+        self._series = None
+        self._column_maps = {}
+        
+        self._clock_start = start_time  # None이면 첫 조회 시 결정
+        self._clock_origin = time.monotonic()
+    
+    def milliseconds(self):
+        """리플레이 시계 (ms)"""
+        if self._clock_start is None:
+            # 기본값: 저장된 데이터의 마지막 캔들 직후
+            ends = [int(columns['timestamp'][-1]) + get_timeframe_ms(timeframe)
+                    for symbol, timeframe in self._recorded_series()
+                    for columns in [self._columns(symbol, timeframe)] if columns is not None]
+            self.set_time(max(ends) if ends else int(time.time() * 1000))
+        return int(self._clock_start + (time.monotonic() - self._clock_origin) * 1000 * self.speed)
+    
+    def set_time(self, timestamp_ms):
+        """리플레이 시계 이동"""
+        self._clock_start = timestamp_ms
+        self._clock_origin = time.monotonic()
+    
+    def _request(self, weight=1):
+        """지연 시간/요청 가중치 모의"""
+        if self.rate_limiter and not self.rate_limiter.try_acquire(weight):
+            raise ReplayRateLimitExceeded(f"request weight exceeded ({weight})")
+        if self.latency:
+            time.sleep(self.latency)
+    
+    def _recorded_series(self):
+        """기록된 (심볼, 타임프레임) 목록"""
+        if self._series is None:
+            self._series = self.store.series()
+        return self._series
+    
+    def _columns(self, symbol, timeframe):
+        """기록된 컬럼 memmap (없으면 None)"""
+        key = (symbol, timeframe)
+        if key not in self._column_maps:
+            self._column_maps[key] = self.store.open_columns(symbol, timeframe)
+        return self._column_maps[key]
+    
+    def _candles_until_now(self, symbol, timeframe, since=None, limit=None):
+        """현재 리플레이 시각까지 알 수 있는 캔들만 반환 - 마감된 캔들 + 진행 중 캔들
+        
+        since부터 limit개 또는 마지막 limit개 구간만 memmap에서 잘라 복사 (둘 다 없으면 전체)
+        진행 중 캔들은 미래의 고가/저가/종가를 쓰지 않도록 더 짧은 기록 타임프레임의 마감 캔들로 다시 구성
+        """
+        columns = self._columns(symbol, timeframe)
+        if columns is None:
+            return np.empty(0, dtype=np.int64), np.empty((0, 5), dtype=np.float64)
+        now = self.milliseconds()
+        timeframe_ms = get_timeframe_ms(timeframe)
+        timestamps = columns['timestamp']
+        closed = int(np.searchsorted(timestamps, now - timeframe_ms, side='right'))  # ts + 타임프레임 <= now
+        opened = int(np.searchsorted(timestamps, now, side='right'))
+        if since is not None:
+            start = min(int(np.searchsorted(timestamps, since)), opened)
+            end = min(start + limit, opened) if limit else opened
+        else:
+            start, end = (max(opened - limit, 0) if limit else 0), opened
+        
+        ohlcv = np.column_stack([columns[column][min(start, closed):min(end, closed)] for column in CANDLE_COLUMNS[1:]])
+        if end > closed:
+            forming = self._forming_candle(symbol, timeframe_ms, int(timestamps[closed]), now,
+                                           float(columns['open'][closed]))
+            ohlcv = np.vstack([ohlcv, forming])
+        return np.array(timestamps[start:end]), ohlcv
+    
+    def _forming_candle(self, symbol, timeframe_ms, open_time, now, open_price):
+        """open_time에 열린 캔들의 now 시점 OHLCV - 더 짧은 타임프레임에 마감 캔들이 없으면 시가만 반영"""
+        finer = [timeframe for series_symbol, timeframe in self._recorded_series()
+                 if series_symbol == symbol and get_timeframe_ms(timeframe) < timeframe_ms]
+        if finer:
+            finer_timeframe = min(finer, key=get_timeframe_ms)
+            columns = self._columns(symbol, finer_timeframe)
+            first = int(np.searchsorted(columns['timestamp'], open_time))
+            last = int(np.searchsorted(columns['timestamp'], now - get_timeframe_ms(finer_timeframe), side='right'))
+            if last > first:
+                return [open_price, max(open_price, float(columns['high'][first:last].max())),
+                        min(open_price, float(columns['low'][first:last].min())),
+                        float(columns['close'][last - 1]), float(columns['volume'][first:last].sum())]
+        return [open_price, open_price, open_price, open_price, 0.0]
+    
+    def _finest_timeframe(self, symbol):
+        timeframes = [timeframe for series_symbol, timeframe in self._recorded_series() if series_symbol == symbol]
+        if not timeframes:
+            raise KeyError(f"recorded candles not found: {symbol}")
+        return min(timeframes, key=get_timeframe_ms)
+    
+    def _last_price(self, symbol):
+        timestamps, ohlcv = self._candles_until_now(symbol, self._finest_timeframe(symbol), limit=1)
+        if len(timestamps) == 0:
+            raise KeyError(f"no candle before replay time: {symbol}")
+        return float(ohlcv[-1, 3])
+    
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None, params=None):
+        """ccxt fetch_ohlcv 호환 ([[ts, o, h, l, c, v], ...])"""
+        limit = limit or 500
+        self._request(get_klines_weight(limit))
+        if (symbol, timeframe) not in self._recorded_series() and timeframe in RESAMPLE_TIMEFRAMES:
+            # 기록되지 않은 타임프레임은 1분봉에서 필요한 구간만 리샘플링
+            timeframe_ms = get_timeframe_ms(timeframe)
+            window_start = (since or 0) // timeframe_ms * timeframe_ms
+            if since is None:
+                last_ts, _ = self._candles_until_now(symbol, BASE_TIMEFRAME, limit=1)
+                if len(last_ts):
+                    window_start = last_ts[-1] // timeframe_ms * timeframe_ms - (limit - 1) * timeframe_ms
+            timestamps, ohlcv = self._candles_until_now(symbol, BASE_TIMEFRAME, since=window_start)
+            timestamps, ohlcv = resample_ohlcv(timestamps, ohlcv, timeframe_ms)
+        else:
+            timestamps, ohlcv = self._candles_until_now(symbol, timeframe, since=since, limit=limit)
+        if since is None:
+            start = max(len(timestamps) - limit, 0)
+        else:
+            start = int(np.searchsorted(timestamps, since))
+        end = min(start + limit, len(timestamps))
+        return [[int(ts)] + row for ts, row in zip(timestamps[start:end], ohlcv[start:end].tolist())]
+    
+    def _build_ticker(self, symbol):
+        timeframe = self._finest_timeframe(symbol)
+        timestamps, _ = self._candles_until_now(symbol, timeframe, limit=1)
+        if len(timestamps) == 0:
+            return None
+        timestamps, ohlcv = self._candles_until_now(symbol, timeframe, since=int(timestamps[-1]) - 24 * 60 * 60 * 1000)
+        day = timestamps >= timestamps[-1] - 24 * 60 * 60 * 1000
+        last = float(ohlcv[-1, 3])
+        base_volume = float(ohlcv[day, 4].sum())
+        return {
+            'symbol': symbol,
+            'timestamp': int(timestamps[-1]),
+            'open': float(ohlcv[day, 0][0]),
+            'high': float(ohlcv[day, 1].max()),
+            'low': float(ohlcv[day, 2].min()),
+            'last': last,
+            'close': last,
+            'baseVolume': base_volume,
+            'quoteVolume': base_volume * last,
+        }
+    
+    def fetch_ticker(self, symbol, params=None):
+        self._request(EXCHANGE_WEIGHTS['fetch_ticker'])
+        return self._build_ticker(symbol)
+    
+    def fetch_tickers(self, symbols=None, params=None):
+        self._request(EXCHANGE_WEIGHTS['fetch_tickers'])
+        recorded = sorted({symbol for symbol, _ in self._recorded_series()})
+        tickers = {symbol: self._build_ticker(symbol) for symbol in (symbols or recorded)}
+        return {symbol: ticker for symbol, ticker in tickers.items() if ticker}
+    
+    def fetch_balance(self, params=None):
+        """ccxt fetch_balance 호환 (USDT 단일 자산)"""
+        self._request(EXCHANGE_WEIGHTS['fetch_balance'])
+        with self._lock:
+            free = self.balance['free']
+            used = sum(position['margin'] for position in self.positions.values())
+        usdt = {'free': free, 'used': used, 'total': free + used}
+        return {'USDT': usdt, 'free': {'USDT': free}, 'used': {'USDT': used}, 'total': {'USDT': free + used}}
+    
+    fetchBalance = fetch_balance
+    
+    def set_leverage(self, leverage, symbol=None, params=None):
+        self._request(1)
+        self.leverage[symbol] = leverage
+        return {'symbol': symbol, 'leverage': leverage}
+    
+    def _create_market_order(self, symbol, side, amount):
+        """시장가 주문 즉시 체결 (현재 리플레이 시각까지 알려진 마지막 가격 기준)"""
+        self._request(1)
+        price = self._last_price(symbol)
+        leverage = self.leverage.get(symbol, 1)
+        signed_amount = amount if side == 'buy' else -amount
+        commission_cost = amount * price * self.commission
+        
+        with self._lock:
+            position = self.positions.get(symbol, {'amount': 0.0, 'price': price, 'margin': 0.0})
+            if position['amount'] == 0 or (position['amount'] > 0) == (signed_amount > 0):
+                # 신규 진입/추가 진입
+                new_amount = position['amount'] + signed_amount
+                position['price'] = (abs(position['amount']) * position['price'] + amount * price) / abs(new_amount)
+                position['amount'] = new_amount
+                margin = amount * price / leverage
+                position['margin'] += margin
+                self.balance['free'] -= margin + commission_cost
+            else:
+                # 청산 (반대 방향 초과분은 신규 진입)
+                closed = min(amount, abs(position['amount']))
+                direction = 1 if position['amount'] > 0 else -1
+                released = position['margin'] * closed / abs(position['amount'])
+                pnl = (price - position['price']) * closed * direction
+                position['margin'] -= released
+                position['amount'] += closed * -direction
+                self.balance['free'] += released + pnl - commission_cost
+                remainder = amount - closed
+                if remainder > 0:
+                    margin = remainder * price / leverage
+                    position = {'amount': remainder * -direction, 'price': price, 'margin': margin}
+                    self.balance['free'] -= margin
+            if position['amount'] == 0:
+                self.positions.pop(symbol, None)
+            else:
+                self.positions[symbol] = position
+            
+            self._order_seq += 1
+            order = {
+                'id': f"replay-{self._order_seq}",
+                'symbol': symbol,
+                'type': 'market',
+                'side': side,
+                'amount': amount,
+                'filled': amount,
+                'price': price,
+                'average': price,
+                'cost': amount * price,
+                'fee': {'currency': 'USDT', 'cost': commission_cost},
+                'status': 'closed',
+                'timestamp': self.milliseconds(),
+            }
+            self.orders.append(order)
+        return order
+    
+    def create_market_buy_order(self, symbol, amount, params=None):
+        return self._create_market_order(symbol, 'buy', amount)
+    
+    def create_market_sell_order(self, symbol, amount, params=None):
+        return self._create_market_order(symbol, 'sell', amount)
+
+def load_credentials():
+    """API 인증 정보 조회 (환경 변수 우선, 없으면 .env 파일)"""
+    api_key = os.environ.get('API_KEY')
+    secret_key = os.environ.get('SECRET_KEY')
+    if (not api_key or not secret_key) and os.path.exists('.env'):
+        with open('.env', 'r') as f:
+            values = dict(line.strip().split('=', 1) for line in f if '=' in line)
+        api_key = api_key or values.get('API_KEY')
+        secret_key = secret_key or values.get('SECRET_KEY')
+    if not api_key or not secret_key:
+        raise RuntimeError("바이낸스 API 키가 없습니다. .env 파일 또는 API_KEY/SECRET_KEY 환경 변수를 설정하세요.")
+    return api_key, secret_key
+
+def create_binance_client():
+    """바이낸스 선물 클라이언트 생성 (ccxt는 이 시점에 로드)"""
+    import ccxt
+    
+    api_key, secret_key = load_credentials()
+    return ccxt.binance({
+        'apiKey': api_key,
+        'secret': secret_key,
+        'sandbox': False,
+        'options': {
+            'defaultType': 'future',
+        }
+    })
+
+def create_exchange(backend=None):
+    """거래소 백엔드 생성 (EXCHANGE_BACKEND=binance|replay)"""
+    backend = backend or os.environ.get('EXCHANGE_BACKEND', 'binance')
+    if backend == 'replay':
+        rate_limit = os.environ.get('REPLAY_RATE_LIMIT')  # 예: "2400/60"
+        return ReplayExchange(
+            root=os.environ.get('REPLAY_DATA_DIR', CANDLE_STORE_DIR),
+            latency_ms=float(os.environ.get('REPLAY_LATENCY_MS', 0)),
+            rate_limit=tuple(float(v) for v in rate_limit.split('/')) if rate_limit else None,
+            speed=float(os.environ.get('REPLAY_SPEED', 1.0)),
+        )
+    elif backend == 'binance':
+        return create_binance_client()
+    raise ValueError(f"지원하지 않는 거래소 백엔드: {backend}")
+
+class LazyExchange:
+    """첫 사용 시 거래소 클라이언트를 생성하는 프록시 (인증 정보도 그때 확인)"""
+    
+    def __init__(self, factory=create_exchange):
+        self._factory = factory
+        self._client = None
+        self._lock = threading.Lock()
+    
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+        return self._client
+    
+    def set_client(self, client):
+        self._client = client
+    
+    def __getattr__(self, attr):
+        return getattr(self.client, attr)
+
+def set_exchange(exchange):
+    """모듈 전역 거래소 교체 (벤치마크/오프라인 실행용)"""
+    binance.set_client(exchange)
+    exchange_cache.invalidate()
+
+binance = LazyExchange()
+
+class CandleArray:
+    """연속 NumPy 배열 기반 캔들 컨테이너 (int64 epoch ms 타임스탬프, 컬럼별 배열, 제로카피 슬라이싱)"""
+    
+    __slots__ = ('timestamp', 'open', 'high', 'low', 'close', 'volume')
+    
+    def __init__(self, timestamp, open, high, low, close, volume):
+        self.timestamp = timestamp
+        self.open = open
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+    
+    @classmethod
+    def from_arrays(cls, timestamps, ohlcv, dtype=np.float64):
+        """(타임스탬프, (n, 5) OHLCV) 배열에서 생성 (컬럼별 연속 배열로 한 번 변환)"""
+        columns = np.ascontiguousarray(np.asarray(ohlcv).T, dtype=dtype)
+        return cls(np.asarray(timestamps, dtype=np.int64), *columns)
+    
+    @classmethod
+    def from_dataframe(cls, df, dtype=None):
+        """get_price_data 형식 DataFrame에서 생성 (dtype이 같으면 컬럼 복사 없음)"""
+        if isinstance(df, cls):
+            return df
+        timestamps = df.index.as_unit('ms').asi8
+        columns = [df[column].to_numpy(dtype=dtype, copy=False) for column in CANDLE_COLUMNS[1:]]
+        return cls(timestamps, *columns)
+    
+    def __len__(self):
+        return len(self.timestamp)
+    
+    def __getitem__(self, key):
+        """슬라이스는 원본 배열의 뷰를 공유"""
+        if not isinstance(key, slice):
+            raise TypeError("CandleArray는 슬라이스 인덱싱만 지원합니다")
+        return CandleArray(*(getattr(self, column)[key] for column in self.__slots__))
+    
+    @property
+    def nbytes(self):
+        return sum(getattr(self, column).nbytes for column in self.__slots__)
+    
+    def timestamp_at(self, i):
+        """i번째 캔들 시각 (pd.Timestamp)"""
+        return pd.Timestamp(int(self.timestamp[i]), unit='ms')
+    
+    def to_dataframe(self):
+        """기존 DataFrame 형식으로 변환"""
+        ohlcv = np.column_stack([getattr(self, column) for column in CANDLE_COLUMNS[1:]])
+        return _candles_to_frame(self.timestamp, ohlcv)
+
+def _candles_to_frame(timestamps, ohlcv):
+    """타임스탬프/OHLCV 배열을 기존 형식의 DataFrame으로 변환"""
+    df = pd.DataFrame(ohlcv, columns=list(CANDLE_COLUMNS[1:]), index=pd.to_datetime(timestamps, unit='ms'))
+    df.index.name = 'timestamp'
+    return df
+
+def _sync_candle_store(symbol, timeframe, start, now_ms):
+    """저장소의 [start, now] 구간 중 아직 수집하지 않은 구간만 채움 -> 저장하지 않은 캔들 배열 (진행 중인 캔들 등)"""
+    timeframe_ms = get_timeframe_ms(timeframe)
+    current_open = now_ms // timeframe_ms * timeframe_ms  # 진행 중인 캔들 시작 시각
+    last_closed = current_open - timeframe_ms
+    
+    if candle_store.readonly:
+        # 읽기 전용 프로세스: 저장은 writer에 맡기고 저장된 마지막 캔들 이후만 메모리로 조회
+        bounds = candle_store.bounds(symbol, timeframe)
+        since = start if bounds is None else max(start, bounds[1] + timeframe_ms)
+        return download_ohlcv_range(symbol, timeframe, since, current_open)
+    
+    # 수집 구간 인덱스로 빠진 구간 계산 (헤드/중간 구멍/테일) - 진행 중인 캔들은 항상 새로 조회
+    missing = candle_store.missing_ranges(symbol, timeframe, start, last_closed) if start <= last_closed else []
+    if missing and missing[-1][1] == last_closed:
+        missing[-1][1] = current_open
+    else:
+        missing.append([current_open, current_open])
+    
+    forming_candles = np.empty((0, 6), dtype=np.float64)
+    for since, until in missing:
+        closed_until = min(until, last_closed)
+        if closed_until - since >= 10 * timeframe_ms:
+            print(f"🔄 {symbol} 과거 데이터 수집 중... ({(closed_until - since) // timeframe_ms + 1}개 캔들)")
+        candles = download_ohlcv_range(symbol, timeframe, since, until)
+        if since <= closed_until:
+            added = candle_store.write(symbol, timeframe, candles[candles[:, 0] <= last_closed], covered=(since, closed_until))
+            if added:
+                print(f"  📥 신규 캔들 저장: {added}개")
+        forming_candles = candles[candles[:, 0] > last_closed]
+    return forming_candles
+
+def run_candle_writer(symbols, timeframes=(BASE_TIMEFRAME,), history=1000, interval=None):
+    """캔들 저장소 writer 루프 - 이 프로세스만 새 캔들을 추가하고 다른 프로세스는 CANDLE_STORE_READONLY=1로 읽기만 함"""
+    if candle_store.readonly:
+        raise RuntimeError("CANDLE_STORE_READONLY 프로세스에서는 writer를 실행할 수 없습니다")
+    print(f"🗄️ 캔들 writer 시작: {len(symbols)}개 심볼, {', '.join(timeframes)}")
+    while True:
+        now_ms = binance.milliseconds()
+        for symbol in symbols:
+            for timeframe in timeframes:
+                timeframe_ms = get_timeframe_ms(timeframe)
+                start = (now_ms // timeframe_ms - history + 1) * timeframe_ms
+                try:
+                    _sync_candle_store(symbol, timeframe, start, now_ms)
+                except Exception as e:
+                    print(f"  ⚠️ {symbol} {timeframe} 캔들 저장 실패: {e}")
+        # 다음 캔들이 닫힐 때까지 대기
+        step_ms = interval * 1000 if interval else min(get_timeframe_ms(tf) for tf in timeframes)
+        time.sleep(max(1.0, (step_ms - binance.milliseconds() % step_ms) / 1000 + 1))
+
 def get_price_data(symbol, limit=100, timeframe='1h'):
+    """가격 데이터 조회 - 로컬 저장소에 없는 구간만 거래소에서 수집"""
+    if timeframe not in STORE_TIMEFRAMES:
+        return _get_price_data_direct(symbol, limit, timeframe)
+    
+    try:
+        timeframe_ms = get_timeframe_ms(timeframe)
+        now_ms = binance.milliseconds()
+        current_open = now_ms // timeframe_ms * timeframe_ms  # 진행 중인 캔들 시작 시각
+        start = current_open - (limit - 1) * timeframe_ms
+        
+        # 상위 타임프레임은 1분봉 기준 데이터에서 로컬로 생성 (너무 긴 구간은 직접 수집)
+        base_timeframe = timeframe
+        if timeframe in RESAMPLE_TIMEFRAMES and limit * timeframe_ms // get_timeframe_ms(BASE_TIMEFRAME) <= MAX_RESAMPLE_BASE_CANDLES:
+            base_timeframe = BASE_TIMEFRAME
+        
+        forming_candles = np.empty((0, 6), dtype=np.float64)  # 저장소에 없는 최신 캔들
+        try:
+            forming_candles = _sync_candle_store(symbol, base_timeframe, start, now_ms)
+        except Exception as e:
+            print(f"  ⚠️ 거래소 데이터 수집 실패, 로컬 데이터 사용: {e}")
+        
+        if base_timeframe == timeframe:
+            timestamps, ohlcv = candle_store.load(symbol, timeframe, since=start)
+            if len(forming_candles):
+                timestamps = np.concatenate([timestamps, forming_candles[:, 0].astype(np.int64)])
+                ohlcv = np.concatenate([ohlcv, forming_candles[:, 1:]])
+        else:
+            timestamps, ohlcv = candle_store.load_resampled(symbol, timeframe, since=start, extra=forming_candles)
+        
+        if len(timestamps) == 0:
+            print(f"데이터를 가져올 수 없습니다: {symbol}")
+            return None
+        
+        df = _candles_to_frame(timestamps, ohlcv)
+        print(f"📊 {symbol} 데이터 수집 완료: {len(df)}개 캔들 ({df.index[0].strftime('%Y-%m-%d %H:%M')} ~ {df.index[-1].strftime('%Y-%m-%d %H:%M')})")
+        
+        return df
+    except Exception as e:
+        print(f"Error fetching price data for {symbol}: {e}")
+        return None
+
+def _get_price_data_direct(symbol, limit=100, timeframe='1h'):
+    """거래소에서 직접 가격 데이터 수집 (저장소 미지원 타임프레임용)"""
     try:
         # 바이낸스 API 제한을 고려한 데이터 수집
         max_candles_per_request = 1000  # 바이낸스 API 최대 제한
@@ -180,58 +1236,15 @@ def get_price_data(symbol, limit=100, timeframe='1h'):
             # 한 번에 가져올 수 있는 경우
             candles = binance.fetch_ohlcv(symbol, timeframe=timeframe, limit=limit)
         else:
-            # 여러 번에 나누어 가져오기
-            all_candles = []
-            total_requested = limit
-            
+            # 최신 캔들 기준으로 전체 구간을 계산한 뒤 페이지 단위 동시 수집
             print(f"🔄 {symbol} 데이터 수집 중... (목표: {limit}개 캔들)")
             
-            # 첫 번째 요청 (최신 데이터)
-            candles = binance.fetch_ohlcv(symbol, timeframe=timeframe, limit=max_candles_per_request)
+            candles = binance.fetch_ohlcv(symbol, timeframe=timeframe, limit=1)
             if candles:
-                all_candles.extend(candles)
-                print(f"  📥 1차 수집: {len(candles)}개 캔들")
-                
-                # 추가 데이터가 필요한 경우
-                if len(all_candles) < total_requested:
-                    # 이전 데이터 요청 (since 파라미터 사용)
-                    # 첫 번째 캔들의 타임스탬프에서 더 과거로 이동
-                    since = candles[0][0] - (max_candles_per_request * get_timeframe_ms(timeframe))
-                    
-                    while len(all_candles) < total_requested:
-                        time.sleep(0.1)  # API 제한 방지 (100ms)
-                        
-                        try:
-                            candles = binance.fetch_ohlcv(symbol, timeframe=timeframe, limit=max_candles_per_request, since=since)
-                            if not candles or len(candles) == 0:
-                                break
-                                
-                            all_candles.extend(candles)
-                            print(f"  📥 추가 수집: {len(candles)}개 캔들 (총 {len(all_candles)}개)")
-                            
-                            # 다음 since 값 업데이트 (가장 오래된 캔들의 타임스탬프에서 더 과거로)
-                            since = candles[0][0] - (max_candles_per_request * get_timeframe_ms(timeframe))
-                            
-                        except Exception as e:
-                            print(f"  ⚠️ 추가 데이터 수집 실패: {e}")
-                            break
-                
-                # 중복 제거 및 정렬 (한 번만 실행)
-                if len(all_candles) > 1:
-                    all_candles = sorted(all_candles, key=lambda x: x[0])
-                    unique_candles = []
-                    seen_timestamps = set()
-                    for candle in all_candles:
-                        if candle[0] not in seen_timestamps:
-                            unique_candles.append(candle)
-                            seen_timestamps.add(candle[0])
-                    all_candles = unique_candles
-                    print(f"  🔄 중복 제거 후: {len(all_candles)}개 캔들")
-                
-                # API 호출 제한 방지 (바이낸스 정책: 1200 requests/minute = 50ms 간격)
-                time.sleep(0.1)  # 100ms 딜레이 (안전 마진 포함)
-            
-            candles = all_candles
+                last_ts = candles[-1][0]
+                since = last_ts - (limit - 1) * get_timeframe_ms(timeframe)
+                candles = download_ohlcv_range(symbol, timeframe, since, last_ts).tolist()
+                print(f"  🔄 중복 제거 후: {len(candles)}개 캔들")
         
         if not candles:
             print(f"데이터를 가져올 수 없습니다: {symbol}")
@@ -252,49 +1265,37 @@ def get_price_data(symbol, limit=100, timeframe='1h'):
         print(f"Error fetching price data for {symbol}: {e}")
         return None
     
-def simple_ma_strategy(df, current_index=None, params=None, has_position=False):
-    """이동평균 크로스오버 전략 (파라미터 기반)"""
-    # 기본 파라미터 설정
-    default_params = {
-        'short_period': 5,       # 단기 이동평균
-        'long_period': 20,       # 장기 이동평균
-        'stop_loss': -0.02,      # 손절 비율
-        'take_profit': 0.03,     # 익절 비율
-        'max_hold_hours': 24     # 최대 보유 시간
+MA_STRATEGY_DEFAULTS = {
+    'short_period': 5,       # 단기 이동평균
+    'long_period': 20,       # 장기 이동평균
+    'stop_loss': -0.02,      # 손절 비율
+    'take_profit': 0.03,     # 익절 비율
+    'max_hold_hours': 24     # 최대 보유 시간
+}
+
+def prepare_ma_strategy(df, params=None):
+    """이동평균 전략 지표를 전체 구간에 대해 한 번만 계산 (i번째 값은 i까지의 데이터만 사용)"""
+    strategy_params = {**MA_STRATEGY_DEFAULTS, **(params or {})}
+    close = df['close'].to_numpy()
+    return {
+        'params': strategy_params,
+        'min_required': max(strategy_params['short_period'], strategy_params['long_period']) + 5,
+        'short_ma': rolling_mean(close, strategy_params['short_period']),
+        'long_ma': rolling_mean(close, strategy_params['long_period']),
     }
-    
-    # 파라미터 병합
-    if params is None:
-        params = {}
-    strategy_params = {**default_params, **params}
-    
-    # 백테스팅을 위한 인덱스 처리
-    if current_index is None:
-        current_index = len(df) - 1
-    
-    # 이동평균 계산을 위한 최소 데이터 필요량
-    min_required = max(strategy_params['short_period'], strategy_params['long_period']) + 5
-    
-    if len(df) < min_required or current_index < min_required:
+
+def ma_strategy_signal(indicators, i, has_position=False):
+    """미리 계산된 지표로 i번째 캔들의 이동평균 크로스오버 신호 판단"""
+    if i < indicators['min_required']:
         return 'HOLD', None
     
-    # 현재 시점까지만 데이터 사용 (미래 데이터 사용 방지)
-    current_df = df.iloc[:current_index + 1]
-    
-    # 이동평균 계산
-    short_ma = current_df['close'].rolling(window=strategy_params['short_period']).mean()
-    long_ma = current_df['close'].rolling(window=strategy_params['long_period']).mean()
-    
-    # 현재 이동평균 값
-    current_short_ma = short_ma.iloc[-1]
-    current_long_ma = long_ma.iloc[-1]
-    
-    # 이전 이동평균 값
-    prev_short_ma = short_ma.iloc[-2] if len(short_ma) > 1 else current_short_ma
-    prev_long_ma = long_ma.iloc[-2] if len(long_ma) > 1 else current_long_ma
-    
+    short_ma, long_ma = indicators['short_ma'], indicators['long_ma']
+    return evaluate_ma_signal(short_ma[i], long_ma[i], short_ma[i - 1], long_ma[i - 1], has_position)
+
+def evaluate_ma_signal(current_short_ma, current_long_ma, prev_short_ma, prev_long_ma, has_position=False):
+    """현재/직전 이동평균 값으로 크로스오버 신호 판단 (배열 지표와 스트리밍 지표 공용)"""
     # NaN 체크
-    if pd.isna(current_short_ma) or pd.isna(current_long_ma):
+    if np.isnan(current_short_ma) or np.isnan(current_long_ma):
         return 'HOLD', None
     
     # 포지션이 있을 때는 매수하지 않음
@@ -302,15 +1303,21 @@ def simple_ma_strategy(df, current_index=None, params=None, has_position=False):
         # 매도 조건: 단기 이동평균이 장기 이동평균 아래로
         if current_short_ma < current_long_ma and prev_short_ma >= prev_long_ma:
             return 'SELL', '신호매도'
-        else:
-            return 'HOLD', None
-    else:
-        # 포지션이 없을 때만 매수 신호 생성
-        # 매수 조건: 단기 이동평균이 장기 이동평균 위로
-        if current_short_ma > current_long_ma and prev_short_ma <= prev_long_ma:
-            return 'BUY', None
-        else:
-            return 'HOLD', None
+        return 'HOLD', None
+    # 매수 조건: 단기 이동평균이 장기 이동평균 위로
+    if current_short_ma > current_long_ma and prev_short_ma <= prev_long_ma:
+        return 'BUY', None
+    return 'HOLD', None
+
+def simple_ma_strategy(df, current_index=None, params=None, has_position=False):
+    """이동평균 크로스오버 전략 (파라미터 기반)"""
+    # 백테스팅을 위한 인덱스 처리
+    if current_index is None:
+        current_index = len(df) - 1
+    
+    # 현재 시점까지만 데이터 사용 (미래 데이터 사용 방지)
+    indicators = prepare_ma_strategy(df.iloc[:current_index + 1], params)
+    return ma_strategy_signal(indicators, current_index, has_position)
 
 def get_timeframe_ms(timeframe):
     """타임프레임을 밀리초로 변환"""
@@ -333,38 +1340,89 @@ def get_timeframe_ms(timeframe):
     }
     return timeframe_map.get(timeframe, 60 * 1000)  # 기본값 1분
 
+def rolling_mean(values, window):
+    """단순 이동평균 (NumPy 배열 입력/출력, 원본 복사 없음)"""
+    return pd.Series(values, copy=False).rolling(window=window).mean().to_numpy()
+
+def moving_average_matrix(values, windows):
+    """여러 윈도우의 단순 이동평균 -> (윈도우 × 시간) 행렬 (윈도우가 덜 찬 앞부분은 NaN)
+    
+    각 행은 rolling_mean과 같은 계산 - 틱 단위로 반올림된 가격의 동률/보합 구간에서도 단기 > 장기 비교가
+    단일 실행 경로와 비트 단위로 같아야 크로스오버(거래)가 바뀌지 않음
+    """
+    values = np.asarray(values, dtype=np.float64)
+    result = np.full((len(windows), len(values)), np.nan)
+    for row, window in enumerate(windows):
+        if window <= len(values):
+            result[row] = rolling_mean(values, window)
+    return result
+
 def calculate_rsi(prices, period=14):
-    """RSI 계산"""
+    """RSI 계산 (Series 입력 시 Series, NumPy 배열 입력 시 배열 반환)"""
+    is_array = isinstance(prices, np.ndarray)
+    if is_array:
+        prices = pd.Series(prices, copy=False)
     delta = prices.diff()
     gain = (delta.where(delta > 0, 0)).rolling(window=period).mean()
     loss = (-delta.where(delta < 0, 0)).rolling(window=period).mean()
     rs = gain / loss
     rsi = 100 - (100 / (1 + rs))
-    return rsi
+    return rsi.to_numpy() if is_array else rsi
+
+def pivot_masks(high, low, window=5):
+    """중앙 window 캔들 기준 피벗 고점/저점 불리언 배열 (한 번의 벡터 연산, 윈도우가 덜 찬 양 끝은 False)"""
+    high = np.asarray(high, dtype=np.float64)
+    low = np.asarray(low, dtype=np.float64)
+    n = len(high)
+    pivot_high = np.zeros(n, dtype=bool)
+    pivot_low = np.zeros(n, dtype=bool)
+    if n < window:
+        return pivot_high, pivot_low
+    
+    # k번째 윈도우는 [k, k + window) 구간, 가운데 캔들은 k + center (rolling(center=True)와 같은 정렬)
+    offset = (window - 1) // 2
+    center = window - 1 - offset
+    windows = n - window + 1
+    window_high = high[:windows].copy()
+    window_low = low[:windows].copy()
+    for k in range(1, window):  # 윈도우 크기만큼 밀린 구간끼리 비교 (NaN은 전파되어 피벗 아님)
+        np.maximum(window_high, high[k:k + windows], out=window_high)
+        np.minimum(window_low, low[k:k + windows], out=window_low)
+    pivot_high[center:n - offset] = high[center:n - offset] == window_high
+    pivot_low[center:n - offset] = low[center:n - offset] == window_low
+    return pivot_high, pivot_low
+
+def last_pivot_index(mask):
+    """각 캔들 시점까지의 마지막 피벗 위치 (앞 방향 채움, 없으면 -1)"""
+    return np.maximum.accumulate(np.where(mask, np.arange(len(mask)), -1))
+
+def pivot_levels(prices, mask, lookback=10, delay=0, min_pivots=2):
+    """캔들마다 delay 캔들 전까지 확정된 마지막 피벗 가격 (피벗이 min_pivots개 미만이거나 최근 lookback 캔들 밖이면 NaN)"""
+    prices = np.asarray(prices, dtype=np.float64)
+    levels = np.full(len(prices), np.nan)
+    if len(prices) <= delay:
+        return levels
+    
+    bars = np.arange(delay, len(prices))
+    confirmed = bars - delay
+    pivot_count = np.cumsum(mask)[confirmed]
+    last_pivot = last_pivot_index(mask)[confirmed]
+    valid = (pivot_count >= min_pivots) & (last_pivot >= bars + 1 - lookback)
+    levels[bars[valid]] = prices[last_pivot[valid]]
+    return levels
 
 def find_pivot_points(df, window=5):
-    """피벗 포인트 (고점/저점) 찾기"""
-    highs = df['high'].rolling(window=window, center=True).max()
-    lows = df['low'].rolling(window=window, center=True).min()
-    
-    pivot_highs = []
-    pivot_lows = []
-    
-    for i in range(len(df)):
-        if df['high'].iloc[i] == highs.iloc[i]:
-            pivot_highs.append({
-                'index': i,
-                'price': df['high'].iloc[i],
-                'timestamp': df.index[i]
-            })
-        if df['low'].iloc[i] == lows.iloc[i]:
-            pivot_lows.append({
-                'index': i,
-                'price': df['low'].iloc[i],
-                'timestamp': df.index[i]
-            })
+    """피벗 포인트 (고점/저점) 찾기 - 마스크는 pivot_masks로 한 번에 계산하고 피벗 캔들만 변환"""
+    high = df['high'].to_numpy()
+    low = df['low'].to_numpy()
+    pivot_high, pivot_low = pivot_masks(high, low, window)
+    
+    def to_points(mask, prices):
+        positions = np.flatnonzero(mask)
+        return [{'index': i, 'price': price, 'timestamp': timestamp}
+                for i, price, timestamp in zip(positions.tolist(), prices[positions].tolist(), df.index[positions])]
     
-    return pivot_highs, pivot_lows
+    return to_points(pivot_high, high), to_points(pivot_low, low)
 
 def calculate_trendline(df, pivot_points, direction='up', lookback=20):
     """추세선 계산"""
@@ -404,137 +1462,633 @@ def check_trendline_breakout(df, trendline, current_price, direction='up'):
         # 하향 돌파: 가격이 추세선 아래로
         return current_price < trendline_value
 
-def rsi_strategy(df, current_index=None, params=None, has_position=False):
-    """RSI 기반 매매 전략 (파라미터 기반) with risk management"""
-    # 기본 파라미터 설정
-    default_params = {
-        'rsi_buy': 30,           # RSI 매수 조건
-        'rsi_sell': 70,          # RSI 매도 조건
-        'stop_loss': -0.015,     # 손절 비율
-        'take_profit': 0.03,     # 익절 비율
-        'max_hold_hours': 24,    # 최대 보유 시간
-        'volume_ratio': 0.8,     # 거래량 비율
-        'support_distance': 0.02 # 지지선 거리
-    }
-    
-    # 파라미터 병합
-    if params is None:
-        params = {}
-    strategy_params = {**default_params, **params}
-    
-    # 백테스팅을 위한 인덱스 처리
-    if current_index is None:
-        current_index = len(df) - 1
+def rolling_sum(values, window):
+    """구간 합 (윈도우가 덜 찬 앞부분은 있는 값만 합산, pandas 보정 합산)"""
+    return pd.Series(values, copy=False).rolling(window=window, min_periods=1).sum().to_numpy()
+
+def rolling_trendline(prices, mask, lookback=20, delay=0):
+    """캔들별 추세선 (기울기, 절편) 배열 - 최근 lookback 캔들 안의 피벗으로 구한 최소제곱 직선, 피벗이 2개 미만이면 NaN
     
-    # RSI 계산을 위한 최소 데이터 필요량
-    min_required = 20  # RSI 14 + 기본 계산용
+    i번째 값은 calculate_trendline(df.iloc[:i + 1], ...)과 같은 직선 (x는 캔들 번호, delay 캔들 이후에 확정된 피벗만 사용).
+    Σx, Σy, Σxy, Σx² 구간 합을 한 번에 구하고 x는 캔들 i 기준으로 옮겨 계산 (큰 캔들 번호끼리의 상쇄 오차 방지)
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    n_bars = len(prices)
+    slope = np.full(n_bars, np.nan)
+    intercept = np.full(n_bars, np.nan)
+    window = lookback - delay  # i번째 캔들의 피벗 구간 [i + 1 - lookback, i - delay]
+    if window <= 0 or n_bars <= delay:
+        return slope, intercept
+    
+    mask = np.asarray(mask, dtype=bool)
+    x = np.arange(n_bars, dtype=np.float64)
+    y = np.where(mask, prices, 0.0)
+    sums = []
+    for values in (mask.astype(np.float64), np.where(mask, x, 0.0), np.where(mask, x * x, 0.0), y, y * x):
+        window_sums = np.zeros(n_bars)
+        window_sums[delay:] = rolling_sum(values, window)[:n_bars - delay]
+        sums.append(window_sums)
+    count, sum_x, sum_xx, sum_y, sum_xy = sums
+    
+    # x' = x - i 로 옮긴 합 (정수 합은 float64에서도 정확)
+    sum_x_local = sum_x - count * x
+    sum_xx_local = sum_xx - 2 * x * sum_x + count * x * x
+    sum_xy_local = sum_xy - x * sum_y
+    valid = count >= 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        slope_local = (count * sum_xy_local - sum_x_local * sum_y) / (count * sum_xx_local - sum_x_local ** 2)
+        value_at_bar = (sum_y - slope_local * sum_x_local) / count  # 캔들 i에서의 추세선 값
+    slope[valid] = slope_local[valid]
+    intercept[valid] = value_at_bar[valid] - slope_local[valid] * x[valid]
+    return slope, intercept
+
+def trendline_values(slope, intercept):
+    """캔들별 추세선 값 (각 캔들 시점의 추세선을 그 캔들 번호에서 평가)"""
+    return slope * np.arange(len(slope)) + intercept
+
+def trendline_breakouts(prices, slope, intercept, direction='up'):
+    """캔들별 추세선 돌파 불리언 배열 (check_trendline_breakout의 전체 구간 벡터 버전, 추세선이 없으면 False)"""
+    line = trendline_values(slope, intercept)
+    with np.errstate(invalid='ignore'):
+        if direction == 'up':
+            # 상향 돌파: 가격이 추세선 위로
+            return np.asarray(prices) > line
+        # 하향 돌파: 가격이 추세선 아래로
+        return np.asarray(prices) < line
+
+INDICATOR_CACHE_MAX_BYTES = int(os.environ.get('INDICATOR_CACHE_MB', '256') or 256) * 1024 * 1024
+
+class IndicatorCache:
+    """지표 계산 결과 캐시 - (캔들 배열 지문, 지표 이름, 파라미터) 키, 메모리 상한 LRU, 적중/계산 통계"""
+    
+    def __init__(self, max_bytes=INDICATOR_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._entries = OrderedDict()  # key -> (결과, 바이트 수), 오래 사용하지 않은 순서
+        self._fingerprints = {}        # id(배열) -> (약한 참조, 지문)
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+    
+    def fingerprint(self, values):
+        """배열 내용 지문 (같은 배열 객체는 한 번만 해시 - 캔들 배열은 제자리에서 수정하지 않음)"""
+        key = id(values)
+        cached = self._fingerprints.get(key)
+        if cached is not None and cached[0]() is values:
+            return cached[1]
+        
+        data = np.ascontiguousarray(values)
+        digest = (hashlib.blake2b(data.view(np.uint8), digest_size=16).digest(), data.dtype.str, data.shape)
+        try:
+            ref = weakref.ref(values, lambda _, key=key: self._fingerprints.pop(key, None))
+        except TypeError:
+            return digest  # 약한 참조를 지원하지 않는 입력 (리스트 등)은 매번 해시
+        with self._lock:
+            self._fingerprints[key] = (ref, digest)
+        return digest
+    
+    def get(self, name, sources, params, compute):
+        """sources 배열로 계산한 지표 조회 (없으면 compute()로 계산 후 저장) -> 읽기 전용 배열 (또는 배열 튜플)"""
+        key = (name, tuple(self.fingerprint(source) for source in sources), params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry[0]
+            self.stats['misses'] += 1
+        
+        value = compute()
+        arrays = value if isinstance(value, tuple) else (value,)
+        for array in arrays:
+            array.flags.writeable = False  # 조합 간 공유 결과 보호
+        size = sum(array.nbytes for array in arrays)
+        
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = (value, size)
+                self.nbytes += size
+            # 메모리 상한 초과 시 오래 사용하지 않은 지표부터 제거
+            while self.nbytes > self.max_bytes and self._entries:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.nbytes -= evicted_size
+                self.stats['evictions'] += 1
+        return value
+    
+    def rolling_mean(self, values, window):
+        """캐시를 거친 rolling_mean"""
+        return self.get('sma', (values,), (window,), lambda: rolling_mean(values, window))
+    
+    def moving_averages(self, values, windows):
+        """캐시를 거친 moving_average_matrix (윈도우 목록 단위)"""
+        windows = tuple(int(window) for window in windows)
+        return self.get('ma_matrix', (values,), windows, lambda: moving_average_matrix(values, windows))
+    
+    def rsi(self, values, period=14):
+        """캐시를 거친 calculate_rsi (배열 입력)"""
+        return self.get('rsi', (values,), (period,), lambda: calculate_rsi(np.asarray(values), period=period))
+    
+    def pivot_masks(self, high, low, window=5):
+        """캐시를 거친 pivot_masks"""
+        return self.get('pivot_masks', (high, low), (window,), lambda: pivot_masks(high, low, window))
+    
+    def __len__(self):
+        return len(self._entries)
+    
+    def clear(self):
+        """캐시 비우기 (통계는 유지)"""
+        with self._lock:
+            self._entries.clear()
+            self.nbytes = 0
+    
+    def summary(self):
+        """적중/계산 통계 한 줄 요약"""
+        total = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / total * 100 if total else 0
+        return (f"지표 캐시: 적중 {self.stats['hits']}회 / 계산 {self.stats['misses']}회 (적중률 {hit_rate:.0f}%), "
+                f"{len(self)}개 {self.nbytes / 1024 / 1024:.1f}MB, 제거 {self.stats['evictions']}회")
+
+# 전역 지표 캐시 (최적화 조합/전략 패스/웹 요청 간 공유)
+indicator_cache = IndicatorCache()
+
+RSI_STRATEGY_DEFAULTS = {
+    'rsi_buy': 30,           # RSI 매수 조건
+    'rsi_sell': 70,          # RSI 매도 조건
+    'stop_loss': -0.015,     # 손절 비율
+    'take_profit': 0.03,     # 익절 비율
+    'max_hold_hours': 24,    # 최대 보유 시간
+    'volume_ratio': 0.8,     # 거래량 비율
+    'support_distance': 0.02 # 지지선 거리
+}
+
+def prepare_rsi_strategy(df, params=None):
+    """RSI 전략 지표를 전체 구간에 대해 한 번만 계산 (i번째 값은 i까지의 데이터만 사용)"""
+    strategy_params = {**RSI_STRATEGY_DEFAULTS, **(params or {})}
+    close = df['close'].to_numpy()
+    low = df['low'].to_numpy()
+    volume = df['volume'].to_numpy()
+    
+    # 피벗 저점 (중앙 5캔들 윈도우) - j번째 피벗은 j+2번째 캔들부터 확정
+    _, pivot_low = pivot_masks(df['high'].to_numpy(), low, window=5)
+    
+    return {
+        'params': strategy_params,
+        'close': close,
+        'low': low,
+        'volume': volume,
+        'rsi': calculate_rsi(close, period=14),
+        'volume_avg': rolling_mean(volume, 20),
+        'support_level': pivot_levels(low, pivot_low, lookback=10, delay=2),  # 캔들별 지지선 (없으면 NaN)
+    }
+
+def rsi_support_level(indicators, i):
+    """i번째 캔들 시점의 지지선 (최근 10캔들 내 마지막 확정 피벗 저점, 없으면 None) - 사전 계산 배열 조회"""
+    support_level = indicators['support_level'][i]
+    return None if np.isnan(support_level) else support_level
+
+def rsi_strategy_signal(indicators, i, has_position=False):
+    """미리 계산된 지표로 i번째 캔들의 RSI 매매 신호 판단"""
+    strategy_params = indicators['params']
     
-    if len(df) < min_required or current_index < min_required:
+    # RSI 계산을 위한 최소 데이터 필요량 (RSI 14 + 기본 계산용)
+    if i < 20:
         return 'HOLD', None
     
-    # 현재 시점까지만 데이터 사용 (미래 데이터 사용 방지)
-    current_df = df.iloc[:current_index + 1]
-    
-    # RSI 계산
-    rsi = calculate_rsi(current_df['close'], period=14)
-    current_rsi = rsi.iloc[-1]
-    
+    rsi = indicators['rsi']
+    return evaluate_rsi_signal(strategy_params, rsi[i], rsi[i - 1], indicators['close'][i],
+                               lambda: rsi_support_level(indicators, i),
+                               indicators['volume'][i], indicators['volume_avg'][i], has_position)
+
+def evaluate_rsi_signal(strategy_params, current_rsi, prev_rsi, current_price, get_support_level,
+                        volume, volume_avg, has_position=False):
+    """현재 캔들의 RSI/가격/거래량 값으로 매매 신호 판단 (배열 지표와 스트리밍 지표 공용, 지지선은 필요할 때만 계산)"""
     # NaN 체크
-    if pd.isna(current_rsi):
+    if np.isnan(current_rsi):
         return 'HOLD', None
     
-    # RSI 모멘텀 계산 (RSI 변화율)
-    rsi_momentum = 0
-    if len(rsi) >= 2:
-        rsi_momentum = rsi.iloc[-1] - rsi.iloc[-2]
-    
-    # 피벗 포인트 찾기
-    pivot_highs, pivot_lows = find_pivot_points(current_df, window=5)
-    
-    # 지지/저항선 계산
-    support_level = calculate_support_level(current_df, pivot_lows, lookback=10)
-    resistance_level = calculate_resistance_level(current_df, pivot_highs, lookback=10)
-    
-    # 추세선 계산
-    up_trendline = calculate_trendline(current_df, pivot_lows, direction='up', lookback=10)
-    down_trendline = calculate_trendline(current_df, pivot_highs, direction='down', lookback=10)
-    
-    current_price = current_df['close'].iloc[-1]
-    
-    # 거래량 확인 (추가 필터)
-    volume_avg = current_df['volume'].rolling(window=20).mean().iloc[-1]
-    current_volume = current_df['volume'].iloc[-1]
-    volume_ratio = current_volume / volume_avg if volume_avg > 0 else 1
-    
     # 포지션이 있을 때는 매수하지 않음 (엄격한 체크)
     if has_position:
         # 매도 조건: RSI > rsi_sell
         if current_rsi > strategy_params['rsi_sell']:
             return 'SELL', '신호매도'
-        else:
-            return 'HOLD', None
-    else:
-        # 포지션이 없을 때만 매수 신호 생성 (엄격한 체크)
-        # 매수 조건: RSI < rsi_buy + 추가 필터
-        if current_rsi < strategy_params['rsi_buy']:
-            # 추가 필터: RSI 모멘텀 확인 (상승 모멘텀)
-            if rsi_momentum > 0:
-                # 지지선 근처에서 매수 (추가 필터)
-                if support_level and current_price <= support_level * (1 + strategy_params['support_distance']):
-                    # 거래량 확인 (추가 필터)
-                    if volume_ratio > strategy_params['volume_ratio']:
-                        print(f"🔍 RSI 전략 매수 신호 생성: RSI={current_rsi:.2f}, 모멘텀={rsi_momentum:.2f}, 지지선={support_level:.4f}, 거래량비율={volume_ratio:.2f}")
-                        return 'BUY', None
-        # 모든 조건을 만족하지 않으면 HOLD
         return 'HOLD', None
     
-    # 기본 반환값 (모든 경우를 커버)
+    # 매수 조건: RSI < rsi_buy + 추가 필터
+    if current_rsi < strategy_params['rsi_buy']:
+        # 추가 필터: RSI 모멘텀 확인 (상승 모멘텀)
+        rsi_momentum = current_rsi - prev_rsi
+        if rsi_momentum > 0:
+            # 지지선 근처에서 매수 (추가 필터)
+            support_level = get_support_level()
+            if support_level and current_price <= support_level * (1 + strategy_params['support_distance']):
+                # 거래량 확인 (추가 필터)
+                volume_ratio = volume / volume_avg if volume_avg > 0 else 1
+                if volume_ratio > strategy_params['volume_ratio']:
+                    print(f"🔍 RSI 전략 매수 신호 생성: RSI={current_rsi:.2f}, 모멘텀={rsi_momentum:.2f}, 지지선={support_level:.4f}, 거래량비율={volume_ratio:.2f}")
+                    return 'BUY', None
+    # 모든 조건을 만족하지 않으면 HOLD
     return 'HOLD', None
 
+def rsi_strategy(df, current_index=None, params=None, has_position=False):
+    """RSI 기반 매매 전략 (파라미터 기반) with risk management"""
+    # 백테스팅을 위한 인덱스 처리
+    if current_index is None:
+        current_index = len(df) - 1
+    
+    # 현재 시점까지만 데이터 사용 (미래 데이터 사용 방지)
+    indicators = prepare_rsi_strategy(df.iloc[:current_index + 1], params)
+    return rsi_strategy_signal(indicators, current_index, has_position)
+
+# 전략 이름 -> (지표 사전 계산, i번째 캔들 신호 판단)
+STRATEGIES = {
+    'ma': (prepare_ma_strategy, ma_strategy_signal),
+    'rsi': (prepare_rsi_strategy, rsi_strategy_signal),
+}
+
 def calculate_support_level(df, pivot_lows, lookback=10):
     """지지선 계산"""
     if len(pivot_lows) < 2:
         return None
     
-    # 최근 피벗 로우들 중에서 지지선 찾기
-    recent_lows = [low for low in pivot_lows if low['index'] >= len(df) - lookback]
-    if not recent_lows:
+    # 피벗은 캔들 순서로 정렬되어 있으므로 마지막 피벗만 확인 (O(1))
+    latest_low = pivot_lows[-1]
+    if latest_low['index'] < len(df) - lookback:
         return None
     
     # 가장 최근의 주요 지지선 반환
-    return recent_lows[-1]['price'] if recent_lows else None
+    return latest_low['price']
 
 def calculate_resistance_level(df, pivot_highs, lookback=10):
     """저항선 계산"""
     if len(pivot_highs) < 2:
         return None
     
-    # 최근 피벗 하이들 중에서 저항선 찾기
-    recent_highs = [high for high in pivot_highs if high['index'] >= len(df) - lookback]
-    if not recent_highs:
+    # 피벗은 캔들 순서로 정렬되어 있으므로 마지막 피벗만 확인 (O(1))
+    latest_high = pivot_highs[-1]
+    if latest_high['index'] < len(df) - lookback:
         return None
     
     # 가장 최근의 주요 저항선 반환
-    return recent_highs[-1]['price'] if recent_highs else None
+    return latest_high['price']
+
+class StreamingSMA:
+    """단순 이동평균 - 캔들당 O(1) 갱신 (pandas rolling mean과 같은 보정 합산이라 배열 계산과 값이 일치)"""
+    
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()           # 윈도우 내 값
+        self.nobs = 0                   # 윈도우 내 NaN이 아닌 값 개수
+        self.total = 0.0
+        self.add_compensation = 0.0     # 카한 보정항 (추가/제거 별도)
+        self.remove_compensation = 0.0
+        self.negative_count = 0
+        self.same_count = 0             # 연속으로 같은 값 개수 (같은 값 구간의 부동소수점 잔차 제거용)
+        self.last_value = np.nan
+        self.value = np.nan
+    
+    def update(self, x):
+        """새 값 반영 -> 현재 이동평균"""
+        x = float(x)
+        if self.window == 1 or not self.values:
+            self.values.clear()
+            self.nobs = self.negative_count = self.same_count = 0
+            self.total = self.add_compensation = 0.0
+            self.last_value = x
+        elif len(self.values) == self.window:
+            old = self.values.popleft()
+            if old == old:
+                self.nobs -= 1
+                y = -old - self.remove_compensation
+                t = self.total + y
+                self.remove_compensation = t - self.total - y
+                self.total = t
+                if math.copysign(1.0, old) < 0:
+                    self.negative_count -= 1
+        
+        self.values.append(x)
+        if x == x:
+            self.nobs += 1
+            y = x - self.add_compensation
+            t = self.total + y
+            self.add_compensation = t - self.total - y
+            self.total = t
+            if math.copysign(1.0, x) < 0:
+                self.negative_count += 1
+            self.same_count = self.same_count + 1 if x == self.last_value else 1
+            self.last_value = x
+        
+        if self.nobs < self.window:
+            self.value = np.nan
+        elif self.same_count >= self.nobs:
+            self.value = self.last_value
+        else:
+            self.value = self.total / self.nobs
+            if (self.negative_count == 0 and self.value < 0) or (self.negative_count == self.nobs and self.value > 0):
+                self.value = 0.0
+        return self.value
+    
+    def to_state(self):
+        """JSON 저장용 상태"""
+        return {**self.__dict__, 'values': list(self.values)}
+    
+    def load_state(self, state):
+        """to_state 결과로 복원"""
+        self.__dict__.update(state)
+        self.values = deque(state['values'])
 
-def execute_strategy(symbol='BTC/USDT:USDT', position_ratio=0.3, timeframe='1h', strategy='ma', params=None):
-    """전략 실행"""
-    df = get_price_data(symbol, timeframe=timeframe)
+class StreamingRSI:
+    """RSI - 상승/하락폭 이동평균을 캔들당 O(1) 갱신 (calculate_rsi와 값 일치)"""
+    
+    def __init__(self, period=14):
+        self.gain = StreamingSMA(period)
+        self.loss = StreamingSMA(period)
+        self.last_price = np.nan
+        self.value = np.nan
+    
+    def update(self, price):
+        """새 종가 반영 -> 현재 RSI"""
+        price = float(price)
+        delta = price - self.last_price
+        self.last_price = price
+        gain = self.gain.update(delta if delta > 0 else 0.0)
+        loss = self.loss.update(-(delta if delta < 0 else 0.0))
+        if loss != 0:
+            self.value = 100 - 100 / (1 + gain / loss)
+        else:
+            self.value = 100.0 if gain > 0 else np.nan  # 하락 없음 -> 100, 변동 없음 -> NaN
+        return self.value
+    
+    def to_state(self):
+        """JSON 저장용 상태"""
+        return {'gain': self.gain.to_state(), 'loss': self.loss.to_state(),
+                'last_price': self.last_price, 'value': self.value}
+    
+    def load_state(self, state):
+        """to_state 결과로 복원"""
+        self.gain.load_state(state['gain'])
+        self.loss.load_state(state['loss'])
+        self.last_price = state['last_price']
+        self.value = state['value']
+
+class StreamingPivots:
+    """중앙 윈도우 피벗 고점/저점 감지 - 캔들마다 윈도우 크기만큼만 비교 (find_pivot_points와 같은 기준)"""
+    
+    def __init__(self, window=5):
+        self.window = window
+        self.offset = (window - 1) // 2  # 가운데 캔들이 확정되기까지 필요한 이후 캔들 수
+        self.highs = deque(maxlen=window)
+        self.lows = deque(maxlen=window)
+        self.count = 0
+    
+    def update(self, high, low):
+        """캔들 반영 -> (확정된 캔들 번호, 피벗 고점 가격 또는 None, 피벗 저점 가격 또는 None), 윈도우가 차기 전에는 None"""
+        self.highs.append(float(high))
+        self.lows.append(float(low))
+        self.count += 1
+        if len(self.highs) < self.window:
+            return None
+        
+        center = self.window - 1 - self.offset
+        center_high, center_low = self.highs[center], self.lows[center]
+        return (self.count - 1 - self.offset,
+                center_high if center_high == max(self.highs) else None,
+                center_low if center_low == min(self.lows) else None)
+    
+    def to_state(self):
+        """JSON 저장용 상태"""
+        return {'window': self.window, 'highs': list(self.highs), 'lows': list(self.lows), 'count': self.count}
+    
+    def load_state(self, state):
+        """to_state 결과로 복원"""
+        self.__init__(state['window'])
+        self.highs.extend(state['highs'])
+        self.lows.extend(state['lows'])
+        self.count = state['count']
+
+class SupportResistanceTracker:
+    """확정된 피벗 저점/고점으로 최근 지지선/저항선 추적 (rsi_support_level과 같은 기준)"""
+    
+    def __init__(self, window=5, lookback=10):
+        self.pivots = StreamingPivots(window)
+        self.lookback = lookback
+        self.index = -1          # 마지막으로 반영한 캔들 번호
+        self.low_count = 0       # 확정된 피벗 저점 개수
+        self.high_count = 0
+        self.last_low = None     # 마지막 확정 피벗 저점 [캔들 번호, 가격]
+        self.last_high = None
+    
+    def update(self, high, low):
+        """캔들 반영 (피벗은 가운데 캔들 이후 캔들이 모두 들어와야 확정)"""
+        self.index += 1
+        confirmed = self.pivots.update(high, low)
+        if confirmed is None:
+            return
+        bar, pivot_high, pivot_low = confirmed
+        if pivot_high is not None:
+            self.high_count += 1
+            self.last_high = [bar, pivot_high]
+        if pivot_low is not None:
+            self.low_count += 1
+            self.last_low = [bar, pivot_low]
+    
+    def _level(self, count, last, lookback):
+        """피벗이 2개 이상이고 마지막 피벗이 최근 lookback 캔들 안이면 그 가격, 아니면 None"""
+        lookback = self.lookback if lookback is None else lookback
+        if count < 2 or last[0] < self.index + 1 - lookback:
+            return None
+        return last[1]
+    
+    def support(self, lookback=None):
+        """현재 지지선"""
+        return self._level(self.low_count, self.last_low, lookback)
+    
+    def resistance(self, lookback=None):
+        """현재 저항선"""
+        return self._level(self.high_count, self.last_high, lookback)
+    
+    def to_state(self):
+        """JSON 저장용 상태"""
+        return {**self.__dict__, 'pivots': self.pivots.to_state()}
+    
+    def load_state(self, state):
+        """to_state 결과로 복원"""
+        self.__dict__.update({key: value for key, value in state.items() if key != 'pivots'})
+        self.pivots.load_state(state['pivots'])
+
+class StreamingStrategy:
+    """닫힌 캔들마다 지표를 O(1)로 갱신하는 전략 - 실시간 거래와 이벤트 기반 백테스트가 같은 객체로 신호 판단"""
+    
+    def __init__(self, strategy='ma', params=None):
+        self.strategy = strategy if strategy in STRATEGIES else 'ma'
+        defaults = RSI_STRATEGY_DEFAULTS if self.strategy == 'rsi' else MA_STRATEGY_DEFAULTS
+        self.params = {**defaults, **(params or {})}
+        if self.strategy == 'rsi':
+            self.min_required = 20  # RSI 14 + 기본 계산용
+        else:
+            self.min_required = max(self.params['short_period'], self.params['long_period']) + 5
+        self.reset()
+    
+    def reset(self):
+        """지표 상태 초기화 (다시 워밍업 필요)"""
+        self.index = -1             # 마지막으로 반영한 캔들 번호
+        self.last_timestamp = None  # 마지막으로 반영한 캔들 시각 (ms)
+        self.close = self.volume = np.nan
+        self.prev = []              # 직전 캔들의 지표 값
+        if self.strategy == 'rsi':
+            self.indicators = {
+                'rsi': StreamingRSI(14),
+                'volume_avg': StreamingSMA(20),
+                'levels': SupportResistanceTracker(window=5, lookback=10),
+            }
+        else:
+            self.indicators = {
+                'short_ma': StreamingSMA(self.params['short_period']),
+                'long_ma': StreamingSMA(self.params['long_period']),
+            }
+    
+    def update(self, timestamp, open, high, low, close, volume):
+        """새로 닫힌 캔들 반영 -> 반영 여부 (이미 반영한 시각의 캔들은 무시)"""
+        timestamp = int(timestamp)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            return False
+        
+        indicators = self.indicators
+        if self.strategy == 'rsi':
+            self.prev = [indicators['rsi'].value]
+            indicators['rsi'].update(close)
+            indicators['volume_avg'].update(volume)
+            indicators['levels'].update(high, low)
+        else:
+            self.prev = [indicators['short_ma'].value, indicators['long_ma'].value]
+            indicators['short_ma'].update(close)
+            indicators['long_ma'].update(close)
+        
+        self.index += 1
+        self.last_timestamp = timestamp
+        self.close = float(close)
+        self.volume = float(volume)
+        return True
+    
+    def signal(self, has_position=False):
+        """마지막으로 반영한 캔들의 매매 신호 -> (신호, 청산 사유)"""
+        if self.index < self.min_required:
+            return 'HOLD', None
+        
+        indicators = self.indicators
+        if self.strategy == 'rsi':
+            return evaluate_rsi_signal(self.params, indicators['rsi'].value, self.prev[0], self.close,
+                                       indicators['levels'].support, self.volume,
+                                       indicators['volume_avg'].value, has_position)
+        return evaluate_ma_signal(indicators['short_ma'].value, indicators['long_ma'].value, *self.prev,
+                                  has_position=has_position)
+    
+    def to_state(self):
+        """JSON 저장용 상태 (재시작 시 워밍업 없이 이어서 갱신)"""
+        return {
+            'strategy': self.strategy,
+            'params': self.params,
+            'index': self.index,
+            'last_timestamp': self.last_timestamp,
+            'close': self.close,
+            'volume': self.volume,
+            'prev': self.prev,
+            'indicators': {name: indicator.to_state() for name, indicator in self.indicators.items()},
+        }
+    
+    @classmethod
+    def from_state(cls, state):
+        """to_state 결과로 복원"""
+        engine = cls(state['strategy'], state['params'])
+        for key in ('index', 'last_timestamp', 'close', 'volume', 'prev'):
+            setattr(engine, key, state[key])
+        for name, indicator_state in state['indicators'].items():
+            engine.indicators[name].load_state(indicator_state)
+        return engine
+
+STRATEGY_STATE_DIR = os.environ.get('STRATEGY_STATE_DIR', 'strategy_state')
+LIVE_WARMUP_CANDLES = 100  # 저장된 상태가 없을 때 워밍업용 캔들 수
+
+def _strategy_state_path(symbol, timeframe, strategy):
+    """심볼/타임프레임/전략별 스트리밍 상태 파일 경로"""
+    safe_symbol = symbol.replace('/', '_').replace(':', '-')
+    return os.path.join(STRATEGY_STATE_DIR, f"{safe_symbol}_{timeframe}_{strategy}.json")
+
+def load_streaming_strategy(symbol, timeframe='1h', strategy='ma', params=None):
+    """저장된 스트리밍 전략 상태 복원 (없거나 전략/파라미터가 다르면 새로 생성)"""
+    engine = StreamingStrategy(strategy, params)
+    path = _strategy_state_path(symbol, timeframe, engine.strategy)
+    if not os.path.exists(path):
+        return engine
+    
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            restored = StreamingStrategy.from_state(json.load(f))
+    except Exception as e:
+        print(f"⚠️ 전략 상태 복원 실패, 새로 워밍업합니다: {e}")
+        return engine
+    
+    if restored.params != engine.params:
+        print("⚠️ 저장된 전략 상태의 파라미터가 달라 새로 워밍업합니다")
+        return engine
+    print(f"♻️ 전략 상태 복원: {symbol} {timeframe} (마지막 캔들 {pd.to_datetime(restored.last_timestamp, unit='ms'):%Y-%m-%d %H:%M})")
+    return restored
+
+def save_streaming_strategy(engine, symbol, timeframe='1h'):
+    """스트리밍 전략 상태 저장 (원자적 교체)"""
+    if engine.last_timestamp is None:
+        return
+    path = _strategy_state_path(symbol, timeframe, engine.strategy)
+    os.makedirs(STRATEGY_STATE_DIR, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(engine.to_state(), f)
+    os.replace(tmp_path, path)
+
+def sync_streaming_strategy(engine, symbol, timeframe='1h'):
+    """마지막 반영 이후 새로 닫힌 캔들만 스트리밍 전략에 반영 -> (가격 데이터 (진행 중인 캔들 포함), 반영한 캔들 수)"""
+    timeframe_ms = get_timeframe_ms(timeframe)
+    current_open = binance.milliseconds() // timeframe_ms * timeframe_ms  # 진행 중인 캔들 시작 시각
+    warmup = max(LIVE_WARMUP_CANDLES, engine.min_required + 2)
+    
+    limit = warmup
+    if engine.last_timestamp is not None:
+        missing = (current_open - engine.last_timestamp) // timeframe_ms  # 마지막 반영 캔들 이후 캔들 수 (진행 중 포함)
+        if missing > warmup:
+            print(f"⚠️ 마지막 상태 이후 캔들 {missing}개 - 새로 워밍업합니다")
+            engine.reset()
+        else:
+            limit = max(missing, 0) + 1
+    
+    df = get_price_data(symbol, limit=limit, timeframe=timeframe)
+    if df is None:
+        return None, 0
+    
+    candles = CandleArray.from_dataframe(df)
+    closed = np.flatnonzero(candles.timestamp < current_open)
+    added = 0
+    for i in closed.tolist():
+        added += engine.update(candles.timestamp[i], candles.open[i], candles.high[i],
+                               candles.low[i], candles.close[i], candles.volume[i])
+    return df, added
+
+def execute_strategy(symbol='BTC/USDT:USDT', position_ratio=0.3, timeframe='1h', strategy='ma', params=None, engine=None):
+    """전략 실행 (engine이 있으면 이전 상태에 새로 닫힌 캔들만 반영)"""
+    if engine is None:
+        engine = StreamingStrategy(strategy, params)
+    df, added = sync_streaming_strategy(engine, symbol, timeframe)
     if df is None:
         return
+    if not added:
+        print("⏳ 새로 닫힌 캔들 없음 - 다음 캔들 대기")
+        return
     
     # 포지션 상태 확인 (실시간 거래에서는 별도로 관리)
     has_position = False  # 실시간 거래에서는 별도로 관리
     
-    # 전략 선택
-    if strategy == 'ma':
-        signal, exit_reason = simple_ma_strategy(df, has_position=has_position, params=params)
-        strategy_name = "이동평균 크로스오버"
-    elif strategy == 'rsi':
-        signal, exit_reason = rsi_strategy(df, has_position=has_position, params=params)
+    # 전략 선택 (마지막으로 닫힌 캔들 기준)
+    signal, exit_reason = engine.signal(has_position)
+    if engine.strategy == 'rsi':
         strategy_name = "RSI + 추세선 돌파 (고급 필터)"
     else:
-        signal, exit_reason = simple_ma_strategy(df, has_position=has_position, params=params)  # 기본값
         strategy_name = "이동평균 크로스오버"
     
     current_price = df['close'].iloc[-1]
@@ -1113,32 +2667,321 @@ class TradingTracker:
         except Exception as e:
             print(f"❌ 24시간 결과 저장 실패: {e}")
 
+# 포지션 상태 머신 이벤트 (진입/청산 캔들 위치, 포지션 방향, 주문, 청산 사유 코드)
+POSITION_EVENT_DTYPE = np.dtype([('bar', np.int64), ('side', np.int8), ('action', np.int8), ('reason', np.int8)])
+SIDE_LONG, SIDE_SHORT = 1, -1
+ACTION_BUY, ACTION_SELL = 1, -1
+EXIT_NONE, EXIT_SIGNAL, EXIT_STOP_LOSS, EXIT_TAKE_PROFIT, EXIT_MAX_HOLD = range(5)
+
+def simulate_position_events(closes, timestamps, long_entry, short_entry, long_exit, short_exit,
+                             stop_loss, take_profit, max_hold_hours, start=0):
+    """단일 포지션 상태 머신 (진입 -> 신호청산/손절/익절/최대보유시간) -> POSITION_EVENT_DTYPE 배열
+    
+    모든 신호는 미리 계산된 불리언 배열로 받고 캔들 루프는 파이썬 기본 타입만 사용
+    """
+    # 배열은 파이썬 리스트로 한 번 변환 (이미 리스트면 그대로 사용 - 배치 실행 시 공유)
+    closes, timestamps, long_entry, short_entry, long_exit, short_exit = (
+        values if isinstance(values, list) else np.asarray(values).tolist()
+        for values in (closes, timestamps, long_entry, short_entry, long_exit, short_exit))
+    
+    events = []
+    side = 0
+    entry_price = entry_time = None
+    for i in range(start, len(closes)):
+        price = closes[i]
+        reason = EXIT_NONE
+        
+        if side == 0:
+            # 포지션 없을 때: 롱 우선 진입
+            if long_entry[i]:
+                side = SIDE_LONG
+                events.append((i, side, ACTION_BUY, EXIT_NONE))
+            elif short_entry[i]:
+                side = SIDE_SHORT
+                events.append((i, side, ACTION_SELL, EXIT_NONE))
+            else:
+                continue
+            entry_price, entry_time = price, timestamps[i]
+        elif side == SIDE_LONG:
+            price_change = (price - entry_price) / entry_price
+            if long_exit[i]:
+                reason = EXIT_SIGNAL
+            elif price_change <= stop_loss:
+                reason = EXIT_STOP_LOSS
+            elif price_change >= take_profit:
+                reason = EXIT_TAKE_PROFIT
+        else:
+            price_change = (entry_price - price) / entry_price  # 숏은 반대
+            if short_exit[i]:
+                reason = EXIT_SIGNAL
+            elif price_change <= stop_loss:
+                reason = EXIT_STOP_LOSS
+            elif price_change >= take_profit:
+                reason = EXIT_TAKE_PROFIT
+        
+        # 최대 보유 시간 체크 (다른 청산 사유가 없을 때만)
+        if reason == EXIT_NONE and (timestamps[i] - entry_time) / 1000 / 3600 > max_hold_hours:
+            reason = EXIT_MAX_HOLD
+        if reason != EXIT_NONE:
+            events.append((i, side, ACTION_SELL if side == SIDE_LONG else ACTION_BUY, reason))
+            side = 0
+    
+    return np.array(events, dtype=POSITION_EVENT_DTYPE)
+
+POSITION_JUMP_CHUNK = 64  # 청산 탐색 첫 구간 길이 (찾지 못하면 두 배씩 늘림)
+
+def simulate_position_jumps(closes, timestamps, long_entry, short_entry, long_exit, short_exit,
+                            stop_loss, take_profit, max_hold_hours, start=0):
+    """simulate_position_events와 같은 상태 머신을 거래 단위로 실행 -> POSITION_EVENT_DTYPE 배열 (결과 동일)
+    
+    다음 진입은 진입 신호 위치 이진 탐색, 청산은 최대 보유 시간 캔들(타임스탬프 이진 탐색)까지를 점점 커지는 구간으로
+    나눠 신호/손절/익절을 한 번에 비교해 첫 캔들로 바로 이동 - 포지션이 없거나 보유 중인 긴 구간의 비용이 캔들 수와 무관
+    """
+    closes = np.asarray(closes, dtype=np.float64)
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    long_entry, short_entry, long_exit, short_exit = (
+        np.asarray(values, dtype=bool) for values in (long_entry, short_entry, long_exit, short_exit))
+    n = len(closes)
+    entry_bars = np.flatnonzero(long_entry | short_entry)
+    max_hold_ms = max_hold_hours * 3600 * 1000
+    
+    events = []
+    i = start
+    while True:
+        # 1) 포지션 없음: 다음 진입 캔들로 이동 (롱 우선)
+        k = int(np.searchsorted(entry_bars, i))
+        if k == len(entry_bars):
+            break
+        entry = int(entry_bars[k])
+        side = SIDE_LONG if long_entry[entry] else SIDE_SHORT
+        events.append((entry, side, ACTION_BUY if side == SIDE_LONG else ACTION_SELL, EXIT_NONE))
+        entry_price, entry_time = float(closes[entry]), int(timestamps[entry])
+        
+        # 2) 최대 보유 시간 캔들: 이진 탐색 후 원래 루프와 같은 식으로 경계 보정
+        def hold_exceeded(bar):
+            return (int(timestamps[bar]) - entry_time) / 1000 / 3600 > max_hold_hours
+        hold_bar = int(np.searchsorted(timestamps, entry_time + max_hold_ms, side='right')) if max_hold_ms < np.inf else n
+        while hold_bar > entry and hold_exceeded(hold_bar - 1):
+            hold_bar -= 1
+        while hold_bar < n and not hold_exceeded(hold_bar):
+            hold_bar += 1
+        
+        # 3) 진입 다음 캔들부터 보유 시간 캔들까지 신호/손절/익절 첫 캔들 탐색
+        exits = long_exit if side == SIDE_LONG else short_exit
+        exit_bar, reason = None, EXIT_NONE
+        a, last, chunk = entry + 1, min(hold_bar, n - 1), POSITION_JUMP_CHUNK
+        while a <= last:
+            b = min(a + chunk, last + 1)
+            window = closes[a:b]
+            change = (window - entry_price) / entry_price if side == SIDE_LONG else (entry_price - window) / entry_price
+            hit = exits[a:b] | (change <= stop_loss) | (change >= take_profit)
+            j = int(hit.argmax())
+            if hit[j]:
+                exit_bar = a + j
+                break
+            a, chunk = b, chunk * 2
+        
+        if exit_bar is not None:
+            price = float(closes[exit_bar])
+            price_change = (price - entry_price) / entry_price if side == SIDE_LONG else (entry_price - price) / entry_price
+            if exits[exit_bar]:
+                reason = EXIT_SIGNAL
+            elif price_change <= stop_loss:
+                reason = EXIT_STOP_LOSS
+            else:
+                reason = EXIT_TAKE_PROFIT
+        elif hold_bar < n:
+            exit_bar, reason = hold_bar, EXIT_MAX_HOLD
+        else:
+            break  # 마지막 캔들까지 보유
+        events.append((exit_bar, side, ACTION_SELL if side == SIDE_LONG else ACTION_BUY, reason))
+        i = exit_bar + 1
+    
+    return np.array(events, dtype=POSITION_EVENT_DTYPE)
+
+# 백테스트 청산 실행 방식: 'bar' (캔들 루프), 'jump' (거래 단위 이동), 'auto' (진입 신호가 드문 경우 jump)
+BACKTEST_EXECUTION = os.environ.get('BACKTEST_EXECUTION', 'auto')
+POSITION_JUMP_MIN_BARS_PER_ENTRY = 64  # auto: 진입 신호 1개당 캔들 수가 이 이상이면 jump
+
+# 백테스트 거래/자산 기록 (타임스탬프는 epoch ms, 심볼/사유 문자열은 라벨 코드, 없으면 -1)
+TRADE_DTYPE = np.dtype([('timestamp', np.int64), ('type', np.int8), ('symbol', np.int32), ('price', np.float64),
+                        ('amount', np.float64), ('value', np.float64), ('margin', np.float64),
+                        ('commission', np.float64), ('pnl', np.float64), ('pnl_percentage', np.float64),
+                        ('balance', np.float64), ('exit_reason', np.int32)])
+EQUITY_DTYPE = np.dtype([('timestamp', np.int64), ('equity', np.float64), ('balance', np.float64),
+                         ('positions_value', np.float64)])
+RECORD_LOG_CAPACITY = 256  # 기록 배열 초기 길이 (가득 차면 두 배로 확장, reset해도 유지)
+
+def to_epoch_ms(timestamp):
+    """pd.Timestamp/datetime 또는 epoch ms 정수 -> epoch ms 정수"""
+    if isinstance(timestamp, (int, np.integer)):
+        return int(timestamp)
+    return pd.Timestamp(timestamp).value // 1_000_000
+
+class RecordLog:
+    """미리 할당한 구조화 배열에 행을 추가하는 기록 - 딕셔너리 행은 조회/출력/JSON 변환 시에만 생성
+    
+    len()/반복/인덱싱은 기존 딕셔너리 리스트처럼 동작, 계산은 columns/column()으로 배열을 직접 사용
+    딕셔너리 행은 dtype 필드 순서 그대로 (timestamp는 pd.Timestamp, label_fields는 라벨 문자열로 변환)
+    """
+    
+    def __init__(self, dtype, capacity=RECORD_LOG_CAPACITY, labels=None, label_fields=()):
+        self.dtype = np.dtype(dtype)
+        self.label_fields = label_fields
+        self._data = np.zeros(capacity, dtype=self.dtype)
+        self._size = 0
+        self.labels = labels if labels is not None else []  # 라벨 코드 -> 문자열 (추가만 하므로 스냅샷과 공유)
+        self._codes = {label: code for code, label in enumerate(self.labels)}
+    
+    def label_code(self, label):
+        """문자열 -> 라벨 코드 (None은 -1)"""
+        if label is None:
+            return -1
+        code = self._codes.get(label)
+        if code is None:
+            code = self._codes[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+    
+    def label(self, code):
+        return self.labels[code] if code >= 0 else None
+    
+    def append(self, row):
+        """dtype 필드 순서의 튜플 한 행 추가 (용량이 부족하면 두 배로 확장)"""
+        if self._size == len(self._data):
+            grown = np.zeros(max(2 * len(self._data), 1), dtype=self.dtype)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+        self._data[self._size] = row
+        self._size += 1
+    
+    def clear(self):
+        """기록만 비움 (배열과 라벨 표는 재사용)"""
+        self._size = 0
+    
+    @property
+    def columns(self):
+        """기록된 행의 구조화 배열 뷰 (복사 없음 - 다음 추가/초기화 전까지만 유효)"""
+        return self._data[:self._size]
+    
+    def column(self, name):
+        return self._data[name][:self._size]
+    
+    def snapshot(self):
+        """현재 기록의 독립 복사본 (리포트 보관용 - 라벨 표는 공유)"""
+        snapshot = copy.copy(self)
+        snapshot._data = self.columns.copy()
+        return snapshot
+    
+    def __len__(self):
+        return self._size
+    
+    def __iter__(self):
+        for row in self.columns.tolist():
+            yield self._row_dict(row)
+    
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return [self._row_dict(row) for row in self.columns[key].tolist()]
+        return self._row_dict(self.columns[key].tolist())
+    
+    def to_list(self):
+        """기존 형식의 딕셔너리 리스트"""
+        return list(self)
+    
+    def _row_dict(self, row):
+        record = dict(zip(self.dtype.names, row))
+        if 'timestamp' in record:
+            record['timestamp'] = pd.Timestamp(record['timestamp'], unit='ms')
+        for field in self.label_fields:
+            record[field] = self.label(record[field])
+        return record
+
+class TradeLog(RecordLog):
+    """백테스트 거래 기록 (BUY 행은 margin, SELL 행은 pnl/pnl_percentage 포함 - 기존 딕셔너리와 같은 키)"""
+    
+    def __init__(self, capacity=RECORD_LOG_CAPACITY, labels=None):
+        super().__init__(TRADE_DTYPE, capacity, labels, label_fields=('symbol', 'exit_reason'))
+    
+    def _row_dict(self, row):
+        trade = super()._row_dict(row)
+        if trade['type'] == ACTION_BUY:
+            trade['type'] = 'BUY'
+            del trade['pnl'], trade['pnl_percentage']
+        else:
+            trade['type'] = 'SELL'
+            del trade['margin']
+        return trade
+
+class BacktestMetrics:
+    """백테스트 리포트 수치를 체결/자산 계산 시점에 바로 갱신하는 고정 크기 집계 (기록 배열 불필요)"""
+    
+    __slots__ = ('trades', 'sells', 'completed', 'wins', 'total_pnl', 'total_commission', 'peak', 'max_drawdown')
+    
+    def __init__(self, initial_balance=0):
+        self.reset(initial_balance)
+    
+    def reset(self, initial_balance):
+        self.trades = self.sells = self.completed = self.wins = 0
+        self.total_pnl = self.total_commission = 0
+        self.peak = initial_balance  # MDD 기준 최고 자산 (초기 자본에서 시작)
+        self.max_drawdown = 0
+    
+    def add_trade(self, action, commission, pnl=0, exit_reason=None):
+        """체결 1건 반영 - 승률은 최종청산을 제외한 매도 기준"""
+        self.trades += 1
+        self.total_commission += commission
+        if action == ACTION_SELL:
+            self.sells += 1
+            self.total_pnl += pnl
+            if exit_reason != '최종청산':
+                self.completed += 1
+                if pnl > 0:
+                    self.wins += 1
+    
+    def add_equity(self, equity):
+        """자산 곡선 한 점 반영 (최고점 대비 낙폭 갱신)"""
+        if equity > self.peak:
+            self.peak = equity
+        drawdown = (self.peak - equity) / self.peak * 100
+        if drawdown > self.max_drawdown:
+            self.max_drawdown = drawdown
+
 class BacktestEngine:
     """백테스팅 엔진"""
     
-    def __init__(self, initial_balance=10000, balance_ratio=0.3, commission=0.0004, leverage=1):
+    def __init__(self, initial_balance=10000, balance_ratio=0.3, commission=0.0004, leverage=1, verbose=True,
+                 execution=None, online_metrics=False):
         self.initial_balance = initial_balance
         self.balance = initial_balance
         self.balance_ratio = balance_ratio  # 잔고의 30% 사용
         self.commission = commission  # 바이낸스 선물 수수료 0.04%
         self.leverage = leverage  # 레버리지
-        self.trades = []
+        self.verbose = verbose  # False면 거래별 로그 생략 (배치 백테스트용)
+        self.execution = execution or BACKTEST_EXECUTION  # 벡터화 백테스트 청산 실행 방식
+        # True면 거래/자산 기록 없이 집계만 갱신 -> 리포트는 trades/equity_curve 없는 고정 크기 요약 (최적화 탐색용)
+        self.online_metrics = online_metrics
+        self.metrics = BacktestMetrics(initial_balance)
+        self.trades = TradeLog()  # 구조화 배열 기록 (조합마다 재사용)
         self.positions = []
-        self.equity_curve = []
+        self.equity_curve = RecordLog(EQUITY_DTYPE)  # 캔들별 자산/잔고/포지션 가치
         
     def reset(self):
-        """백테스트 초기화"""
+        """백테스트 초기화 (기록 배열은 새로 할당하지 않고 비움)"""
         self.balance = self.initial_balance
-        self.trades = []
+        self.metrics.reset(self.initial_balance)
+        self.trades.clear()
         self.positions = []
-        self.equity_curve = []
+        self.equity_curve.clear()
         
     def execute_trade(self, signal, price, timestamp, symbol, exit_reason=None):
-        """거래 실행 - 단일 포지션 관리 방식 (레버리지 단순화)"""
+        """거래 실행 - 단일 포지션 관리 방식 (레버리지 단순화), timestamp는 pd.Timestamp 또는 epoch ms"""
+        trades = self.trades
         if signal == 'BUY':
             # 이미 포지션이 있으면 매수하지 않음 (추격매수 방지)
             if self.positions:
-                print(f"🚫 매수 거부: 이미 포지션이 {len(self.positions)}개 존재")
+                if self.verbose:
+                    print(f"🚫 매수 거부: 이미 포지션이 {len(self.positions)}개 존재")
                 return False
                 
             # 거래 수량 계산 (레버리지 고려)
@@ -1165,32 +3008,26 @@ class BacktestEngine:
             if self.balance >= total_cost:
                 self.balance -= total_cost
                 
-                trade = {
-                    'timestamp': timestamp,
-                    'type': 'BUY',
-                    'symbol': symbol,
-                    'price': price,
-                    'amount': position_size,
-                    'value': position_value,
-                    'margin': margin_required,
-                    'commission': commission_cost,
-                    'balance': self.balance,
-                    'exit_reason': exit_reason if exit_reason else None
-                }
-                self.trades.append(trade)
+                self.metrics.add_trade(ACTION_BUY, commission_cost)
+                if not self.online_metrics:
+                    trades.append((to_epoch_ms(timestamp), ACTION_BUY, trades.label_code(symbol), price,
+                                   position_size, position_value, margin_required, commission_cost, 0.0, 0.0,
+                                   self.balance, trades.label_code(exit_reason if exit_reason else None)))
                 
-                # 단일 포지션으로 관리
+                # 단일 포지션으로 관리 (최대 보유 시각은 입력과 같은 형식)
+                max_hold = 24 * 3600 * 1000 if isinstance(timestamp, (int, np.integer)) else pd.Timedelta(hours=24)
                 self.positions = [{
                     'type': 'LONG',
                     'symbol': symbol,
                     'amount': position_size,
                     'price': price,
                     'timestamp': timestamp,
-                    'max_hold_time': timestamp + pd.Timedelta(hours=24),
+                    'max_hold_time': timestamp + max_hold,
                     'margin': margin_required
                 }]
                 
-                print(f"💰 매수 완료: ${self.balance:,.2f} (수량: {position_size:.4f}, 레버리지: {self.leverage}x)")
+                if self.verbose:
+                    print(f"💰 매수 완료: ${self.balance:,.2f} (수량: {position_size:.4f}, 레버리지: {self.leverage}x)")
                 return True
                 
         elif signal == 'SELL' and self.positions:
@@ -1216,25 +3053,18 @@ class BacktestEngine:
             # 수익률 계산
             pnl_percentage = (leveraged_pnl / entry_margin) * 100 if entry_margin > 0 else 0
             
-            trade = {
-                'timestamp': timestamp,
-                'type': 'SELL',
-                'symbol': symbol,
-                'price': price,
-                'amount': position_amount,
-                'value': current_position_value,
-                'commission': commission_cost,
-                'pnl': leveraged_pnl,
-                'pnl_percentage': pnl_percentage,
-                'balance': self.balance,
-                'exit_reason': exit_reason if exit_reason else '신호매도'
-            }
-            self.trades.append(trade)
+            exit_reason = exit_reason if exit_reason else '신호매도'
+            self.metrics.add_trade(ACTION_SELL, commission_cost, leveraged_pnl, exit_reason)
+            if not self.online_metrics:
+                trades.append((to_epoch_ms(timestamp), ACTION_SELL, trades.label_code(symbol), price,
+                               position_amount, current_position_value, 0.0, commission_cost, leveraged_pnl,
+                               pnl_percentage, self.balance, trades.label_code(exit_reason)))
             
             # 포지션 제거
             self.positions = []
             
-            print(f"💰 매도 완료: ${self.balance:,.2f} (P&L: ${leveraged_pnl:+.2f}, 수량: {position_amount:.4f})")
+            if self.verbose:
+                print(f"💰 매도 완료: ${self.balance:,.2f} (P&L: ${leveraged_pnl:+.2f}, 수량: {position_amount:.4f})")
             return True
             
         return False
@@ -1253,12 +3083,9 @@ class BacktestEngine:
             position_equity = position['margin'] + unrealized_pnl
             total_equity += position_equity
         
-        self.equity_curve.append({
-            'timestamp': timestamp,
-            'equity': total_equity,
-            'balance': self.balance,
-            'positions_value': total_equity - self.balance
-        })
+        self.metrics.add_equity(total_equity)
+        if not self.online_metrics:
+            self.equity_curve.append((to_epoch_ms(timestamp), total_equity, self.balance, total_equity - self.balance))
         
         return total_equity
     
@@ -1296,17 +3123,26 @@ class BacktestEngine:
         # 워밍업 기간 (이동평균 계산용)
         warmup_period = 20
         
-        for i in range(warmup_period, len(df)):
-            current_candle = df.iloc[i]
-            current_price = current_candle['close']
-            current_time = current_candle.name
+        # 실시간 거래와 같은 스트리밍 전략 객체에 캔들을 하나씩 반영 (캔들당 O(1), 선형 시간)
+        engine = StreamingStrategy(strategy, params)
+        candles = CandleArray.from_dataframe(df)
+        timestamps = candles.timestamp.tolist()
+        opens, highs, lows, closes, volumes = (column.tolist() for column in
+                                               (candles.open, candles.high, candles.low, candles.close, candles.volume))
+        
+        for i in range(len(df)):
+            engine.update(timestamps[i], opens[i], highs[i], lows[i], closes[i], volumes[i])
+            if i < warmup_period:
+                continue
+            current_price = closes[i]
+            current_time = timestamps[i]  # epoch ms (거래/자산 기록에 그대로 저장)
             
             # 포지션 상태 확인
             has_position = len(self.positions) > 0
             
             # 디버깅: 포지션 상태 출력 (처음 몇 개만)
             if i < warmup_period + 10:
-                print(f"🔍 캔들 {i}: {current_time} - 포지션: {len(self.positions)}개, has_position: {has_position}")
+                print(f"🔍 캔들 {i}: {candles.timestamp_at(i)} - 포지션: {len(self.positions)}개, has_position: {has_position}")
             
             # 리스크 관리 체크 (포지션이 있을 때만)
             if has_position:
@@ -1318,12 +3154,7 @@ class BacktestEngine:
                         continue
             
             # 전략 신호 생성
-            if strategy == 'ma':
-                signal, exit_reason = simple_ma_strategy(df, i, params, has_position)
-            elif strategy == 'rsi':
-                signal, exit_reason = rsi_strategy(df, i, params, has_position)
-            else:
-                signal, exit_reason = simple_ma_strategy(df, i, params, has_position)
+            signal, exit_reason = engine.signal(has_position)
             
             # 거래 실행
             if signal == 'BUY' and not has_position:
@@ -1336,12 +3167,12 @@ class BacktestEngine:
         
         # 최종 청산 (미결 포지션이 있는 경우)
         if self.positions:
-            final_price = df['close'].iloc[-1]
-            final_time = df.index[-1]
+            final_price = closes[-1]
+            final_time = timestamps[-1]
             for position in self.positions:
                 self.execute_trade('SELL', final_price, final_time, symbol, '최종청산')
         
-        print(f"✅ 백테스트 완료 - 총 거래: {len(self.trades)}회")
+        print(f"✅ 백테스트 완료 - 총 거래: {self.metrics.trades}회")
 
     def check_risk_management(self, current_price, current_time, params):
         """단일 포지션 리스크 관리 체크 (파라미터 기반)"""
@@ -1367,19 +3198,11 @@ class BacktestEngine:
         return positions_to_sell
     
     def generate_backtest_report(self):
-        """백테스트 리포트 생성"""
-        if not self.trades:
+        """백테스트 리포트 생성 - 수치는 실행 중 갱신한 집계 사용, online_metrics면 거래/자산 기록 없는 요약만"""
+        metrics = self.metrics
+        if not metrics.trades:
             return None
             
-        # 기본 통계
-        total_trades = len(self.trades)
-        buy_trades = [t for t in self.trades if t['type'] == 'BUY']
-        sell_trades = [t for t in self.trades if t['type'] == 'SELL']
-        
-        # 수익률 계산
-        total_pnl = sum(t.get('pnl', 0) for t in sell_trades)
-        total_commission = sum(t['commission'] for t in self.trades)
-        
         # 최종 자산 (미결 포지션 가치 포함, 레버리지 단순화)
         final_equity = self.balance
         # 미결 포지션 가치 추가 (레버리지 고려)
@@ -1396,36 +3219,26 @@ class BacktestEngine:
         total_return_pct = (total_return / self.initial_balance) * 100
         
         # 승률 계산 (최종청산 제외)
-        completed_trades = [t for t in sell_trades if t.get('exit_reason') != '최종청산']
-        profitable_trades = len([t for t in completed_trades if t.get('pnl', 0) > 0])
-        win_rate = (profitable_trades / len(completed_trades)) * 100 if completed_trades else 0
-        
-        # 최대 낙폭 (MDD) 계산
-        peak = self.initial_balance
-        mdd = 0
-        for equity_data in self.equity_curve:
-            equity = equity_data['equity']
-            if equity > peak:
-                peak = equity
-            drawdown = (peak - equity) / peak * 100
-            if drawdown > mdd:
-                mdd = drawdown
+        win_rate = (metrics.wins / metrics.completed) * 100 if metrics.completed else 0
         
-        return {
+        report = {
             'initial_balance': self.initial_balance,
             'final_balance': final_equity,
             'total_return': total_return,
             'total_return_pct': total_return_pct,
-            'total_trades': total_trades,
-            'buy_trades': len(buy_trades),
-            'sell_trades': len(sell_trades),
+            'total_trades': metrics.trades,
+            'buy_trades': metrics.trades - metrics.sells,
+            'sell_trades': metrics.sells,
+            'completed_trades': metrics.completed,
             'win_rate': win_rate,
-            'total_pnl': total_pnl,
-            'total_commission': total_commission,
-            'max_drawdown': mdd,
-            'trades': self.trades,
-            'equity_curve': self.equity_curve
+            'total_pnl': metrics.total_pnl,
+            'total_commission': metrics.total_commission,
+            'max_drawdown': metrics.max_drawdown
         }
+        if not self.online_metrics:
+            report['trades'] = self.trades.snapshot()
+            report['equity_curve'] = self.equity_curve.snapshot()
+        return report
     
     def print_backtest_report(self, report):
         """백테스트 리포트 출력"""
@@ -1448,18 +3261,18 @@ class BacktestEngine:
         print()
         
         # 거래 통계
-        completed_sells = [t for t in report['trades'] if t['type'] == 'SELL' and t.get('exit_reason') != '최종청산']
-        final_sells = [t for t in report['trades'] if t['type'] == 'SELL' and t.get('exit_reason') == '최종청산']
+        completed_sells = report['completed_trades']
+        final_sells = report['sell_trades'] - completed_sells
         
         print("📈 거래 통계:")
         print(f"  총 거래 횟수: {report['total_trades']}회")
         print(f"  매수 거래: {report['buy_trades']}회")
-        print(f"  매도 거래: {report['sell_trades']}회 (완료: {len(completed_sells)}회, 최종청산: {len(final_sells)}회)")
+        print(f"  매도 거래: {report['sell_trades']}회 (완료: {completed_sells}회, 최종청산: {final_sells}회)")
         print(f"  승률: {report['win_rate']:.1f}% (완료 거래 기준)")
         
         # 최종 포지션 상태 확인
         if final_sells:
-            print(f"  ⚠️ 최종청산 거래: {len(final_sells)}회 (백테스팅 종료 시 미결 포지션)")
+            print(f"  ⚠️ 최종청산 거래: {final_sells}회 (백테스팅 종료 시 미결 포지션)")
         print()
         
         # 수익률 분석
@@ -1469,7 +3282,10 @@ class BacktestEngine:
         print(f"  최대 낙폭 (MDD): {report['max_drawdown']:.2f}%")
         print()
         
-        # 상세 거래 내역
+        # 상세 거래 내역 (online_metrics 요약 리포트에는 없음)
+        if 'trades' not in report:
+            print("="*90)
+            return
         print("📋 상세 거래 내역:")
         print(f"{'시간':<20} {'타입':<6} {'가격':<12} {'수량':<10} {'P&L':<12} {'잔고':<12} {'사유':<10}")
         print("-"*90)
@@ -1496,130 +3312,192 @@ class BacktestEngine:
         print("="*90)
 
     def run_backtest_vectorized(self, df, symbol, timeframe='1h', strategy='ma', params=None):
-        """벡터화된 백테스트 실행 (훨씬 빠름)"""
+        """벡터화된 백테스트 실행 (훨씬 빠름) - DataFrame 또는 CandleArray 입력"""
         print(f"🔍 벡터화 백테스트 시작")
         
-        # 파라미터 설정
-        if params is None:
-            params = {}
-        
-        # 전략별 기본 파라미터 설정
-        if strategy == 'rsi':
-            default_params = {
-                'rsi_buy': 30,
-                'rsi_sell': 70,
-                'stop_loss': -0.015,
-                'take_profit': 0.03,
-                'max_hold_hours': 24,
-                'volume_ratio': 0.8,
-                'support_distance': 0.02
-            }
-        elif strategy == 'ma':
-            default_params = {
-                'short_period': 5,
-                'long_period': 20,
-                'stop_loss': -0.02,
-                'take_profit': 0.03,
-                'max_hold_hours': 24
-            }
-        else:
-            default_params = {
-                'stop_loss': -0.02,
-                'take_profit': 0.03,
-                'max_hold_hours': 24
-            }
-        
-        # 파라미터 병합
-        strategy_params = {**default_params, **params}
+        # 전략별 기본 파라미터와 병합
+        strategy_params = self._vectorized_params(strategy, params)
         
         # 모든 지표를 한 번에 계산 (벡터화)
-        df_indicators = self._calculate_all_indicators(df, strategy, strategy_params)
+        indicators = self._calculate_all_indicators(df, strategy, strategy_params)
         
         # 거래 실행 (포지션 상태 기반)
-        self._execute_trades_vectorized(df_indicators, None, symbol, strategy_params)
+        self._execute_trades_vectorized(indicators, None, symbol, strategy_params)
         
-        print(f"✅ 벡터화 백테스트 완료 - 총 거래: {len(self.trades)}회")
+        print(f"✅ 벡터화 백테스트 완료 - 총 거래: {self.metrics.trades}회")
     
-    def _calculate_all_indicators(self, df, strategy, params):
-        """모든 지표를 한 번에 계산 (벡터화)"""
-        df_indicators = df.copy()
+    @staticmethod
+    def _vectorized_params(strategy, params=None):
+        """전략별 기본 파라미터와 병합"""
+        default_params = {'rsi': RSI_STRATEGY_DEFAULTS, 'ma': MA_STRATEGY_DEFAULTS}.get(strategy, {
+            'stop_loss': -0.02,
+            'take_profit': 0.03,
+            'max_hold_hours': 24
+        })
+        return {**default_params, **(params or {})}
+    
+    def run_backtest_batch(self, df, symbol, timeframe='1h', strategy='ma', param_list=(), progress=None,
+                           online_metrics=None):
+        """여러 파라미터 조합을 한 번에 백테스트 -> 조합 순서대로 리포트 목록 (실패한 조합은 None)
+        
+        지표는 조합 간에 공유해 한 번만 계산하고 (이동평균은 윈도우별 1회, RSI/거래량은 전체 1회),
+        진입/청산 신호는 (조합 × 시간) 불리언 행렬로 한 번에 만든 뒤 조합별 상태 머신만 따로 실행
+        progress(i, params, report)는 조합이 끝날 때마다 호출, online_metrics를 주면 이 실행에서만 모드 변경
+        """
+        candles = CandleArray.from_dataframe(df)
+        all_params = [self._vectorized_params(strategy, params) for params in param_list]
+        signal_sets, signal_index = self._generate_batch_signals(candles, strategy, all_params)
+        
+        # 상태 머신 입력은 조합 간에 공유 (캔들 루프용 파이썬 리스트 변환도 필요할 때 1회)
+        closes = candles.close
+        listed_candles = None
+        listed_signals = {}
+        
+        verbose, online = self.verbose, self.online_metrics
+        self.verbose = False
+        if online_metrics is not None:
+            self.online_metrics = online_metrics
+        reports = []
+        try:
+            for i, params in enumerate(all_params):
+                report = None
+                try:
+                    key = signal_index[i]
+                    signals = signal_sets[key][:4]
+                    if self._use_jump_execution(closes, signals[0], signals[1]):
+                        inputs = (closes, candles.timestamp, *signals)
+                        simulate = simulate_position_jumps
+                    else:
+                        if listed_candles is None:
+                            listed_candles = (closes.tolist(), candles.timestamp.tolist())
+                        if key not in listed_signals:
+                            listed_signals[key] = tuple(values.tolist() for values in signals)
+                        inputs = (*listed_candles, *listed_signals[key])
+                        simulate = simulate_position_events
+                    self.reset()
+                    events = simulate(*inputs, params.get('stop_loss', -0.02), params.get('take_profit', 0.03),
+                                      params.get('max_hold_hours', 24), start=30)
+                    self._replay_position_events(events, closes, candles.timestamp, symbol, signal_sets[key][4])
+                    report = self.generate_backtest_report()
+                except Exception as e:
+                    print(f"\n❌ 백테스트 오류: {e}")
+                reports.append(report)
+                if progress:
+                    progress(i, param_list[i], report)
+        finally:
+            self.verbose, self.online_metrics = verbose, online
+        return reports
+    
+    def _generate_batch_signals(self, candles, strategy, all_params):
+        """조합별 신호 배열을 공유 지표로 계산 -> (신호 키별 신호 튜플, 조합별 신호 키 목록)"""
+        n = len(candles)
+        close = candles.close
+        signal_sets = {}
         
         if strategy == 'rsi':
-            # RSI 계산 (벡터화)
-            df_indicators['rsi'] = calculate_rsi(df_indicators['close'], period=14)
+            # RSI/거래량 지표는 파라미터와 무관 -> 1회 계산 후 임계값만 브로드캐스팅
+            indicators = self._calculate_all_indicators(candles, 'rsi', {})
+            keys = [(params.get('rsi_buy', 30), params.get('rsi_sell', 70)) for params in all_params]
+            unique_keys = list(dict.fromkeys(keys))
+            buys = np.array([key[0] for key in unique_keys], dtype=np.float64)[:, None]
+            sells = np.array([key[1] for key in unique_keys], dtype=np.float64)[:, None]
+            with np.errstate(invalid='ignore'):
+                oversold = indicators['rsi'][None, :] < buys        # (조합 × 시간)
+                overbought = indicators['rsi'][None, :] > sells
+                volume_ok = indicators['volume_ratio'] > 0.3
+            for row, key in enumerate(unique_keys):
+                signal_sets[key] = (oversold[row] & volume_ok, overbought[row] & volume_ok,
+                                    overbought[row], oversold[row], ('롱RSI과매수', '숏RSI과매도'))
+            return signal_sets, keys
+        
+        if strategy != 'ma':
+            empty = np.zeros(n, dtype=bool)
+            signal_sets[None] = (empty, empty, empty, empty, ('롱데스크로스', '숏골든크로스'))
+            return signal_sets, [None] * len(all_params)
+        
+        # 사용되는 모든 윈도우의 이동평균을 윈도우별 한 번씩 계산 (단기/장기 공통, 지표 캐시 공유)
+        keys = [(params.get('short_period', 5), params.get('long_period', 20)) for params in all_params]
+        unique_keys = list(dict.fromkeys(keys))
+        windows = sorted({window for key in unique_keys for window in key})
+        ma_matrix = indicator_cache.moving_averages(close, windows)  # (윈도우 × 시간)
+        row_of = {window: row for row, window in enumerate(windows)}
+        short_rows = [row_of[key[0]] for key in unique_keys]
+        long_rows = [row_of[key[1]] for key in unique_keys]
+        
+        # 모든 (단기, 장기) 쌍의 크로스오버를 (조합 × 시간) 행렬로 한 번에 계산
+        ma_cross = ma_matrix[short_rows] > ma_matrix[long_rows]
+        ma_cross_prev = np.zeros_like(ma_cross)
+        ma_cross_prev[:, 1:] = ma_cross[:, :-1]
+        golden_cross = ma_cross & ~ma_cross_prev
+        death_cross = ~ma_cross & ma_cross_prev
+        golden_cross[:, 0] = death_cross[:, 0] = False  # 첫 캔들은 이전 값 없음
+        for row, key in enumerate(unique_keys):
+            signal_sets[key] = (golden_cross[row], death_cross[row], death_cross[row], golden_cross[row],
+                                ('롱데스크로스', '숏골든크로스'))
+        return signal_sets, keys
+    
+    def _calculate_all_indicators(self, candles, strategy, params):
+        """모든 지표를 한 번에 계산 (벡터화) - 원본 캔들 배열은 복사하지 않고 참조"""
+        candles = CandleArray.from_dataframe(candles)
+        indicators = {
+            'timestamp': candles.timestamp,
+            'close': candles.close,
+        }
+        
+        if strategy == 'rsi':
+            # RSI 계산 (벡터화, 지표 캐시 공유)
+            indicators['rsi'] = indicator_cache.rsi(candles.close, period=14)
             
             # 이동평균 계산 (벡터화)
-            df_indicators['ma_short'] = df_indicators['close'].rolling(window=5).mean()
-            df_indicators['ma_long'] = df_indicators['close'].rolling(window=20).mean()
+            indicators['ma_short'], indicators['ma_long'] = indicator_cache.moving_averages(candles.close, (5, 20))
             
             # 거래량 이동평균 (벡터화)
-            df_indicators['volume_ma'] = df_indicators['volume'].rolling(window=20).mean()
-            df_indicators['volume_ratio'] = df_indicators['volume'] / df_indicators['volume_ma']
+            indicators['volume_ma'] = indicator_cache.rolling_mean(candles.volume, 20)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                indicators['volume_ratio'] = candles.volume / indicators['volume_ma']
             
-            # 피벗 포인트 계산 (벡터화)
-            df_indicators['pivot_high'] = df_indicators['high'].rolling(window=5, center=True).max()
-            df_indicators['pivot_low'] = df_indicators['low'].rolling(window=5, center=True).min()
+            # 피벗 포인트 계산 (벡터화, 불리언 마스크)
+            indicators['pivot_high'], indicators['pivot_low'] = indicator_cache.pivot_masks(candles.high, candles.low, window=5)
             
         elif strategy == 'ma':
             # 이동평균 계산 (벡터화)
             short_period = params.get('short_period', 5)
             long_period = params.get('long_period', 20)
             
-            df_indicators['ma_short'] = df_indicators['close'].rolling(window=short_period).mean()
-            df_indicators['ma_long'] = df_indicators['close'].rolling(window=long_period).mean()
+            indicators['ma_short'], indicators['ma_long'] = indicator_cache.moving_averages(
+                candles.close, (short_period, long_period))
             
             # 크로스오버 시그널 (벡터화)
-            df_indicators['ma_cross'] = (df_indicators['ma_short'] > df_indicators['ma_long']).astype(int)
-            df_indicators['ma_cross_prev'] = df_indicators['ma_cross'].shift(1)
+            ma_cross = (indicators['ma_short'] > indicators['ma_long']).astype(np.float64)
+            indicators['ma_cross'] = ma_cross
+            indicators['ma_cross_prev'] = np.concatenate([[np.nan], ma_cross[:-1]])
         
-        return df_indicators
+        return indicators
     
-    def _generate_signals_vectorized(self, df, strategy, params):
-        """벡터화된 시그널 생성"""
-        signals = pd.Series('HOLD', index=df.index)
-        
-        # NaN 값 처리
-        df = df.ffill().bfill()
+    def _generate_signals_vectorized(self, indicators, strategy, params):
+        """진입/청산 신호를 불리언 배열로 계산 (벡터화) -> (롱진입, 숏진입, 롱청산, 숏청산, 신호청산 사유)"""
+        n = len(indicators['close'])
         
         if strategy == 'rsi':
-            # RSI 시그널 (벡터화) - 조건 완화
-            rsi_buy = params.get('rsi_buy', 30)
-            rsi_sell = params.get('rsi_sell', 70)
-            
-            # 매수 조건 (벡터화) - 더 완화
-            buy_condition = (
-                (df['rsi'] < rsi_buy) & 
-                (df['volume_ratio'] > 0.3) &  # 거래량 조건 더 완화
-                (df['rsi'].notna()) &  # NaN 체크
-                (df['volume_ratio'].notna())
-            )
-            
-            # 매도 조건 (벡터화) - 포지션이 있을 때만
-            sell_condition = (
-                (df['rsi'] > rsi_sell)
-            )
-            
-            signals[buy_condition] = 'BUY'
-            signals[sell_condition] = 'SELL'
-            
-        elif strategy == 'ma':
-            # 이동평균 크로스오버 시그널 (벡터화)
-            golden_cross = (df['ma_cross'] == 1) & (df['ma_cross_prev'] == 0)
-            death_cross = (df['ma_cross'] == 0) & (df['ma_cross_prev'] == 1)
-            
-            # NaN 체크 추가
-            golden_cross = golden_cross & df['ma_short'].notna() & df['ma_long'].notna()
-            death_cross = death_cross & df['ma_short'].notna() & df['ma_long'].notna()
-            
-            signals[golden_cross] = 'BUY'
-            signals[death_cross] = 'SELL'
-        
-        return signals
-    
-    def _execute_trades_vectorized(self, df, signals, symbol, params):
-        """벡터화된 시그널로 거래 실행"""
-        position = None
-        
+            rsi = indicators['rsi'] if 'rsi' in indicators else np.full(n, 50.0)
+            volume_ratio = indicators['volume_ratio'] if 'volume_ratio' in indicators else np.ones(n)
+            with np.errstate(invalid='ignore'):
+                oversold = rsi < params.get('rsi_buy', 30)
+                overbought = rsi > params.get('rsi_sell', 70)
+                volume_ok = volume_ratio > 0.3
+            # 롱 진입: RSI 과매도, 숏 진입: RSI 과매수 / 반대 조건으로 정리
+            return (oversold & volume_ok, overbought & volume_ok, overbought, oversold,
+                    ('롱RSI과매수', '숏RSI과매도'))
+        
+        # 이동평균 크로스오버 (지표가 없으면 신호 없음)
+        ma_cross = indicators['ma_cross'] if 'ma_cross' in indicators else np.zeros(n)
+        ma_cross_prev = indicators['ma_cross_prev'] if 'ma_cross_prev' in indicators else np.zeros(n)
+        golden_cross = (ma_cross == 1) & (ma_cross_prev == 0)
+        death_cross = (ma_cross == 0) & (ma_cross_prev == 1)
+        return golden_cross, death_cross, death_cross, golden_cross, ('롱데스크로스', '숏골든크로스')
+    
+    def _execute_trades_vectorized(self, indicators, signals, symbol, params):
+        """벡터화된 시그널로 거래 실행 - 상태 머신으로 진입/청산 캔들만 찾은 뒤 해당 캔들만 체결"""
         # 워밍업 기간 (이동평균 계산용)
         warmup_period = 30
         
@@ -1630,195 +3508,44 @@ class BacktestEngine:
         elif 'short_period' in params and 'long_period' in params:
             strategy = 'ma'
         
-        for i, (timestamp, row) in enumerate(df.iterrows()):
-            # 워밍업 기간 동안은 거래하지 않음
-            if i < warmup_period:
-                continue
-            
-            price = row['close']
-            
-            if strategy == 'rsi':
-                # RSI 전략 로직
-                rsi = row['rsi'] if 'rsi' in row else 50
-                volume_ratio = row.get('volume_ratio', 1.0)
-                
-                # 포지션 상태에 따른 시그널 생성
-                if position is None:
-                    # 포지션 없을 때: 롱/숏 진입 조건
-                    rsi_buy = params.get('rsi_buy', 30)
-                    rsi_sell = params.get('rsi_sell', 70)
-                    
-                    # 롱 진입: RSI < 30 (과매도)
-                    if rsi < rsi_buy and volume_ratio > 0.3:
-                        position = {
-                            'type': 'LONG',
-                            'entry_price': price,
-                            'entry_time': timestamp,
-                            'amount': self.balance * self.balance_ratio / price
-                        }
-                        self.execute_trade('BUY', price, timestamp, symbol)
-                        
-                    # 숏 진입: RSI > 70 (과매수)
-                    elif rsi > rsi_sell and volume_ratio > 0.3:
-                        position = {
-                            'type': 'SHORT',
-                            'entry_price': price,
-                            'entry_time': timestamp,
-                            'amount': self.balance * self.balance_ratio / price
-                        }
-                        self.execute_trade('SELL', price, timestamp, symbol)
-                        
-                else:
-                    # 포지션 있을 때: 롱/숏별 정리 조건
-                    entry_price = position['entry_price']
-                    position_type = position['type']
-                    
-                    if position_type == 'LONG':
-                        # 롱 포지션 정리 조건
-                        price_change = (price - entry_price) / entry_price
-                        
-                        # 1. RSI 과매수 (롱 정리)
-                        rsi_sell = params.get('rsi_sell', 70)
-                        if rsi > rsi_sell:
-                            self.execute_trade('SELL', price, timestamp, symbol, '롱RSI과매수')
-                            position = None
-                            continue
-                        
-                        # 2. 손절 (롱)
-                        stop_loss = params.get('stop_loss', -0.02)
-                        if price_change <= stop_loss:
-                            self.execute_trade('SELL', price, timestamp, symbol, '롱손절')
-                            position = None
-                            continue
-                        
-                        # 3. 익절 (롱)
-                        take_profit = params.get('take_profit', 0.03)
-                        if price_change >= take_profit:
-                            self.execute_trade('SELL', price, timestamp, symbol, '롱익절')
-                            position = None
-                            continue
-                            
-                    elif position_type == 'SHORT':
-                        # 숏 포지션 정리 조건
-                        price_change = (entry_price - price) / entry_price  # 숏은 반대
-                        
-                        # 1. RSI 과매도 (숏 정리)
-                        rsi_buy = params.get('rsi_buy', 30)
-                        if rsi < rsi_buy:
-                            self.execute_trade('BUY', price, timestamp, symbol, '숏RSI과매도')
-                            position = None
-                            continue
-                        
-                        # 2. 손절 (숏)
-                        stop_loss = params.get('stop_loss', -0.02)
-                        if price_change <= stop_loss:
-                            self.execute_trade('BUY', price, timestamp, symbol, '숏손절')
-                            position = None
-                            continue
-                        
-                        # 3. 익절 (숏)
-                        take_profit = params.get('take_profit', 0.03)
-                        if price_change >= take_profit:
-                            self.execute_trade('BUY', price, timestamp, symbol, '숏익절')
-                            position = None
-                            continue
-                
-            elif strategy == 'ma':
-                # 이동평균 전략 로직
-                ma_short = row.get('ma_short', price)
-                ma_long = row.get('ma_long', price)
-                
-                # 포지션 상태에 따른 시그널 생성
-                if position is None:
-                    # 포지션 없을 때: 골든크로스/데스크로스 진입
-                    ma_cross = row.get('ma_cross', 0)
-                    ma_cross_prev = row.get('ma_cross_prev', 0)
-                    
-                    # 골든크로스 (단기 > 장기): 롱 진입
-                    if ma_cross == 1 and ma_cross_prev == 0:
-                        position = {
-                            'type': 'LONG',
-                            'entry_price': price,
-                            'entry_time': timestamp,
-                            'amount': self.balance * self.balance_ratio / price
-                        }
-                        self.execute_trade('BUY', price, timestamp, symbol)
-                        
-                    # 데스크로스 (단기 < 장기): 숏 진입
-                    elif ma_cross == 0 and ma_cross_prev == 1:
-                        position = {
-                            'type': 'SHORT',
-                            'entry_price': price,
-                            'entry_time': timestamp,
-                            'amount': self.balance * self.balance_ratio / price
-                        }
-                        self.execute_trade('SELL', price, timestamp, symbol)
-                        
-                else:
-                    # 포지션 있을 때: 반대 크로스로 정리
-                    entry_price = position['entry_price']
-                    position_type = position['type']
-                    ma_cross = row.get('ma_cross', 0)
-                    ma_cross_prev = row.get('ma_cross_prev', 0)
-                    
-                    if position_type == 'LONG':
-                        # 롱 포지션 정리 조건
-                        price_change = (price - entry_price) / entry_price
-                        
-                        # 1. 데스크로스 (롱 정리)
-                        if ma_cross == 0 and ma_cross_prev == 1:
-                            self.execute_trade('SELL', price, timestamp, symbol, '롱데스크로스')
-                            position = None
-                            continue
-                        
-                        # 2. 손절 (롱)
-                        stop_loss = params.get('stop_loss', -0.02)
-                        if price_change <= stop_loss:
-                            self.execute_trade('SELL', price, timestamp, symbol, '롱손절')
-                            position = None
-                            continue
-                        
-                        # 3. 익절 (롱)
-                        take_profit = params.get('take_profit', 0.03)
-                        if price_change >= take_profit:
-                            self.execute_trade('SELL', price, timestamp, symbol, '롱익절')
-                            position = None
-                            continue
-                            
-                    elif position_type == 'SHORT':
-                        # 숏 포지션 정리 조건
-                        price_change = (entry_price - price) / entry_price  # 숏은 반대
-                        
-                        # 1. 골든크로스 (숏 정리)
-                        if ma_cross == 1 and ma_cross_prev == 0:
-                            self.execute_trade('BUY', price, timestamp, symbol, '숏골든크로스')
-                            position = None
-                            continue
-                        
-                        # 2. 손절 (숏)
-                        stop_loss = params.get('stop_loss', -0.02)
-                        if price_change <= stop_loss:
-                            self.execute_trade('BUY', price, timestamp, symbol, '숏손절')
-                            position = None
-                            continue
-                        
-                        # 3. 익절 (숏)
-                        take_profit = params.get('take_profit', 0.03)
-                        if price_change >= take_profit:
-                            self.execute_trade('BUY', price, timestamp, symbol, '숏익절')
-                            position = None
-                            continue
-            
-            # 최대 보유 시간 체크
-            if position:
-                max_hold_hours = params.get('max_hold_hours', 24)
-                hold_time = timestamp - position['entry_time']
-                if hold_time.total_seconds() / 3600 > max_hold_hours:
-                    if position['type'] == 'LONG':
-                        self.execute_trade('SELL', price, timestamp, symbol, '최대보유시간')
-                    else:
-                        self.execute_trade('BUY', price, timestamp, symbol, '최대보유시간')
-                    position = None
+        if signals is None:
+            signals = self._generate_signals_vectorized(indicators, strategy, params)
+        long_entry, short_entry, long_exit, short_exit, signal_reasons = signals
+        
+        timestamps = indicators['timestamp']
+        closes = indicators['close']
+        simulate = simulate_position_jumps if self._use_jump_execution(closes, long_entry, short_entry) else simulate_position_events
+        events = simulate(
+            closes, timestamps, long_entry, short_entry, long_exit, short_exit,
+            params.get('stop_loss', -0.02), params.get('take_profit', 0.03), params.get('max_hold_hours', 24),
+            start=warmup_period)
+        
+        self._replay_position_events(events, closes, timestamps, symbol, signal_reasons)
+        return events
+    
+    def _use_jump_execution(self, closes, long_entry, short_entry):
+        """거래 단위 이동(jump) 실행 여부 - auto는 진입 신호가 드물어 긴 무포지션/보유 구간이 많을 때만"""
+        if self.execution != 'auto':
+            return self.execution == 'jump'
+        entries = np.count_nonzero(long_entry) + np.count_nonzero(short_entry)
+        return len(closes) >= POSITION_JUMP_MIN_BARS_PER_ENTRY * max(entries, 1)
+    
+    def _replay_position_events(self, events, closes, timestamps, symbol, signal_reasons):
+        """상태 머신 이벤트를 기존 execute_trade로 체결 (잔고/거래 기록은 기존과 동일)"""
+        # 청산 사유 코드 -> 기존 사유 문자열
+        exit_reasons = {
+            SIDE_LONG: {EXIT_NONE: None, EXIT_SIGNAL: signal_reasons[0], EXIT_STOP_LOSS: '롱손절',
+                        EXIT_TAKE_PROFIT: '롱익절', EXIT_MAX_HOLD: '최대보유시간'},
+            SIDE_SHORT: {EXIT_NONE: None, EXIT_SIGNAL: signal_reasons[1], EXIT_STOP_LOSS: '숏손절',
+                         EXIT_TAKE_PROFIT: '숏익절', EXIT_MAX_HOLD: '최대보유시간'},
+        }
+        # 이벤트 캔들의 시각/가격만 한 번에 변환 (epoch ms 정수/파이썬 float - Timestamp 객체는 만들지 않음)
+        bars = events['bar']
+        times = np.asarray(timestamps, dtype=np.int64)[bars].tolist()
+        prices = np.asarray(closes, dtype=np.float64)[bars].tolist()
+        for (bar, side, action, reason), timestamp, price in zip(events.tolist(), times, prices):
+            self.execute_trade('BUY' if action == ACTION_BUY else 'SELL', price, timestamp, symbol,
+                               exit_reasons[side][reason])
 
 # 전역 거래 추적기
 trading_tracker = TradingTracker()
@@ -1847,13 +3574,17 @@ def auto_trading_loop(symbol='BTC/USDT:USDT', leverage=1, position_ratio=0.3, ti
     except Exception as e:
         print(f"잔고 조회 실패: {e}")
     
+    # 스트리밍 지표 상태 (저장된 상태가 있으면 워밍업 없이 이어서 갱신)
+    engine = load_streaming_strategy(symbol, timeframe, strategy, params)
+    
     # 24시간 결과 저장을 위한 타이머
     last_save_time = datetime.now()
     save_interval = timedelta(hours=24)
     
     while True:
         try:
-            execute_strategy(symbol, position_ratio, timeframe, strategy, params)
+            execute_strategy(symbol, position_ratio, timeframe, strategy, params, engine=engine)
+            save_streaming_strategy(engine, symbol, timeframe)
             
             # 24시간마다 결과 저장
             current_time = datetime.now()
@@ -1988,6 +3719,9 @@ def get_trading_settings():
     return leverage, position_ratio
 
 # 전략 파라미터 정의
+# 이동평균 전체 탐색 윈도우 범위 (StrategyParams.get_ma_sweep_params)
+MA_SWEEP_WINDOWS = range(2, 201)
+
 class StrategyParams:
     """전략 파라미터 클래스"""
     
@@ -2012,66 +3746,336 @@ class StrategyParams:
             'take_profit': [0.03, 0.04],          # 익절 비율 (2개)
             'max_hold_hours': [24]                # 최대 보유 시간 (1개)
         }
+    
+    @staticmethod
+    def get_ma_sweep_params() -> Dict[str, List]:
+        """이동평균 윈도우 2~200 전체 탐색 범위 (선택 사용 - optimize_strategy(param_ranges=...)로 전달, 단기 < 장기만)"""
+        return {
+            'short_period': list(MA_SWEEP_WINDOWS),  # 단기 이동평균 (199개)
+            'long_period': list(MA_SWEEP_WINDOWS),   # 장기 이동평균 (199개)
+            'stop_loss': [-0.015, -0.02],         # 손절 비율 (2개)
+            'take_profit': [0.03, 0.04],          # 익절 비율 (2개)
+            'max_hold_hours': [24]                # 최대 보유 시간 (1개)
+        }
+
+# 최적화 병렬 워커 수 (1이면 단일 프로세스, 0이면 CPU 코어 수)
+OPTIMIZER_WORKERS = int(os.environ.get('OPTIMIZER_WORKERS', '1') or 1)
+
+class SharedCandles:
+    """CandleArray를 공유 메모리 블록 하나에 게시 - 프로세스 풀 워커는 피클링/복사 없이 연결"""
+    
+    def __init__(self, candles):
+        from multiprocessing import shared_memory
+        self.rows = len(candles)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, 6 * self.rows * 8))
+        block = self.block(self._shm, self.rows)
+        block[0].view(np.int64)[:] = candles.timestamp
+        for row, column in enumerate(CANDLE_COLUMNS[1:], start=1):
+            block[row] = getattr(candles, column)
+    
+    @property
+    def name(self):
+        return self._shm.name
+    
+    @staticmethod
+    def block(shm, rows):
+        """(6, rows) float64 뷰 - 0행은 int64 타임스탬프 비트를 그대로 저장"""
+        return np.ndarray((6, rows), dtype=np.float64, buffer=shm.buf)
+    
+    @classmethod
+    def attach(cls, name, rows):
+        """워커 측: 이름으로 연결 -> (공유 메모리 핸들, 제로카피 CandleArray)"""
+        from multiprocessing import shared_memory
+        shm = shared_memory.SharedMemory(name=name)
+        block = cls.block(shm, rows)
+        return shm, CandleArray(block[0].view(np.int64), *block[1:])
+    
+    def close(self):
+        self._shm.close()
+        self._shm.unlink()
+
+_optimizer_worker = {}  # 워커 프로세스별 공유 캔들/백테스트 엔진
+
+def _init_optimizer_worker(shm_name, rows, engine_args):
+    """프로세스 풀 워커 초기화 - 공유 캔들에 한 번 연결"""
+    shm, candles = SharedCandles.attach(shm_name, rows)
+    _optimizer_worker.update(shm=shm, candles=candles,
+                             engine=BacktestEngine(*engine_args, verbose=False, online_metrics=True))
+
+def _run_optimizer_chunk(symbol, timeframe, strategy, chunk):
+    """워커: 조합 묶음을 배치 백테스트 -> [(조합 번호, 요약 리포트), ...]
+    
+    온라인 집계 모드라 거래 기록 없이 요약 수치만 전송 (부모 프로세스의 역직렬화가 직렬 병목이 되지 않도록)
+    """
+    indices = [index for index, _ in chunk]
+    reports = _optimizer_worker['engine'].run_backtest_batch(
+        _optimizer_worker['candles'], symbol, timeframe, strategy, [params for _, params in chunk])
+    return list(zip(indices, reports))
+
+OPTIMIZER_TOP_K = int(os.environ.get('OPTIMIZER_TOP_K', '5') or 5)  # 전체 거래 기록을 보관할 상위 조합 수
+OPTIMIZER_SPILL_DIR = os.environ.get('OPTIMIZER_SPILL_DIR', '')  # 설정하면 조합별 요약은 메모리 대신 JSONL 파일로
+# 탐색 방식: 'grid' (조합 무작위 샘플 전체 기간 평가), 'halving' (짧은 최근 구간부터 단계적으로 상위 조합만 승격)
+OPTIMIZER_SEARCH = os.environ.get('OPTIMIZER_SEARCH', 'grid')
+OPTIMIZER_HALVING_ETA = 3          # 단계마다 상위 1/eta 조합만 승격, 평가 구간은 eta배로 늘림
+OPTIMIZER_HALVING_MIN_BARS = 500   # 첫 단계 최소 평가 구간 (캔들 수)
+
+def is_continuous_range(values):
+    """(최소, 최대) 튜플이면 연속 범위 (리스트는 기존처럼 이산 후보)"""
+    return isinstance(values, tuple) and len(values) == 2
+
+def sample_param_value(values):
+    """파라미터 범위에서 값 하나 추출 - 이산 후보는 균등 선택, 연속 범위는 균등 분포 (양 끝이 정수면 정수)"""
+    if not is_continuous_range(values):
+        return values[np.random.randint(len(values))]
+    low, high = values
+    if isinstance(low, int) and isinstance(high, int):
+        return int(np.random.randint(low, high + 1))
+    return round(float(np.random.uniform(low, high)), 6)
+
+OPTIMIZER_STREAM_CHUNK = 256        # 조합 스트림을 배치 백테스트에 넘기는 묶음 크기
+
+def random_below(n):
+    """[0, n) 균등 무작위 정수 (n이 int64 범위를 넘어도 동작)"""
+    if n <= np.iinfo(np.int64).max:
+        return int(np.random.randint(n, dtype=np.int64))
+    bits = n.bit_length()
+    nbytes = (bits + 7) // 8
+    while True:
+        value = int.from_bytes(np.random.bytes(nbytes), 'big') >> (8 * nbytes - bits)
+        if value < n:
+            return value
+
+def iter_chunks(iterable, size):
+    """이터러블을 size개씩 리스트로 나눠 순서대로 생성 (전체를 메모리에 올리지 않음)"""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+class ParameterSpace:
+    """이산 파라미터 격자를 지연 표현 - 조합 번호 <-> 조합을 혼합 기수로 변환 (itertools.product 순서와 동일)
+    
+    전체 조합 목록을 만들지 않으므로 메모리는 격자 크기와 무관 (샘플링도 뽑은 조합 수만큼만 사용)
+    단기 < 장기 제약이 있으면 유효한 (단기, 장기) 쌍에 순위를 매겨 유효 조합만 직접 추출
+    """
+    
+    def __init__(self, param_ranges: Dict[str, List]):
+        self.keys = list(param_ranges.keys())
+        self.axes = [list(values) for values in param_ranges.values()]
+        self.radices = [len(values) for values in self.axes]
+        self.size = math.prod(self.radices)
+        # 이동평균은 단기 < 장기 조합만 사용
+        self._ordered = None
+        self._free_axes = list(range(len(self.axes)))  # 유효 조합 순위에서 독립적으로 변하는 축
+        pairs = 1
+        if 'short_period' in self.keys and 'long_period' in self.keys:
+            short_axis, long_axis = self.keys.index('short_period'), self.keys.index('long_period')
+            self._ordered = (short_axis, long_axis)
+            self._free_axes = [axis for axis in self._free_axes if axis not in self._ordered]
+            # 장기 값을 정렬해 단기 값별로 더 큰 장기 값 개수와 누적 오프셋 계산 (축 길이만큼의 메모리)
+            longs = self.axes[long_axis]
+            self._long_order = sorted(range(len(longs)), key=longs.__getitem__)
+            self._sorted_longs = [longs[digit] for digit in self._long_order]
+            self._pair_offsets = list(itertools.accumulate(
+                (len(longs) - bisect.bisect_right(self._sorted_longs, short) for short in self.axes[short_axis]),
+                initial=0))
+            pairs = self._pair_offsets[-1]
+        # 유효 조합 수 (제약이 없으면 전체 격자 크기)
+        self.valid_size = pairs * math.prod(self.radices[axis] for axis in self._free_axes)
+    
+    def __len__(self):
+        return self.size
+    
+    def decode_values(self, index):
+        """조합 번호 -> 값 튜플 (마지막 축이 가장 빠르게 변함)"""
+        values = []
+        for axis, radix in zip(reversed(self.axes), reversed(self.radices)):
+            index, digit = divmod(index, radix)
+            values.append(axis[digit])
+        return tuple(reversed(values))
+    
+    def decode(self, index):
+        """조합 번호 -> 파라미터 딕셔너리"""
+        return dict(zip(self.keys, self.decode_values(index)))
+    
+    def is_valid(self, values):
+        return self._ordered is None or values[self._ordered[0]] < values[self._ordered[1]]
+    
+    def index_of_rank(self, rank):
+        """유효 조합 순위 [0, valid_size) -> 조합 번호 (제약이 없으면 그대로)"""
+        if self._ordered is None:
+            return rank
+        digits = [0] * len(self.axes)
+        for axis in reversed(self._free_axes):
+            rank, digits[axis] = divmod(rank, self.radices[axis])
+        # 남은 순위는 (단기, 장기) 쌍 순위 -> 단기 자릿수, 더 큰 장기 값 중 몇 번째인지
+        short_digit = bisect.bisect_right(self._pair_offsets, rank) - 1
+        first_long = len(self._sorted_longs) - (self._pair_offsets[short_digit + 1] - self._pair_offsets[short_digit])
+        digits[self._ordered[0]] = short_digit
+        digits[self._ordered[1]] = self._long_order[first_long + rank - self._pair_offsets[short_digit]]
+        index = 0
+        for digit, radix in zip(digits, self.radices):
+            index = index * radix + digit
+        return index
+    
+    def sample_indices(self, count):
+        """유효 조합 중 중복 없이 min(count, 유효 조합 수)개 번호 추출 -> 오름차순 목록
+        
+        유효 조합 순위를 Floyd 알고리즘으로 직접 뽑으므로 공간을 훑지 않고 항상 정확히 그 개수를 반환
+        """
+        total = self.valid_size
+        if total == 0 or count <= 0:
+            return []
+        if count >= total:
+            ranks = range(total)
+        else:
+            ranks = set()
+            for upper in range(total - count, total):
+                rank = random_below(upper + 1)
+                ranks.add(upper if rank in ranks else rank)
+        return sorted(self.index_of_rank(rank) for rank in ranks)
+    
+    def combinations(self, indices=None):
+        """조합 번호 목록(없으면 전체 유효 조합)을 파라미터 딕셔너리로 하나씩 생성"""
+        if indices is None:
+            for values in itertools.product(*self.axes):
+                if self.is_valid(values):
+                    yield dict(zip(self.keys, values))
+            return
+        for index in indices:
+            yield self.decode(index)
+
+class OptimizationResults:
+    """최적화 결과 보관 정책 - 모든 조합은 요약만 (메모리 또는 JSONL 파일), 목표 지표 상위 K개만 힙으로 유지
+    
+    상위 K개 항목은 요약 항목과 별도 딕셔너리라 전체 거래 기록 결과로 교체해도 요약 목록은 작게 유지
+    """
+    
+    def __init__(self, top_k=OPTIMIZER_TOP_K, objective='total_return', spill_path=None):
+        self.top_k = max(1, top_k)
+        self.objective = objective
+        self.spill_path = spill_path
+        self.summaries = []  # [{'params', 'result'}] - 파일로 내보내는 경우 비어 있음
+        self.count = 0
+        self._heap = []      # (목표 값, -조합 번호, 조합 번호, 항목) 최소 힙 - 동률이면 앞선 조합 우선
+        self._indexed = []   # 병렬 실행 시 완료 순서 -> finish()에서 조합 순서로 정리
+        self._spill = open(spill_path, 'a', encoding='utf-8') if spill_path else None
+    
+    def add(self, index, params, result):
+        self.count += 1
+        if self._spill:
+            self._spill.write(json.dumps({'index': index, 'params': params, 'result': result}, ensure_ascii=False) + '\n')
+        else:
+            self._indexed.append((index, {'params': params, 'result': result}))
+        item = (result[self.objective], -index, index, {'params': params, 'result': result})
+        if len(self._heap) < self.top_k:
+            heapq.heappush(self._heap, item)
+        elif item[:2] > self._heap[0][:2]:
+            heapq.heapreplace(self._heap, item)
+    
+    def finish(self):
+        """실행 종료 - 요약을 조합 순서로 정리하고 내보내기 파일을 닫음"""
+        self._indexed.sort(key=lambda item: item[0])
+        self.summaries.extend(entry for _, entry in self._indexed)
+        self._indexed = []
+        if self._spill:
+            self._spill.close()
+            self._spill = None
+            print(f"\n💾 조합별 요약 저장: {self.spill_path}")
+    
+    def top(self):
+        """상위 K개 항목 (목표 지표 내림차순)"""
+        return [item[3] for item in sorted(self._heap, key=lambda item: item[:2], reverse=True)]
 
 class StrategyOptimizer:
     """전략 최적화 엔진"""
     
-    def __init__(self, initial_balance=10000, balance_ratio=0.3, commission=0.0004, leverage=1):
+    def __init__(self, initial_balance=10000, balance_ratio=0.3, commission=0.0004, leverage=1, workers=None,
+                 top_k=None, objective='total_return', spill_dir=None):
         self.initial_balance = initial_balance
         self.balance_ratio = balance_ratio
         self.commission = commission
         self.leverage = leverage
         self.backtest_engine = BacktestEngine(initial_balance, balance_ratio, commission, leverage)
-        self.optimization_results = []
+        # 결과 보관 정책 (상위 K개만 전체 기록, 목표 지표, 요약 내보내기 디렉터리)
+        self.top_k = OPTIMIZER_TOP_K if top_k is None else top_k
+        self.objective = objective  # 높을수록 좋은 리포트 수치 (상위 K개 순위 기준)
+        self.spill_dir = OPTIMIZER_SPILL_DIR if spill_dir is None else spill_dir
+        self.results = OptimizationResults(self.top_k, objective)
+        self.optimization_results = self.results.summaries
+        # 병렬 워커 수 (None이면 OPTIMIZER_WORKERS, 0이면 CPU 코어 수)
+        workers = OPTIMIZER_WORKERS if workers is None else workers
+        self.workers = workers if workers > 0 else (os.cpu_count() or 1)
+    
+    def _reset_results(self, strategy: str):
+        """최적화 실행마다 결과 보관소를 새로 만듦 (같은 인스턴스로 여러 코인/전략을 돌려도 누적되지 않음)"""
+        if self.results._spill:
+            self.results.finish()
+        spill_path = None
+        if self.spill_dir:
+            os.makedirs(self.spill_dir, exist_ok=True)
+            spill_path = os.path.join(self.spill_dir,
+                                      f"optimization_{strategy}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}.jsonl")
+        self.results = OptimizationResults(self.top_k, self.objective, spill_path)
+        self.optimization_results = self.results.summaries
+    
+    def _optimization_output(self, strategy: str, best_params: Dict, best_result: Dict) -> Dict:
+        """optimize_strategy 반환 형식 - all_results는 요약, top_results는 전체 거래 기록 포함 상위 K개"""
+        return {
+            'strategy': strategy,
+            'best_params': best_params,
+            'best_result': best_result,
+            'all_results': self.optimization_results,
+            'top_results': self.results.top(),
+            'results_count': self.results.count
+        }
     
     def optimize_strategy(self, symbol: str, timeframe: str, strategy: str, 
-                         optimization_days: int = 7, max_combinations: int = 100) -> Dict:
-        """전략 최적화 실행"""
+                         optimization_days: int = 7, max_combinations: int = 100, search: str = None,
+                         param_ranges: Dict[str, Any] = None) -> Dict:
+        """전략 최적화 실행 (search: 'grid'/'halving', param_ranges: 리스트 또는 (최소, 최대) 연속 범위)"""
+        search = search or OPTIMIZER_SEARCH
         print(f"\n🔧 {strategy.upper()} 전략 최적화 시작...")
         print(f"📊 최적화 기간: {optimization_days}일")
         print(f"🎯 최대 조합 수: {max_combinations}")
+        self._reset_results(strategy)
         
-        # 데이터 수집
+        # 데이터 수집 (조합마다 복사하지 않도록 배열 컨테이너로 한 번 변환)
         df = get_price_data(symbol, timeframe=timeframe, limit=optimization_days * 1440)  # 1분봉 기준
         if df is None or len(df) < 100:
             print("❌ 충분한 데이터를 수집할 수 없습니다.")
             return {}
+        candles = CandleArray.from_dataframe(df)
         
         # 파라미터 조합 생성
-        if strategy == 'rsi':
-            param_ranges = StrategyParams.get_rsi_params()
-        elif strategy == 'ma':
-            param_ranges = StrategyParams.get_ma_params()
-        else:
+        if strategy not in ('rsi', 'ma'):
             print(f"❌ 지원하지 않는 전략: {strategy}")
             return {}
+        if param_ranges is None:
+            param_ranges = StrategyParams.get_rsi_params() if strategy == 'rsi' else StrategyParams.get_ma_params()
+        
+        if search == 'halving':
+            # 짧은 최근 구간부터 단계적으로 상위 조합만 승격 -> 마지막 후보만 전체 기간 평가
+            combinations = self._successive_halving(candles, symbol, timeframe, strategy, param_ranges, max_combinations)
+            total = len(combinations)
+        elif any(is_continuous_range(values) for values in param_ranges.values()):
+            combinations = self._generate_combinations(param_ranges, max_combinations)
+            total = len(combinations)
+        else:
+            # 격자는 지연 표현 - 뽑은 조합 번호만 보관하고 조합은 평가 시점에 하나씩 생성
+            space = ParameterSpace(param_ranges)
+            indices = space.sample_indices(max_combinations)
+            print(f"🧮 파라미터 공간: {space.size:,}개 격자점")
+            combinations, total = space.combinations(indices), len(indices)
+        print(f"📈 테스트할 조합 수: {total}")
         
-        # 모든 조합 생성 (최대 조합 수 제한)
-        combinations = self._generate_combinations(param_ranges, max_combinations)
-        print(f"📈 테스트할 조합 수: {len(combinations)}")
-        
-        # 각 조합 테스트
-        best_result = None
-        best_params = None
-        
-        for i, params in enumerate(combinations):
-            print(f"\r🔄 진행률: {i+1}/{len(combinations)} ({((i+1)/len(combinations)*100):.1f}%)", end="")
-            
-            # 백테스트 실행
-            result = self._run_backtest_with_params(df, symbol, timeframe, strategy, params)
-            
-            if result:  # 모든 결과를 저장 (조건 완화)
-                self.optimization_results.append({
-                    'params': params,
-                    'result': result
-                })
-                
-                # 최고 성과 업데이트
-                if best_result is None or result['total_return'] > best_result['total_return']:
-                    best_result = result
-                    best_params = params
+        # 모든 조합을 배치로 테스트 (공유 지표/신호는 한 번만 계산)
+        best_result, best_params = self._run_batch(candles, symbol, timeframe, strategy, combinations, total)
         
         print(f"\n✅ 최적화 완료!")
+        print(f"🧮 {indicator_cache.summary()}")
         
         if best_result:
             print(f"🏆 최고 성과: {best_result['total_return']:.2f}%")
@@ -2080,20 +4084,15 @@ class StrategyOptimizer:
             # 결과 저장
             self._save_optimization_result(strategy, best_params, best_result)
             
-            return {
-                'strategy': strategy,
-                'best_params': best_params,
-                'best_result': best_result,
-                'all_results': self.optimization_results
-            }
+            return self._optimization_output(strategy, best_params, best_result)
         else:
             print("⚠️ 모든 파라미터 조합에서 수익률이 낮습니다.")
             
             # 최고 성과 선택 (손실이어도)
-            if self.optimization_results:
-                best_result = max(self.optimization_results, key=lambda x: x['result']['total_return'])
-                best_params = best_result['params']
-                best_result = best_result['result']
+            top_results = self.results.top()
+            if top_results:
+                best_params = top_results[0]['params']
+                best_result = top_results[0]['result']
                 
                 print(f"🏆 최고 성과: {best_result['total_return']:.2f}%")
                 print(f"🎯 최적 파라미터: {best_params}")
@@ -2114,38 +4113,148 @@ class StrategyOptimizer:
                     # 결과 저장
                     self._save_optimization_result(strategy, best_params, best_result)
                     
-                    return {
-                        'strategy': strategy,
-                        'best_params': best_params,
-                        'best_result': best_result,
-                        'all_results': self.optimization_results
-                    }
+                    return self._optimization_output(strategy, best_params, best_result)
         
         return {}
     
     def _generate_combinations(self, param_ranges: Dict[str, List], max_combinations: int) -> List[Dict]:
-        """파라미터 조합 생성"""
-        keys = list(param_ranges.keys())
-        values = list(param_ranges.values())
-        
-        # 모든 조합 생성
-        all_combinations = list(itertools.product(*values))
-        
-        # 최대 조합 수 제한
-        if len(all_combinations) > max_combinations:
-            # 랜덤 샘플링
-            indices = np.random.choice(len(all_combinations), max_combinations, replace=False)
-            all_combinations = [all_combinations[i] for i in indices]
-        
-        # 딕셔너리 형태로 변환
+        """파라미터 조합 생성 (연속 범위가 있으면 무작위 추출)"""
+        if any(is_continuous_range(values) for values in param_ranges.values()):
+            return self._sample_combinations(param_ranges, max_combinations)
+        # 격자는 지연 표현 - 최대 조합 수만큼만 번호로 뽑아 딕셔너리로 변환
+        space = ParameterSpace(param_ranges)
+        return list(space.combinations(space.sample_indices(max_combinations)))
+    
+    def _sample_combinations(self, param_ranges: Dict[str, Any], count: int, max_attempts: int = 20) -> List[Dict]:
+        """축별 무작위 추출로 서로 다른 조합 count개 생성 (이동평균은 단기 < 장기만) - 전체 조합은 만들지 않음"""
+        if not any(is_continuous_range(values) for values in param_ranges.values()):
+            space = ParameterSpace(param_ranges)
+            return list(space.combinations(space.sample_indices(count)))
+        seen = set()
         combinations = []
-        for combo in all_combinations:
-            param_dict = dict(zip(keys, combo))
-            combinations.append(param_dict)
-        
+        for _ in range(count * max_attempts):
+            if len(combinations) == count:
+                break
+            params = {key: sample_param_value(values) for key, values in param_ranges.items()}
+            if 'short_period' in params and 'long_period' in params and params['short_period'] >= params['long_period']:
+                continue
+            key = tuple(params.values())
+            if key not in seen:
+                seen.add(key)
+                combinations.append(params)
         return combinations
     
-    def _run_backtest_with_params(self, df: pd.DataFrame, symbol: str, timeframe: str, 
+    def _successive_halving(self, candles: CandleArray, symbol: str, timeframe: str, strategy: str,
+                            param_ranges: Dict[str, Any], max_combinations: int) -> List[Dict]:
+        """다단계 충실도 탐색 (successive halving) -> 전체 기간으로 평가할 최종 후보 조합
+        
+        후보 max_combinations개를 최근 짧은 구간에서 평가하고, 단계마다 목표 지표 상위 1/eta만 남기며
+        구간을 eta배로 늘림 - 전체 기간 백테스트는 마지막 단계의 소수 조합만 실행
+        """
+        eta = OPTIMIZER_HALVING_ETA
+        candidates = self._sample_combinations(param_ranges, max_combinations)
+        
+        # 단계 수: 첫 구간이 최소 캔들 수 이상이고 마지막 단계에 조합이 1개 이상 남는 범위
+        rungs = 0
+        while (len(candles) // eta ** (rungs + 1) >= OPTIMIZER_HALVING_MIN_BARS
+               and len(candidates) // eta ** (rungs + 1) >= 1):
+            rungs += 1
+        
+        for rung in range(rungs):
+            window = len(candles) // eta ** (rungs - rung)
+            keep = max(1, len(candidates) // eta)
+            print(f"🪜 {rung + 1}/{rungs + 1}단계: 최근 {window}개 캔들로 {len(candidates)}개 조합 평가 -> 상위 {keep}개 승격")
+            reports = self.backtest_engine.run_backtest_batch(candles[-window:], symbol, timeframe, strategy,
+                                                              candidates, online_metrics=True)
+            scores = [report[self.objective] if report else -np.inf for report in reports]
+            order = sorted(range(len(candidates)), key=lambda i: (-scores[i], i))  # 동률이면 앞선 조합 우선
+            candidates = [candidates[i] for i in sorted(order[:keep])]
+        
+        print(f"🪜 {rungs + 1}/{rungs + 1}단계: 전체 {len(candles)}개 캔들로 {len(candidates)}개 조합 평가")
+        return candidates
+    
+    def _run_batch(self, candles: CandleArray, symbol: str, timeframe: str, strategy: str,
+                   combinations: Iterable[Dict], total: int = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """조합 전체를 배치 백테스트 - 진행률 출력, 요약 보관, 상위 K개 추적 -> (최고 결과, 최고 파라미터)
+        
+        combinations는 리스트나 생성기 - 묶음 단위로 읽어 평가하므로 한 번에 메모리에 올리지 않음 (total은 진행률용)
+        """
+        if total is None:
+            total = len(combinations)
+        results = self.results
+        done = 0
+        
+        def on_result(i, params, result):
+            nonlocal done
+            done += 1
+            print(f"\r🔄 진행률: {done}/{total} ({(done/max(total, 1)*100):.1f}%)", end="")
+            if result:  # 모든 결과를 요약으로 보관 (조건 완화)
+                results.add(i, params, result)
+        
+        # 탐색은 온라인 집계 모드 (조합별 결과는 고정 크기 요약)
+        try:
+            if self.workers > 1 and total > 1:
+                self._run_batch_parallel(candles, symbol, timeframe, strategy, combinations, total, on_result)
+            else:
+                for chunk in iter_chunks(enumerate(combinations), OPTIMIZER_STREAM_CHUNK):
+                    self.backtest_engine.run_backtest_batch(
+                        candles, symbol, timeframe, strategy, [params for _, params in chunk],
+                        progress=lambda j, params, report, chunk=chunk: on_result(chunk[j][0], params, report),
+                        online_metrics=True)
+        finally:
+            results.finish()
+        
+        # 상위 K개 조합만 전체 거래 기록으로 다시 실행 (동률이면 앞선 조합 우선 - 순차/병렬 실행 결과 동일)
+        top_results = results.top()
+        if not top_results:
+            return None, None
+        full_results = self.backtest_engine.run_backtest_batch(
+            candles, symbol, timeframe, strategy, [entry['params'] for entry in top_results], online_metrics=False)
+        for entry, full_result in zip(top_results, full_results):
+            if full_result:
+                entry['result'] = full_result
+        return top_results[0]['result'], top_results[0]['params']
+    
+    def _run_batch_parallel(self, candles: CandleArray, symbol: str, timeframe: str, strategy: str,
+                            combinations: Iterable[Dict], total: int, on_result) -> None:
+        """조합을 묶음으로 나눠 프로세스 풀에서 실행 - 캔들은 공유 메모리로 한 번만 게시, 결과는 완료 순서대로 전달"""
+        workers = min(self.workers, total)
+        # 워커당 여러 묶음 (부하 분산) - 연속 조합은 같은 지표/신호를 공유하는 경우가 많음
+        chunk_size = min(max(1, -(-total // (workers * 4))), OPTIMIZER_STREAM_CHUNK)
+        engine_args = (self.initial_balance, self.balance_ratio, self.commission, self.leverage)
+        print(f"⚙️ 병렬 최적화: 워커 {workers}개, 작업 {-(-total // chunk_size)}개")
+        
+        shared = SharedCandles(candles)
+        try:
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_optimizer_worker,
+                                     initargs=(shared.name, shared.rows, engine_args)) as executor:
+                # 진행 중인 묶음은 워커 수의 2배까지만 - 하나가 끝날 때마다 조합 스트림에서 다음 묶음을 읽어 제출
+                chunks = iter_chunks(enumerate(combinations), chunk_size)
+                futures = {}
+                
+                def submit_next():
+                    chunk = next(chunks, None)
+                    if chunk is not None:
+                        futures[executor.submit(_run_optimizer_chunk, symbol, timeframe, strategy, chunk)] = chunk
+                
+                for _ in range(2 * workers):
+                    submit_next()
+                while futures:
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        chunk = dict(futures.pop(future))
+                        try:
+                            results = future.result()
+                        except Exception as e:
+                            print(f"\n❌ 백테스트 오류: {e}")
+                            results = [(index, None) for index in chunk]
+                        for index, report in results:
+                            on_result(index, chunk[index], report)
+                        submit_next()
+        finally:
+            shared.close()
+    
+    def _run_backtest_with_params(self, candles: CandleArray, symbol: str, timeframe: str, 
                                  strategy: str, params: Dict) -> Optional[Dict]:
         """특정 파라미터로 백테스트 실행 (벡터화)"""
         try:
@@ -2153,7 +4262,7 @@ class StrategyOptimizer:
             self.backtest_engine.reset()
             
             # 벡터화된 백테스트 실행 (훨씬 빠름)
-            self.backtest_engine.run_backtest_vectorized(df, symbol, timeframe, strategy, params)
+            self.backtest_engine.run_backtest_vectorized(candles, symbol, timeframe, strategy, params)
             
             # 결과 생성
             result = self.backtest_engine.generate_backtest_report()
@@ -2168,6 +4277,8 @@ class StrategyOptimizer:
         """Timestamp 객체를 문자열로 변환하여 JSON 직렬화 가능하게 만듦"""
         if isinstance(obj, dict):
             return {key: self._convert_timestamps_to_strings(value) for key, value in obj.items()}
+        elif isinstance(obj, RecordLog):  # 구조화 배열 기록은 저장할 때만 딕셔너리로 변환
+            return self._convert_timestamps_to_strings(obj.to_list())
         elif isinstance(obj, list):
             return [self._convert_timestamps_to_strings(item) for item in obj]
         elif hasattr(obj, 'isoformat'):  # Timestamp 객체
@@ -2191,7 +4302,7 @@ class StrategyOptimizer:
             'timestamp': datetime.now().isoformat(),
             'best_params': best_params,
             'best_result': serializable_best_result,
-            'all_results_count': len(self.optimization_results)
+            'all_results_count': self.results.count
         }
         
         try:
@@ -2256,7 +4367,7 @@ class StrategyOptimizer:
         print(f"\n🔄 조건 완화 최적화 시작...")
         
         # 기존 결과 초기화
-        self.optimization_results = []
+        self._reset_results(f"{strategy}_relaxed")
         
         # 완화된 파라미터 범위 설정
         if strategy == 'rsi':
@@ -2292,27 +4403,10 @@ class StrategyOptimizer:
         if df is None or len(df) < 100:
             print("❌ 충분한 데이터를 수집할 수 없습니다.")
             return {}
+        candles = CandleArray.from_dataframe(df)
         
-        # 각 조합 테스트
-        best_result = None
-        best_params = None
-        
-        for i, params in enumerate(combinations):
-            print(f"\r🔄 진행률: {i+1}/{len(combinations)} ({((i+1)/len(combinations)*100):.1f}%)", end="")
-            
-            # 백테스트 실행
-            result = self._run_backtest_with_params(df, symbol, timeframe, strategy, params)
-            
-            if result:
-                self.optimization_results.append({
-                    'params': params,
-                    'result': result
-                })
-                
-                # 최고 성과 업데이트
-                if best_result is None or result['total_return'] > best_result['total_return']:
-                    best_result = result
-                    best_params = params
+        # 모든 조합을 배치로 테스트 (공유 지표/신호는 한 번만 계산)
+        best_result, best_params = self._run_batch(candles, symbol, timeframe, strategy, combinations)
         
         print(f"\n✅ 완화된 조건 최적화 완료!")
         
@@ -2323,12 +4417,7 @@ class StrategyOptimizer:
             # 결과 저장 (완화된 조건임을 표시)
             self._save_optimization_result(f"{strategy}_relaxed", best_params, best_result)
             
-            return {
-                'strategy': f"{strategy}_relaxed",
-                'best_params': best_params,
-                'best_result': best_result,
-                'all_results': self.optimization_results
-            }
+            return self._optimization_output(f"{strategy}_relaxed", best_params, best_result)
         
         return {}
     
@@ -2363,11 +4452,11 @@ class StrategyOptimizer:
         for key, value in best_params.items():
             print(f"  {key}: {value}")
         
-        print(f"\n📋 전체 테스트 조합: {len(results['all_results'])}개")
+        print(f"\n📋 전체 테스트 조합: {results.get('results_count', len(results['all_results']))}개")
         
-        # 상위 5개 결과 출력
-        sorted_results = sorted(results['all_results'], 
-                              key=lambda x: x['result']['total_return'], reverse=True)
+        # 상위 5개 결과 출력 (보관된 상위 K개가 있으면 사용)
+        sorted_results = results.get('top_results') or sorted(results['all_results'],
+                                                               key=lambda x: x['result']['total_return'], reverse=True)
         
         print(f"\n🏅 상위 5개 결과:")
         for i, result in enumerate(sorted_results[:5]):
@@ -2772,7 +4861,42 @@ def print_live_performance(tracker: TradingTracker):
     else:
         print("[실시간 성과] 거래 내역이 없습니다.")
 
+def check_startup_budget(modules=('main', 'app')):
+    """인증 정보 없는 깨끗한 프로세스에서 모듈 import 시간을 측정해 예산과 비교"""
+    import subprocess
+    import tempfile
+    
+    project_dir = os.path.dirname(os.path.abspath(__file__))
+    env = {key: value for key, value in os.environ.items() if key not in ('API_KEY', 'SECRET_KEY')}
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [project_dir, env.get('PYTHONPATH')]))
+    all_ok = True
+    
+    for module in modules:
+        code = f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"
+        # .env가 없는 임시 디렉터리에서 실행 (자격 증명 없이 import 가능해야 함)
+        with tempfile.TemporaryDirectory() as work_dir:
+            proc = subprocess.run([sys.executable, '-c', code], cwd=work_dir, env=env,
+                                  capture_output=True, text=True)
+        if proc.returncode != 0:
+            print(f"❌ {module} import 실패:\n{proc.stderr.strip()}")
+            all_ok = False
+            continue
+        elapsed = float(proc.stdout.strip().splitlines()[-1])
+        budget = STARTUP_BUDGET_SECONDS.get(module, 1.0)
+        ok = elapsed <= budget
+        all_ok = all_ok and ok
+        print(f"{'✅' if ok else '❌'} import {module}: {elapsed*1000:.0f}ms (예산 {budget*1000:.0f}ms)")
+    
+    return all_ok
+
 if __name__ == "__main__":
+    if '--startup-check' in sys.argv:
+        sys.exit(0 if check_startup_budget() else 1)
+    if '--candle-writer' in sys.argv:
+        # 예: python main.py --candle-writer BTC/USDT:USDT ETH/USDT:USDT
+        writer_symbols = [arg for arg in sys.argv[sys.argv.index('--candle-writer') + 1:] if not arg.startswith('--')]
+        run_candle_writer(writer_symbols or get_major_coins()[:10])
+    
     # 기존 CLI/자동매매 루프 등은 생략
     tracker = TradingTracker()  # 실제 거래 트래커 인스턴스 사용
     print("\n[백그라운드 자동매매 실행 중...]")
@@ -0,0 +1,224 @@
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+MINUTE = 60 * 1000
+
+def _tick_candles(n=1500, seed=7):
+    """0.1 틱으로 반올림한 1분봉 (중간에 가격이 멈춘 보합 구간 포함)"""
+    rng = np.random.default_rng(seed)
+    close = np.round(100 + np.cumsum(rng.normal(0, 0.15, n)), 1)
+    close[600:700] = close[600]
+    timestamps = np.arange(n, dtype=np.int64) * MINUTE
+    return main.CandleArray(timestamps, close, close + 0.1, close - 0.1, close, rng.uniform(1, 10, n))
+
+def _reference_trades(candles, params):
+    """기준 구현: pandas rolling().mean() 이동평균 크로스오버로 같은 상태 머신 실행"""
+    close = pd.Series(candles.close)
+    ma_cross = (close.rolling(params['short_period']).mean()
+                > close.rolling(params['long_period']).mean()).astype(float).to_numpy()
+    indicators = {'timestamp': candles.timestamp, 'close': candles.close,
+                  'ma_cross': ma_cross, 'ma_cross_prev': np.concatenate([[np.nan], ma_cross[:-1]])}
+    engine = main.BacktestEngine(verbose=False, execution='bar')
+    engine._execute_trades_vectorized(indicators, None, 'X', main.BacktestEngine._vectorized_params('ma', params))
+    return engine.generate_backtest_report()
+
+@pytest.mark.parametrize('short_period, long_period', [(3, 10), (2, 7), (5, 20)])
+def test_ma_trades_match_rolling_mean_on_tick_prices(short_period, long_period):
+    candles = _tick_candles()
+    params = {'short_period': short_period, 'long_period': long_period}
+    expected = _reference_trades(candles, params)
+    
+    engine = main.BacktestEngine(verbose=False, execution='bar')
+    engine.run_backtest_vectorized(candles, 'X', '1m', 'ma', params)
+    single = engine.generate_backtest_report()
+    batch = main.BacktestEngine(verbose=False, execution='bar').run_backtest_batch(
+        candles, 'X', '1m', 'ma', [params])[0]
+    
+    for report in (single, batch):
+        assert report['trades'].to_list() == expected['trades'].to_list()
+        assert report['total_return'] == expected['total_return']
+
+def test_moving_average_matrix_matches_rolling_mean():
+    close = _tick_candles().close
+    matrix = main.moving_average_matrix(close, (2, 3, 10, 200, 5000))
+    for row, window in enumerate((2, 3, 10, 200)):
+        np.testing.assert_array_equal(matrix[row], pd.Series(close).rolling(window).mean().to_numpy())
+    assert np.isnan(matrix[4]).all()
+
+def test_trade_log_rows_keep_legacy_keys():
+    trades = main.TradeLog(capacity=1)
+    trades.append((MINUTE, main.ACTION_BUY, trades.label_code('X'), 100.0, 2.0, 200.0, 20.0, 0.1, 0.0, 0.0,
+                   979.9, -1))
+    trades.append((2 * MINUTE, main.ACTION_SELL, trades.label_code('X'), 110.0, 2.0, 220.0, 0.0, 0.1, 19.8, 9.9,
+                   999.7, trades.label_code('take_profit')))
+    snapshot = trades.snapshot()
+    trades.clear()
+    
+    buy, sell = snapshot.to_list()
+    assert list(buy) == ['timestamp', 'type', 'symbol', 'price', 'amount', 'value', 'margin', 'commission',
+                         'balance', 'exit_reason']
+    assert list(sell) == ['timestamp', 'type', 'symbol', 'price', 'amount', 'value', 'commission', 'pnl',
+                          'pnl_percentage', 'balance', 'exit_reason']
+    assert (buy['timestamp'], buy['type'], buy['symbol'], buy['exit_reason']) == (
+        pd.Timestamp(MINUTE, unit='ms'), 'BUY', 'X', None)
+    assert (sell['type'], sell['pnl'], sell['exit_reason']) == ('SELL', 19.8, 'take_profit')
+    assert len(trades) == 0 and len(snapshot) == 2
+
+def test_equity_log_rows_follow_dtype():
+    equity = main.RecordLog(main.EQUITY_DTYPE, capacity=0)
+    equity.append((MINUTE, 1010.0, 990.0, 20.0))
+    assert equity[0] == {'timestamp': pd.Timestamp(MINUTE, unit='ms'), 'equity': 1010.0, 'balance': 990.0,
+                         'positions_value': 20.0}
+    np.testing.assert_array_equal(equity.column('equity'), [1010.0])
+
+def _iterrows_position_events(df, stop_loss, take_profit, max_hold_hours):
+    """기존 방식: DataFrame.iterrows()로 행마다 Series를 만들어 같은 상태 머신 실행"""
+    events = []
+    side = 0
+    entry_price = entry_time = None
+    for i, (timestamp, row) in enumerate(df.iterrows()):
+        price = row.get('close')
+        reason = main.EXIT_NONE
+        if side == 0:
+            if row.get('long_entry'):
+                side = main.SIDE_LONG
+                events.append((i, side, main.ACTION_BUY, main.EXIT_NONE))
+            elif row.get('short_entry'):
+                side = main.SIDE_SHORT
+                events.append((i, side, main.ACTION_SELL, main.EXIT_NONE))
+            else:
+                continue
+            entry_price, entry_time = price, timestamp
+            continue
+        price_change = (price - entry_price) / entry_price * side
+        if row.get('long_exit' if side == main.SIDE_LONG else 'short_exit'):
+            reason = main.EXIT_SIGNAL
+        elif price_change <= stop_loss:
+            reason = main.EXIT_STOP_LOSS
+        elif price_change >= take_profit:
+            reason = main.EXIT_TAKE_PROFIT
+        elif (timestamp - entry_time).total_seconds() / 3600 > max_hold_hours:
+            reason = main.EXIT_MAX_HOLD
+        if reason != main.EXIT_NONE:
+            events.append((i, side, main.ACTION_SELL if side == main.SIDE_LONG else main.ACTION_BUY, reason))
+            side = 0
+    return events
+
+def test_position_kernel_speedup_on_40k_bars():
+    """40k개 1분봉에서 NumPy 상태 머신이 iterrows 루프와 같은 이벤트를 10배 이상 빠르게 생성"""
+    n = 40_000
+    rng = np.random.default_rng(3)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.001, n)))
+    timestamps = np.arange(n, dtype=np.int64) * MINUTE
+    signals = {name: rng.random(n) < 0.01 for name in ('long_entry', 'short_entry', 'long_exit', 'short_exit')}
+    df = pd.DataFrame({'close': close, **signals}, index=pd.to_datetime(timestamps, unit='ms'))
+    
+    started = time.perf_counter()
+    expected = _iterrows_position_events(df, -0.02, 0.03, 24)
+    iterrows_seconds = time.perf_counter() - started
+    
+    kernel_seconds = float('inf')
+    for _ in range(3):
+        started = time.perf_counter()
+        events = main.simulate_position_events(close, timestamps, signals['long_entry'], signals['short_entry'],
+                                               signals['long_exit'], signals['short_exit'], -0.02, 0.03, 24)
+        kernel_seconds = min(kernel_seconds, time.perf_counter() - started)
+    
+    assert events.tolist() == expected
+    assert iterrows_seconds / kernel_seconds >= 10, (iterrows_seconds, kernel_seconds)
+
+@pytest.mark.parametrize('strategy, param_list', [
+    ('ma', [{'short_period': s, 'long_period': l, 'stop_loss': sl, 'take_profit': 0.01}
+            for s in (2, 5) for l in (10, 20) for sl in (-0.005, -0.02)]),
+    ('rsi', [{'rsi_buy': b, 'rsi_sell': s, 'stop_loss': -0.01, 'take_profit': tp}
+             for b in (25, 35) for s in (65, 75) for tp in (0.005, 0.02)]),
+])
+def test_batch_reports_match_single_runs(strategy, param_list):
+    candles = _tick_candles(n=3000, seed=11)
+    batch = main.BacktestEngine(verbose=False).run_backtest_batch(candles, 'X', '1m', strategy, param_list)
+    
+    assert len(batch) == len(param_list)
+    for params, report in zip(param_list, batch):
+        engine = main.BacktestEngine(verbose=False)
+        engine.run_backtest_vectorized(candles, 'X', '1m', strategy, params)
+        single = engine.generate_backtest_report()
+        assert single['total_trades'] > 0
+        assert report['trades'].to_list() == single['trades'].to_list()
+        assert report['equity_curve'].to_list() == single['equity_curve'].to_list()
+        assert {key: value for key, value in report.items() if key not in ('trades', 'equity_curve')} == \
+            {key: value for key, value in single.items() if key not in ('trades', 'equity_curve')}
+
+@pytest.mark.parametrize('seed', range(20))
+def test_jump_execution_matches_bar_loop(seed):
+    rng = np.random.default_rng(seed)
+    n = int(rng.integers(200, 3000))
+    closes = np.round(100 * np.exp(np.cumsum(rng.normal(0, 0.003, n))), 1)  # 틱 가격 (손절/익절 경계 동률 포함)
+    timestamps = np.arange(n, dtype=np.int64) * MINUTE * int(rng.choice([1, 5, 60]))
+    density = rng.choice([0.001, 0.01, 0.2])
+    signals = [rng.random(n) < density for _ in range(4)]
+    stop_loss, take_profit = -rng.choice([0.002, 0.01, 0.05]), rng.choice([0.002, 0.01, 0.05])
+    max_hold_hours = rng.choice([0.5, 4, 24])
+    
+    bar = main.simulate_position_events(closes, timestamps, *signals, stop_loss, take_profit, max_hold_hours, start=30)
+    jump = main.simulate_position_jumps(closes, timestamps, *signals, stop_loss, take_profit, max_hold_hours, start=30)
+    assert jump.tolist() == bar.tolist()
+
+def test_jump_engine_reports_match_bar_engine():
+    candles = _tick_candles(n=5000, seed=3)
+    params = {'short_period': 20, 'long_period': 120, 'stop_loss': -0.004, 'take_profit': 0.006, 'max_hold_hours': 2}
+    reports = []
+    for execution in ('bar', 'jump'):
+        engine = main.BacktestEngine(verbose=False, execution=execution)
+        engine.run_backtest_vectorized(candles, 'X', '1m', 'ma', params)
+        reports.append(engine.generate_backtest_report())
+    bar, jump = reports
+    assert bar['total_trades'] > 0
+    assert jump['trades'].to_list() == bar['trades'].to_list()
+    assert jump['equity_curve'].to_list() == bar['equity_curve'].to_list()
+    assert jump['total_return'] == bar['total_return']
+
+def _report_from_logs(report, initial_balance):
+    """기준 구현: 전체 거래/자산 기록에서 리포트 수치를 다시 계산"""
+    trades = report['trades'].columns
+    sells = trades[trades['type'] == main.ACTION_SELL]
+    completed = sells[sells['exit_reason'] != report['trades'].label_code('최종청산')]
+    equity = np.concatenate([[initial_balance], report['equity_curve'].column('equity')])
+    peak = np.maximum.accumulate(equity)
+    return {
+        'total_trades': len(trades),
+        'sell_trades': len(sells),
+        'completed_trades': len(completed),
+        'win_rate': np.count_nonzero(completed['pnl'] > 0) / len(completed) * 100 if len(completed) else 0,
+        'total_pnl': sells['pnl'].sum(),
+        'total_commission': trades['commission'].sum(),
+        'max_drawdown': ((peak - equity) / peak * 100).max(),
+    }
+
+@pytest.mark.parametrize('runner', ['event', 'vectorized', 'batch'])
+def test_online_metrics_match_full_report(runner):
+    candles = _tick_candles(n=2000, seed=5)
+    params = {'short_period': 3, 'long_period': 15, 'stop_loss': -0.003, 'take_profit': 0.004}
+    reports = []
+    for online in (False, True):
+        engine = main.BacktestEngine(verbose=False, online_metrics=online)
+        if runner == 'event':
+            engine.run_backtest(candles.to_dataframe(), 'X', '1m', 'ma', params)
+        elif runner == 'vectorized':
+            engine.run_backtest_vectorized(candles, 'X', '1m', 'ma', params)
+        else:
+            reports.append(engine.run_backtest_batch(candles, 'X', '1m', 'ma', [params])[0])
+            continue
+        reports.append(engine.generate_backtest_report())
+    full, online = reports
+    
+    assert 'trades' not in online and 'equity_curve' not in online
+    assert online == {key: value for key, value in full.items() if key not in ('trades', 'equity_curve')}
+    expected = _report_from_logs(full, full['initial_balance'])
+    assert expected['total_trades'] > 10
+    for key, value in expected.items():
+        assert full[key] == pytest.approx(value, rel=1e-12, abs=1e-12), key
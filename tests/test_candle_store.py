@@ -0,0 +1,76 @@
+import os
+
+import numpy as np
+
+import main
+
+MINUTE = 60 * 1000
+
+def _minute_candles(minutes):
+    """분 번호 목록 -> [ts, o, h, l, c, v] 행 (가격은 분 번호)"""
+    return [[minute * MINUTE, minute, minute, minute, minute, 1.0] for minute in minutes]
+
+def test_load_resampled_after_mid_series_backfill(tmp_path):
+    store = main.CandleStore(root=str(tmp_path))
+    store.write('BTC/USDT:USDT', '1m', _minute_candles([0, 1, 60, 61]))
+    store.load_resampled('BTC/USDT:USDT', '1h')  # 증분 계산용 캐시 생성
+    
+    # 첫 시간 구간의 공백 보충 (파일 중간에 행 삽입)
+    store.write('BTC/USDT:USDT', '1m', _minute_candles(range(2, 6)))
+    timestamps, ohlcv = store.load_resampled('BTC/USDT:USDT', '1h')
+    
+    expected_ts, expected_ohlcv = main.CandleStore(root=str(tmp_path)).load_resampled('BTC/USDT:USDT', '1h')
+    np.testing.assert_array_equal(timestamps, [0, 60 * MINUTE])
+    np.testing.assert_array_equal(timestamps, expected_ts)
+    np.testing.assert_array_equal(ohlcv, expected_ohlcv)
+    np.testing.assert_array_equal(ohlcv[:, 3], [5, 61])  # 구간 종가
+
+def test_load_resampled_after_backfill_by_other_writer(tmp_path):
+    writer = main.CandleStore(root=str(tmp_path))
+    reader = main.CandleStore(root=str(tmp_path), readonly=True)
+    writer.write('BTC/USDT:USDT', '1m', _minute_candles([0, 1, 60, 61]))
+    reader.load_resampled('BTC/USDT:USDT', '1h')
+    
+    # 다른 프로세스의 writer가 공백을 보충하면 reader 캐시는 전체 재계산으로 전환
+    writer.write('BTC/USDT:USDT', '1m', _minute_candles(range(2, 6)))
+    timestamps, ohlcv = reader.load_resampled('BTC/USDT:USDT', '1h')
+    np.testing.assert_array_equal(timestamps, [0, 60 * MINUTE])
+    np.testing.assert_array_equal(ohlcv[:, 3], [5, 61])
+    np.testing.assert_array_equal(ohlcv[:, 4], [6, 2])  # 구간 거래량
+
+def test_append_after_interrupted_append(tmp_path):
+    store = main.CandleStore(root=str(tmp_path))
+    reader = main.CandleStore(root=str(tmp_path), readonly=True)
+    store.write('BTC/USDT:USDT', '1m', _minute_candles([0, 1]))
+    
+    # 이전 추가가 timestamp/open 파일만 쓰고 meta 갱신 전에 중단된 상태
+    path = store._series_dir('BTC/USDT:USDT', '1m')
+    for column in ('timestamp', 'open'):
+        with open(os.path.join(path, f'{column}.bin'), 'ab') as f:
+            f.write(b'\1' * 11)  # 한 행 + 중간에서 끊긴 다음 행
+    
+    store.write('BTC/USDT:USDT', '1m', _minute_candles([3, 4]))
+    timestamps, ohlcv = reader.load('BTC/USDT:USDT', '1m')
+    
+    np.testing.assert_array_equal(timestamps, np.array([0, 1, 3, 4]) * MINUTE)
+    np.testing.assert_array_equal(ohlcv[:, :4], np.repeat([[0], [1], [3], [4]], 4, axis=1))
+    np.testing.assert_array_equal(ohlcv[:, 4], 1.0)
+    for column in main.CANDLE_COLUMNS:
+        assert os.path.getsize(os.path.join(path, f'{column}.bin')) == 4 * 8
+
+def test_reader_mapped_across_interrupted_append(tmp_path):
+    writer = main.CandleStore(root=str(tmp_path))
+    reader = main.CandleStore(root=str(tmp_path), readonly=True)
+    writer.write('BTC/USDT:USDT', '1m', _minute_candles([0, 1]))
+    reader.load('BTC/USDT:USDT', '1m')  # 기존 행 수로 memmap 생성
+    
+    path = writer._series_dir('BTC/USDT:USDT', '1m')
+    with open(os.path.join(path, 'close.bin'), 'ab') as f:
+        f.write(b'\1' * 5)  # 중단된 추가의 잔여 바이트 - 커밋된 행만 보여야 함
+    timestamps, _ = reader.load('BTC/USDT:USDT', '1m')
+    np.testing.assert_array_equal(timestamps, [0, MINUTE])
+    
+    writer.write('BTC/USDT:USDT', '1m', _minute_candles([2]))
+    timestamps, ohlcv = reader.load('BTC/USDT:USDT', '1m')
+    np.testing.assert_array_equal(timestamps, [0, MINUTE, 2 * MINUTE])
+    np.testing.assert_array_equal(ohlcv[:, 3], [0, 1, 2])
@@ -0,0 +1,96 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import main
+
+MINUTE = 60 * 1000
+
+class FakeExchange:
+    """분 번호를 가격으로 쓰는 1분봉 거래소 (요청 기록, 페이지 앞에 이전 캔들을 겹쳐 반환 가능)"""
+    
+    def __init__(self, minutes, overlap=0):
+        self.minutes = set(minutes)
+        self.overlap = overlap
+        self.calls = []
+        self._lock = threading.Lock()
+    
+    def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+        with self._lock:
+            self.calls.append((since, limit))
+        first = since // MINUTE - self.overlap
+        return [[minute * MINUTE, minute, minute, minute, minute, 1.0]
+                for minute in range(first, since // MINUTE + limit) if minute in self.minutes]
+
+class RecordingLimiter:
+    def __init__(self):
+        self.weights = []
+    
+    def acquire(self, weight=1):
+        self.weights.append(weight)
+
+def test_download_merges_overlapping_pages():
+    exchange = FakeExchange(range(2500), overlap=3)
+    limiter = RecordingLimiter()
+    candles = main.download_ohlcv_range('X', '1m', 10 * MINUTE, 2400 * MINUTE, exchange=exchange, rate_limiter=limiter)
+    
+    np.testing.assert_array_equal(candles[:, 0], np.arange(10, 2401) * MINUTE)
+    assert sorted(exchange.calls) == [(10 * MINUTE, 1000), (1010 * MINUTE, 1000), (2010 * MINUTE, 391)]
+    assert sorted(limiter.weights) == [2, 5, 5]
+
+def test_download_skips_empty_pages():
+    # 두 번째 페이지 구간은 거래소에 캔들이 없음
+    exchange = FakeExchange([*range(0, 1000), *range(2000, 2100)])
+    candles = main.download_ohlcv_range('X', '1m', 0, 2099 * MINUTE, exchange=exchange, rate_limiter=RecordingLimiter())
+    np.testing.assert_array_equal(candles[:, 0], np.r_[0:1000, 2000:2100] * MINUTE)
+    
+    empty = main.download_ohlcv_range('X', '1m', 1000 * MINUTE, 1999 * MINUTE, exchange=exchange,
+                                      rate_limiter=RecordingLimiter())
+    assert empty.shape == (0, 6)
+
+def test_download_propagates_failed_page(monkeypatch):
+    class FailingExchange(FakeExchange):
+        def fetch_ohlcv(self, symbol, timeframe='1m', since=None, limit=None):
+            super().fetch_ohlcv(symbol, timeframe, since, limit)
+            raise RuntimeError('429')
+    
+    monkeypatch.setattr(main.time, 'sleep', lambda seconds: None)
+    exchange = FailingExchange(range(10))
+    with pytest.raises(RuntimeError):
+        main.download_ohlcv_range('X', '1m', 0, 9 * MINUTE, exchange=exchange, rate_limiter=RecordingLimiter())
+    assert len(exchange.calls) == 3
+
+def test_sync_resumes_from_coverage_gaps(tmp_path, monkeypatch):
+    store = main.CandleStore(root=str(tmp_path))
+    exchange = FakeExchange(range(200))
+    monkeypatch.setattr(main, 'candle_store', store)
+    monkeypatch.setattr(main, 'binance', exchange)
+    monkeypatch.setattr(main, 'binance_rate_limiter', RecordingLimiter())
+    
+    # 10~49분, 80~119분만 수집된 상태
+    store.write('X', '1m', exchange.fetch_ohlcv('X', since=10 * MINUTE, limit=40))
+    store.write('X', '1m', exchange.fetch_ohlcv('X', since=80 * MINUTE, limit=40))
+    exchange.calls.clear()
+    
+    now_ms = 150 * MINUTE + 30 * 1000  # 150분 캔들 진행 중
+    forming = main._sync_candle_store('X', '1m', 0, now_ms)
+    
+    assert exchange.calls == [(0, 10), (50 * MINUTE, 30), (120 * MINUTE, 31)]
+    np.testing.assert_array_equal(forming[:, 0], [150 * MINUTE])
+    timestamps, _ = store.load('X', '1m')
+    np.testing.assert_array_equal(timestamps, np.arange(150) * MINUTE)
+    assert store.coverage('X', '1m') == [[0, 149 * MINUTE]]
+
+def test_token_bucket_waits_for_refill():
+    bucket = main.TokenBucket(capacity=10, period=0.2)
+    assert bucket.try_acquire(10)
+    assert not bucket.try_acquire(5)
+    
+    started = time.monotonic()
+    bucket.acquire(5)  # 초당 50 충전 -> 약 0.1초 대기
+    assert 0.08 <= time.monotonic() - started < 0.5
+    
+    bucket.acquire(100)  # 용량보다 큰 가중치는 용량으로 제한
+    assert bucket.tokens < 1
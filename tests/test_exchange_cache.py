@@ -0,0 +1,104 @@
+import threading
+import time
+
+import pytest
+
+import main
+
+class BlockingExchange:
+    """호출 횟수를 세고 release 전까지 응답을 막는 가짜 거래소"""
+    
+    def __init__(self):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self._lock = threading.Lock()
+    
+    def _respond(self, method):
+        with self._lock:
+            self.calls += 1
+            call = self.calls
+        self.started.set()
+        assert self.release.wait(5)
+        return {'method': method, 'call': call}
+    
+    def fetch_tickers(self):
+        return self._respond('fetch_tickers')
+    
+    def fetch_balance(self):
+        return self._respond('fetch_balance')
+
+class FreeLimiter:
+    def acquire(self, weight=1):
+        pass
+
+@pytest.fixture
+def exchange(monkeypatch):
+    exchange = BlockingExchange()
+    monkeypatch.setattr(main, 'binance', exchange)
+    monkeypatch.setattr(main, 'binance_rate_limiter', FreeLimiter())
+    return exchange
+
+def _wait_until(condition):
+    deadline = time.monotonic() + 5
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+def _call_in_threads(cache, method, count):
+    results = [None] * count
+    
+    def run(i):
+        results[i] = cache.call(method)
+    
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+def test_concurrent_misses_share_one_fetch(exchange):
+    cache = main.ExchangeCache()
+    threads, results = _call_in_threads(cache, 'fetch_tickers', 8)
+    _wait_until(lambda: cache.stats['misses'] + cache.stats['coalesced'] == 8)
+    exchange.release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert exchange.calls == 1
+    assert results == [{'method': 'fetch_tickers', 'call': 1}] * 8
+    assert cache.stats['misses'] == 1 and cache.stats['coalesced'] == 7
+    assert cache.call('fetch_tickers') == results[0] and cache.stats['hits'] == 1
+
+def test_invalidate_discards_in_flight_result(exchange):
+    cache = main.ExchangeCache()
+    threads, results = _call_in_threads(cache, 'fetch_balance', 1)
+    assert exchange.started.wait(5)
+    
+    cache.invalidate('fetch_balance')  # 예: 주문 체결 직후
+    exchange.release.set()
+    threads[0].join()
+    
+    assert results == [{'method': 'fetch_balance', 'call': 1}]  # 요청자에게는 그대로 전달
+    assert cache.call('fetch_balance') == {'method': 'fetch_balance', 'call': 2}  # 캐시에는 저장되지 않음
+    assert cache.call('fetch_balance') == {'method': 'fetch_balance', 'call': 2}
+    assert exchange.calls == 2
+
+def test_invalidate_all_discards_in_flight_result(exchange):
+    cache = main.ExchangeCache()
+    threads, _ = _call_in_threads(cache, 'fetch_tickers', 1)
+    assert exchange.started.wait(5)
+    cache.invalidate()
+    exchange.release.set()
+    threads[0].join()
+    
+    assert cache.call('fetch_tickers')['call'] == 2
+
+def test_stale_entry_is_served_while_refreshing(exchange):
+    cache = main.ExchangeCache(ttls={'fetch_tickers': (0, 60)})
+    exchange.release.set()
+    first = cache.call('fetch_tickers')
+    
+    assert cache.call('fetch_tickers') == first  # 만료된 값을 즉시 반환하고 백그라운드에서 갱신
+    _wait_until(lambda: exchange.calls == 2 and not cache._inflight)
+    assert cache.call('fetch_tickers')['call'] == 2
+    assert cache.stats['stale_hits'] == 2
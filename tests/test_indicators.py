@@ -0,0 +1,169 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import main
+
+MINUTE = 60 * 1000
+
+def _frame(n=800, seed=21):
+    """0.01 틱 OHLCV DataFrame (보합 구간 포함)"""
+    rng = np.random.default_rng(seed)
+    close = np.round(50 + np.cumsum(rng.normal(0, 0.3, n)), 2)
+    close[300:340] = close[300]
+    high = np.round(close + rng.uniform(0, 0.5, n), 2)
+    low = np.round(close - rng.uniform(0, 0.5, n), 2)
+    volume = rng.uniform(1, 10, n)
+    volume[500:520] = 0.0
+    index = pd.to_datetime(np.arange(n) * MINUTE, unit='ms')
+    return pd.DataFrame({'open': close, 'high': high, 'low': low, 'close': close, 'volume': volume}, index=index)
+
+def _assert_same(streamed, expected):
+    np.testing.assert_array_equal(np.asarray(streamed), expected)
+
+@pytest.mark.parametrize('window', [1, 2, 5, 14, 37])
+def test_streaming_sma_matches_rolling_mean(window):
+    values = _frame()['close'].to_numpy() - 50  # 음수 포함
+    sma = main.StreamingSMA(window)
+    _assert_same([sma.update(value) for value in values], main.rolling_mean(values, window))
+
+def test_streaming_rsi_matches_calculate_rsi():
+    close = _frame()['close'].to_numpy()
+    rsi = main.StreamingRSI(14)
+    _assert_same([rsi.update(price) for price in close], main.calculate_rsi(close, period=14))
+
+def test_support_tracker_matches_pivot_levels():
+    df = _frame()
+    high, low = df['high'].to_numpy(), df['low'].to_numpy()
+    _, pivot_low = main.pivot_masks(high, low, window=5)
+    expected = main.pivot_levels(low, pivot_low, lookback=10, delay=2)
+    
+    tracker = main.SupportResistanceTracker(window=5, lookback=10)
+    supports = []
+    for h, l in zip(high, low):
+        tracker.update(h, l)
+        support = tracker.support()
+        supports.append(np.nan if support is None else support)
+    _assert_same(supports, expected)
+
+@pytest.mark.parametrize('strategy, params', [
+    ('ma', {'short_period': 3, 'long_period': 12}),
+    ('rsi', {'rsi_buy': 40, 'rsi_sell': 60, 'volume_ratio': 0.5, 'support_distance': 0.05}),
+])
+def test_streaming_strategy_matches_array_signals(strategy, params):
+    df = _frame()
+    prepare, signal_at = main.STRATEGIES[strategy]
+    indicators = prepare(df, params)
+    expected = [signal_at(indicators, i, has_position=i % 3 == 0) for i in range(len(df))]
+    
+    engine = main.StreamingStrategy(strategy, params)
+    signals = []
+    for i, (timestamp, row) in enumerate(zip(df.index.asi8 // 10**6, df.itertuples(index=False))):
+        if i == len(df) // 2:
+            # 중간에 JSON으로 저장/복원해도 같은 상태로 이어서 갱신
+            engine = main.StreamingStrategy.from_state(json.loads(json.dumps(engine.to_state())))
+        assert engine.update(timestamp, row.open, row.high, row.low, row.close, row.volume)
+        assert not engine.update(timestamp, row.open, row.high, row.low, row.close, row.volume)  # 같은 캔들 재반영 무시
+        signals.append(engine.signal(has_position=i % 3 == 0))
+    
+    assert signals == expected
+    assert {signal for signal, _ in expected} >= {'BUY', 'SELL'}
+
+def _rolling_pivots(df, window):
+    """기준 구현: rolling(center=True) 최대/최소와 같은 캔들을 피벗으로"""
+    highs = df['high'].rolling(window=window, center=True).max()
+    lows = df['low'].rolling(window=window, center=True).min()
+    return (df['high'] == highs).to_numpy(), (df['low'] == lows).to_numpy()
+
+@pytest.mark.parametrize('window', [3, 4, 5, 7])
+def test_pivot_masks_match_centered_rolling_window(window):
+    df = _frame(400)
+    df.iloc[200, df.columns.get_loc('high')] = np.nan
+    expected_high, expected_low = _rolling_pivots(df, window)
+    pivot_high, pivot_low = main.pivot_masks(df['high'].to_numpy(), df['low'].to_numpy(), window)
+    _assert_same(pivot_high, expected_high)
+    _assert_same(pivot_low, expected_low)
+    
+    highs, lows = main.find_pivot_points(df, window)
+    assert [point['index'] for point in highs] == np.flatnonzero(expected_high).tolist()
+    assert [(point['price'], point['timestamp']) for point in lows] == \
+        [(df['low'].iloc[i], df.index[i]) for i in np.flatnonzero(expected_low)]
+
+def test_pivot_levels_match_support_and_resistance_per_prefix():
+    df = _frame().iloc[:250]
+    high, low = df['high'].to_numpy(), df['low'].to_numpy()
+    pivot_high, pivot_low = main.pivot_masks(high, low, window=5)
+    supports = main.pivot_levels(low, pivot_low, lookback=10, delay=2)
+    resistances = main.pivot_levels(high, pivot_high, lookback=10, delay=2)
+    
+    for i in range(len(df)):
+        # i번째 캔들까지만 본 피벗 목록 (뒤 2캔들은 윈도우가 덜 차 미확정)
+        prefix = df.iloc[:i + 1]
+        prefix_highs, prefix_lows = main.find_pivot_points(prefix, window=5)
+        recent_lows = [point for point in prefix_lows if point['index'] >= i + 1 - 10]
+        recent_highs = [point for point in prefix_highs if point['index'] >= i + 1 - 10]
+        support = recent_lows[-1]['price'] if len(prefix_lows) >= 2 and recent_lows else None
+        resistance = recent_highs[-1]['price'] if len(prefix_highs) >= 2 and recent_highs else None
+        
+        assert main.calculate_support_level(prefix, prefix_lows) == support
+        assert main.calculate_resistance_level(prefix, prefix_highs) == resistance
+        np.testing.assert_equal(supports[i], np.nan if support is None else support)
+        np.testing.assert_equal(resistances[i], np.nan if resistance is None else resistance)
+
+@pytest.mark.parametrize('direction', ['up', 'down'])
+def test_rolling_trendline_matches_polyfit_per_prefix(direction):
+    df = _frame().iloc[:300]
+    high, low, close = df['high'].to_numpy(), df['low'].to_numpy(), df['close'].to_numpy()
+    pivot_high, pivot_low = main.pivot_masks(high, low, window=5)
+    prices, mask = (low, pivot_low) if direction == 'up' else (high, pivot_high)
+    slope, intercept = main.rolling_trendline(prices, mask, lookback=20, delay=2)
+    breakouts = main.trendline_breakouts(close, slope, intercept, direction)
+    
+    fitted = 0
+    for i in range(len(df)):
+        prefix = df.iloc[:i + 1]
+        prefix_highs, prefix_lows = main.find_pivot_points(prefix, window=5)
+        trendline = main.calculate_trendline(prefix, prefix_lows if direction == 'up' else prefix_highs,
+                                             direction, lookback=20)
+        if trendline is None:
+            assert np.isnan(slope[i]) and not breakouts[i]
+            continue
+        fitted += 1
+        np.testing.assert_allclose((slope[i], intercept[i]), trendline, rtol=1e-9, atol=1e-9)
+        assert breakouts[i] == main.check_trendline_breakout(prefix, trendline, close[i], direction)
+    assert fitted > 100
+
+def test_indicator_cache_keys_on_content_and_params():
+    cache = main.IndicatorCache()
+    close = _frame()['close'].to_numpy()
+    
+    first = cache.rolling_mean(close, 5)
+    assert cache.rolling_mean(close.copy(), 5) is first  # 같은 내용의 다른 배열도 적중
+    assert cache.rolling_mean(close, 6) is not first
+    changed = close.copy()
+    changed[-1] += 1
+    assert cache.rolling_mean(changed, 5) is not first
+    assert cache.stats == {'hits': 1, 'misses': 3, 'evictions': 0}
+    
+    _assert_same(first, main.rolling_mean(close, 5))
+    assert not first.flags.writeable
+    _assert_same(cache.rsi(close), main.calculate_rsi(close))
+    _assert_same(cache.moving_averages(close, (3, 7))[1], main.rolling_mean(close, 7))
+
+def test_indicator_cache_evicts_least_recently_used():
+    close = _frame()['close'].to_numpy()
+    cache = main.IndicatorCache(max_bytes=2 * close.nbytes)
+    
+    first = cache.rolling_mean(close, 2)
+    cache.rolling_mean(close, 3)
+    cache.rolling_mean(close, 2)  # 2가 최근 사용 -> 3이 먼저 제거
+    cache.rolling_mean(close, 4)
+    
+    assert len(cache) == 2 and cache.nbytes == 2 * close.nbytes
+    assert cache.stats['evictions'] == 1
+    assert cache.rolling_mean(close, 2) is first
+    misses = cache.stats['misses']
+    cache.rolling_mean(close, 3)
+    assert cache.stats['misses'] == misses + 1
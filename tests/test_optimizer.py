@@ -0,0 +1,170 @@
+import itertools
+import json
+
+import numpy as np
+import pytest
+
+import main
+
+MINUTE = 60 * 1000
+
+def _candles(n=2000, seed=13):
+    rng = np.random.default_rng(seed)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.002, n)))
+    timestamps = np.arange(n, dtype=np.int64) * MINUTE
+    return main.CandleArray(timestamps, close, close * 1.001, close * 0.999, close, rng.uniform(1, 10, n))
+
+def _ma_combinations():
+    space = main.ParameterSpace({'short_period': [2, 3, 5, 8], 'long_period': [10, 15, 20, 30],
+                                 'stop_loss': [-0.005, -0.01], 'take_profit': [0.005, 0.01]})
+    return list(space.combinations())
+
+def test_shared_candles_round_trip():
+    candles = _candles(100)
+    shared = main.SharedCandles(candles)
+    try:
+        shm, attached = main.SharedCandles.attach(shared.name, shared.rows)
+        for column in main.CANDLE_COLUMNS:
+            np.testing.assert_array_equal(getattr(attached, column), getattr(candles, column))
+        del attached
+        shm.close()
+    finally:
+        shared.close()
+
+def test_parallel_optimizer_matches_sequential():
+    candles = _candles()
+    combinations = _ma_combinations()
+    runs = []
+    for workers in (1, 2):
+        optimizer = main.StrategyOptimizer(workers=workers, top_k=3)
+        optimizer._reset_results('ma')
+        best_result, best_params = optimizer._run_batch(candles, 'X', '1m', 'ma', iter(combinations),
+                                                        len(combinations))
+        runs.append((optimizer, best_result, best_params))
+    
+    (sequential, seq_best, seq_params), (parallel, par_best, par_params) = runs
+    assert len(sequential.optimization_results) == len(combinations)
+    assert parallel.optimization_results == sequential.optimization_results
+    assert par_params == seq_params
+    assert par_best['trades'].to_list() == seq_best['trades'].to_list()
+    assert [entry['params'] for entry in parallel.results.top()] == \
+        [entry['params'] for entry in sequential.results.top()]
+
+def test_top_k_heap_keeps_best_with_earliest_ties(tmp_path):
+    rng = np.random.default_rng(4)
+    scores = rng.integers(0, 10, 200).astype(float)  # 동률 다수
+    order = rng.permutation(len(scores))             # 병렬 실행처럼 완료 순서가 뒤섞임
+    
+    results = main.OptimizationResults(top_k=7)
+    spilled = main.OptimizationResults(top_k=7, spill_path=str(tmp_path / 'summaries.jsonl'))
+    for index in order.tolist():
+        for store in (results, spilled):
+            store.add(index, {'i': index}, {'total_return': scores[index]})
+    results.finish()
+    spilled.finish()
+    
+    expected = sorted(range(len(scores)), key=lambda i: (-scores[i], i))[:7]
+    assert [entry['params']['i'] for entry in results.top()] == expected
+    assert [entry['params']['i'] for entry in spilled.top()] == expected
+    assert [entry['params']['i'] for entry in results.summaries] == list(range(len(scores)))
+    assert spilled.summaries == [] and spilled.count == len(scores)
+    lines = [json.loads(line) for line in open(tmp_path / 'summaries.jsonl', encoding='utf-8')]
+    assert sorted(line['index'] for line in lines) == list(range(len(scores)))
+
+def test_optimizer_keeps_full_logs_only_for_top_k():
+    candles = _candles()
+    combinations = _ma_combinations()
+    optimizer = main.StrategyOptimizer(workers=1, top_k=3)
+    optimizer._reset_results('ma')
+    best_result, best_params = optimizer._run_batch(candles, 'X', '1m', 'ma', combinations)
+    
+    assert all('trades' not in entry['result'] for entry in optimizer.optimization_results)
+    top = optimizer.results.top()
+    assert len(top) == 3 and all(len(entry['result']['trades']) for entry in top)
+    ranked = sorted(optimizer.optimization_results, key=lambda entry: -entry['result']['total_return'])
+    assert [entry['params'] for entry in top] == [entry['params'] for entry in ranked[:3]]
+    assert best_params == top[0]['params'] and best_result is top[0]['result']
+
+def test_successive_halving_promotes_top_third(monkeypatch):
+    candles = _candles(500 * 27)
+    candidates = [{'short_period': i % 9 + 2, 'long_period': 20 + i} for i in range(81)]
+    optimizer = main.StrategyOptimizer(workers=1)
+    monkeypatch.setattr(optimizer, '_sample_combinations', lambda param_ranges, count: candidates[:count])
+    
+    def score(params, bars):
+        # 구간 길이에 따라 순위가 바뀌는 가짜 목표 지표 (동률 포함)
+        return float((params['long_period'] * 7 + bars // 100) % 11)
+    
+    windows = []
+    
+    def fake_batch(candles, symbol, timeframe, strategy, param_list, online_metrics=None):
+        windows.append((len(candles), len(param_list)))
+        assert online_metrics is True
+        return [{'total_return': score(params, len(candles))} for params in param_list]
+    
+    monkeypatch.setattr(optimizer.backtest_engine, 'run_backtest_batch', fake_batch)
+    
+    survivors = optimizer._successive_halving(candles, 'X', '1m', 'ma', {}, 81)
+    
+    assert windows == [(500, 81), (1500, 27), (4500, 9)]
+    expected = candidates
+    for bars, _ in windows:
+        ranked = sorted(range(len(expected)), key=lambda i: (-score(expected[i], bars), i))
+        expected = [expected[i] for i in sorted(ranked[:len(expected) // 3])]
+    assert survivors == expected and len(survivors) == 3
+
+def test_successive_halving_samples_continuous_ranges():
+    candles = _candles(1600)
+    optimizer = main.StrategyOptimizer(workers=1)
+    param_ranges = {'short_period': (2, 10), 'long_period': (5, 40), 'stop_loss': (-0.02, -0.002),
+                    'take_profit': [0.005, 0.01]}
+    survivors = optimizer._successive_halving(candles, 'X', '1m', 'ma', param_ranges, 30)
+    
+    assert len(survivors) == 30 // 3  # 1600 // 3 >= 500 -> 한 단계 승격
+    for params in survivors:
+        assert 2 <= params['short_period'] < params['long_period'] <= 40
+        assert -0.02 <= params['stop_loss'] <= -0.002 and params['take_profit'] in (0.005, 0.01)
+
+PARAM_GRIDS = [
+    {'short_period': [2, 5, 9, 14], 'long_period': [20, 3, 9, 50, 5], 'stop_loss': [-0.01, -0.02], 'max_hold_hours': [6]},
+    {'rsi_buy': [20, 25, 30], 'rsi_sell': [70, 75], 'take_profit': [0.01, 0.02, 0.03]},
+]
+
+@pytest.mark.parametrize('param_ranges', PARAM_GRIDS)
+def test_parameter_space_matches_product_order(param_ranges):
+    space = main.ParameterSpace(param_ranges)
+    product = list(itertools.product(*param_ranges.values()))
+    valid = [values for values in product if space.is_valid(values)]
+    
+    assert len(space) == len(product)
+    assert [space.decode_values(index) for index in range(len(space))] == product
+    assert space.valid_size == len(valid)
+    # 순위 -> 조합 번호는 유효 조합 전체와 일대일 (장기 축은 값 순서로 순위를 매기므로 순서는 다를 수 있음)
+    ranked = [space.index_of_rank(rank) for rank in range(space.valid_size)]
+    assert len(set(ranked)) == len(ranked)
+    assert sorted(space.decode_values(index) for index in ranked) == sorted(valid)
+    assert [tuple(params.values()) for params in space.combinations()] == valid
+
+@pytest.mark.parametrize('param_ranges', PARAM_GRIDS)
+def test_parameter_space_sampling_is_unique_and_uniform(param_ranges):
+    space = main.ParameterSpace(param_ranges)
+    np.random.seed(0)
+    counts = dict.fromkeys((space.index_of_rank(rank) for rank in range(space.valid_size)), 0)
+    draws = 3000
+    for _ in range(draws):
+        indices = space.sample_indices(5)
+        assert len(indices) == 5 and len(set(indices)) == 5 and indices == sorted(indices)
+        for index in indices:
+            counts[index] += 1  # 유효 조합만 뽑힘 (KeyError 없음)
+    expected = draws * 5 / space.valid_size
+    assert all(abs(count - expected) < 5 * np.sqrt(expected) for count in counts.values())
+    assert sorted(space.sample_indices(space.valid_size + 10)) == sorted(counts)
+
+def test_parameter_space_samples_huge_grid_lazily():
+    windows = list(range(2, 2001))
+    space = main.ParameterSpace({'short_period': windows, 'long_period': windows,
+                                 **{f'axis_{i}': list(range(40)) for i in range(12)}})
+    assert space.valid_size == len(windows) * (len(windows) - 1) // 2 * 40 ** 12 > np.iinfo(np.int64).max
+    params = list(space.combinations(space.sample_indices(50)))
+    assert len(params) == 50 and len({tuple(p.values()) for p in params}) == 50
+    assert all(p['short_period'] < p['long_period'] for p in params)
@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+
+import main
+
+MINUTE = 60 * 1000
+HOUR = 60 * MINUTE
+
+@pytest.fixture
+def recorded(tmp_path):
+    """1분봉 600개와 같은 구간의 1시간봉 기록 -> (저장소 경로, 1분봉 행)"""
+    rng = np.random.default_rng(5)
+    n = 600
+    timestamps = np.arange(n, dtype=np.int64) * MINUTE
+    close = 100 + np.cumsum(rng.normal(0, 0.2, n))
+    rows = np.column_stack([timestamps, close, close + rng.random(n), close - rng.random(n),
+                            close + rng.normal(0, 0.1, n), rng.uniform(1, 5, n)])
+    store = main.CandleStore(root=str(tmp_path))
+    store.write('X/USDT', '1m', rows)
+    hour_ts, hour_ohlcv = main.resample_ohlcv(timestamps, rows[:, 1:], HOUR)
+    store.write('X/USDT', '1h', np.column_stack([hour_ts, hour_ohlcv]))
+    return str(tmp_path), rows
+
+@pytest.mark.parametrize('timeframe, resampled', [('1m', False), ('15m', True), ('1h', False)])
+def test_fetch_ohlcv_has_no_lookahead(recorded, timeframe, resampled):
+    root, rows = recorded
+    timeframe_ms = main.get_timeframe_ms(timeframe)
+    for now in (0, 59 * MINUTE + 1, 61 * MINUTE, 125 * MINUTE + 30 * 1000, 7 * HOUR, 10 * HOUR):
+        exchange = main.ReplayExchange(root=root, start_time=now, speed=0)
+        candles = exchange.fetch_ohlcv('X/USDT', timeframe, limit=1000)
+        closed = [candle for candle in candles if candle[0] + timeframe_ms <= now]
+        forming = candles[len(closed):]
+        
+        assert all(candle[0] <= now for candle in candles)
+        assert len(forming) <= 1
+        if forming:
+            # 진행 중 캔들은 now 전에 마감된 1분봉만으로 구성 (1분봉에서 리샘플링하면 진행 중 1분봉의 시가 포함)
+            open_time = forming[0][0]
+            known = rows[(rows[:, 0] >= open_time) & (rows[:, 0] + MINUTE <= now)]
+            minute = rows[rows[:, 0] == now // MINUTE * MINUTE]
+            if resampled and len(minute):
+                known = np.vstack([known, [minute[0, 0]] + [minute[0, 1]] * 4 + [0.0]])
+            open_price = rows[rows[:, 0] == open_time][0, 1]
+            expected = [open_price, open_price, open_price, open_price, 0.0]
+            if len(known) and timeframe != '1m':
+                expected = [open_price, max(open_price, known[:, 2].max()), min(open_price, known[:, 3].min()),
+                            known[-1, 4], known[:, 5].sum()]
+            np.testing.assert_allclose(forming[0][1:], expected)
+
+def test_series_list_read_once(recorded, monkeypatch):
+    root, rows = recorded
+    exchange = main.ReplayExchange(root=root, start_time=3 * HOUR, speed=0)
+    calls = []
+    series = exchange.store.series
+    monkeypatch.setattr(exchange.store, 'series', lambda: calls.append(1) or series())
+    
+    for _ in range(3):
+        exchange.fetch_ohlcv('X/USDT', '5m', limit=10)
+        exchange.fetch_tickers()
+    assert len(calls) == 1
+    assert exchange.fetch_ticker('X/USDT')['last'] == rows[rows[:, 0] == 3 * HOUR][0, 1]  # 방금 열린 1분봉 시가